@@ -0,0 +1,160 @@
+"""Command line entry point: `a11y <command> ...`
+
+Commands and checker backends are looked up by name and imported only when
+they are used, so `a11y gate` or a per-file worker never pays for pywin32,
+pywinauto or the SQLite results index.
+"""
+import importlib
+import os
+import sys
+import time
+
+# command -> (module whose main(argv) implements it, help)
+COMMANDS = {
+    'gate': ('a11y_gate', "fast pass/fail gate for CI, hooks and git filters"),
+    'batch': ('batch_check', "check many documents in parallel, most expensive first"),
+    'queue': ('work_queue', "share a batch between hosts through a lease-based SQLite queue"),
+    'watch': ('watch_folder', "re-check documents in a folder as they are saved"),
+    'aggregate': ('aggregate_results', "corpus totals and weekly trends from the results index"),
+    'fonts': ('font_metrics', "check text size and glyph coverage with cached font metrics"),
+    'ir': ('doc_ir', "evaluate the rules from cached document IR (no re-parsing)"),
+    'lists': ('numbering_index', "find typed bullets and broken list structure with the numbering index"),
+    'locate': ('issue_locations', "list where each issue is, from the results index or a fresh check"),
+    'quarantine': ('deadline_supervisor', "list or release documents that hung or crashed a worker"),
+    'remediate': ('remediate', "add table headers and alt text placeholders in place or to a copy"),
+    'report': ('report_renderer', "paged HTML and JSON report of the results index, written as it is read"),
+    'revision': ('revision_check', "issues a revision introduced or resolved, from tracked changes or history"),
+    'verify': ('verify_native', "compare the native engine with recorded Word results"),
+    'zip-io': ('mapped_zip', "time repeated checks of one package and show storage reads"),
+    'uia-fixtures': ('uia_fixtures', "record/replay Word UIA trees to benchmark the scraper"),
+}
+
+# backend -> (module, function taking a file path)
+BACKENDS = {
+    'native': ('native_checker', 'run_native_checker'),
+    'uia': ('scrape_data_3', 'run_accessibility_checker'),
+    'com': ('scrape_data', 'run_accessibility_checker'),
+}
+
+# Modules a short check must not pull in
+HEAVY_MODULES = ('win32com', 'pythoncom', 'pywinauto', 'docx', 'lxml', 'sqlite3')
+# What `a11y check` imports before the first document: the CLI, the supervisor and the native backend
+CHECK_MODULES = 'a11y_cli, deadline_supervisor, native_checker'
+IMPORT_BUDGET_MS = 100.0
+
+
+def usage():
+    lines = ["usage: a11y <command> [options]", "", "commands:",
+             f"  {'check':<15}check documents with a chosen backend ({', '.join(BACKENDS)})"]
+    lines += [f"  {name:<15}{help_text}" for name, (_, help_text) in COMMANDS.items()]
+    lines.append(f"  {'import-budget':<15}measure start-up time of `a11y check` with the native backend")
+    return '\n'.join(lines)
+
+
+def load_backend(name):
+    """Import the backend module only now and return its check function"""
+    module_name, function = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), function)
+
+
+def run_backend(task):
+    """Worker side of `a11y check`: one document through the chosen backend"""
+    return load_backend(task['backend'])(task['path'])
+
+
+def check(argv):
+    import argparse
+    from deadline_supervisor import QUARANTINE_FILE, Quarantine, Supervisor, WordReaper
+
+    parser = argparse.ArgumentParser(prog='a11y check', description="Check Word documents")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='native',
+                        help="native (any OS), uia (Word + pane scraping) or com (Word only)")
+    parser.add_argument('--report', action='store_true',
+                        help="native backend: also write *_native_accessibility_results.txt next to each document")
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="seconds per document before the worker is killed (default 60 native, 300 Word)")
+    parser.add_argument('--quarantine', default=QUARANTINE_FILE, help="quarantine file")
+    args = parser.parse_args(argv)
+
+    native = args.backend == 'native'
+    deadline = args.deadline or (60.0 if native else 300.0)
+    # The Word backends need absolute paths for Documents.Open
+    tasks = [{'backend': args.backend, 'path': os.path.abspath(path), 'name': path} for path in args.files]
+    failed = 0
+    # One worker: the Word backends all drive the same Word instance
+    with Supervisor(run_backend, 1, deadline, Quarantine(args.quarantine),
+                    on_kill=None if native else WordReaper()) as supervisor:
+        for task, status, results in supervisor.run(tasks):
+            path = task['name']
+            if status != 'ok':
+                print(f"{path}: {results}")
+                failed += 1
+                continue
+            if not native:
+                continue
+            if results is None:
+                failed += 1
+                continue
+            from native_checker import CATEGORIES
+            print(os.path.basename(path))
+            for category, _ in CATEGORIES:
+                print(f"  {results[category]}")
+            if args.report:
+                from results_store import results_file_for, save_results_to_file
+                save_results_to_file(results, results_file_for(path), os.path.basename(path))
+    return 1 if failed else 0
+
+
+def import_budget(argv):
+    """Time a cold import of everything `a11y check` loads, in a fresh interpreter"""
+    import argparse
+    import subprocess
+
+    parser = argparse.ArgumentParser(prog='a11y import-budget')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    probe = (f"import sys, time; t = time.perf_counter(); import {CHECK_MODULES}; "
+             "t = time.perf_counter() - t; "
+             f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]; "
+             "print(t * 1000, ','.join(heavy))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    best_start, best_import, heavy = None, None, ''
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', probe], cwd=here, check=True,
+                             capture_output=True, text=True).stdout.split()
+        elapsed = (time.perf_counter() - start) * 1000
+        best_start = elapsed if best_start is None else min(best_start, elapsed)
+        best_import = float(out[0]) if best_import is None else min(best_import, float(out[0]))
+        heavy = out[1] if len(out) > 1 else ''
+
+    print(f"interpreter start + import: {best_start:.1f} ms, imports alone: {best_import:.1f} ms "
+          f"(budget {args.budget_ms:g} ms)")
+    if heavy:
+        print(f"heavy modules imported at start-up: {heavy}")
+        return 1
+    return 0 if best_start <= args.budget_ms else 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+
+    command, rest = argv[0], argv[1:]
+    if command == 'check':
+        return check(rest)
+    if command == 'import-budget':
+        return import_budget(rest)
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n\n{usage()}")
+        return 2
+    return importlib.import_module(COMMANDS[command][0]).main(rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Pass/fail accessibility gate for CI, upload hooks and git.
+
+Runs the native checker's rules cheapest first and stops at the first
+blocking (error severity) finding, within an overall time budget. Inside the
+check the budget is soft: it is checked between documents, between rules and
+every few hundred paragraphs inside a rule, but reading and parsing a part
+always finishes. Each document is checked in a supervised worker process
+(see deadline_supervisor), and a worker still busy GRACE seconds after the
+budget is killed, so a hung parse cannot hold up a commit or a pipeline.
+
+Exit codes: 0 pass, 1 blocking issue found, 2 unreadable document,
+3 time budget used up before every document was decided.
+
+    python a11y_gate.py report.docx other.docx          # pre-commit / CI
+    python a11y_gate.py --filter < report.docx          # git clean filter
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+from deadline_supervisor import Quarantine, Supervisor
+from native_checker import DocxPackage, LABELS, RULES, evaluate
+
+PASS, FAIL, UNREADABLE, OUT_OF_TIME = 0, 1, 2, 3
+# Seconds past the budget before a worker that has not answered is killed
+GRACE = 1.0
+
+
+def check_gate(source, deadline=None, strict=False):
+    """Gate one document (a path or the package bytes).
+
+    Returns (exit code, one-line reason).
+    """
+    stop_on = ('error', 'warning') if strict else ('error',)
+    try:
+        with DocxPackage(source) as pkg:
+            # Rules that can never block are not worth running here
+            rules = [rule for rule in RULES if rule['severity'] in stop_on]
+            outcome = evaluate(pkg, rules=rules, stop_on=stop_on, deadline=deadline)
+    except (OSError, zipfile.BadZipFile, ET.ParseError) as e:
+        return UNREADABLE, f"unreadable: {e}"
+
+    rule = outcome['blocking']
+    if rule:
+        count = outcome['counts'][rule['category']]
+        return FAIL, f"{LABELS[rule['category']]} - {count} ({rule['severity']})"
+    if outcome['timed_out']:
+        return OUT_OF_TIME, "time budget exceeded before all rules ran"
+    return PASS, "ok"
+
+
+def gate_task(task):
+    """Worker side of the gate: check_gate on a path or on the document's bytes"""
+    return check_gate(task.get('data', task['path']), task['deadline'], task['strict'])
+
+
+def supervised_gate(supervisor, task):
+    """Run one gate task in the supervisor's worker; returns (exit code, one-line reason)"""
+    supervisor.deadline = max(0.0, task['deadline'] - time.monotonic()) + GRACE
+    for _, status, value in supervisor.run([task]):
+        pass
+    if status == 'ok':
+        return value
+    if status == 'error':
+        return UNREADABLE, f"unreadable: {value}"
+    # Killed or crashed: out of time if the budget is gone, otherwise the document broke the checker
+    return (OUT_OF_TIME if time.monotonic() >= task['deadline'] else UNREADABLE), value
+
+
+def is_checkable(path):
+    """Only real .docx files (Word's ~$ lock files are skipped)"""
+    name = os.path.basename(path)
+    return name.lower().endswith('.docx') and not name.startswith('~$')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fast pass/fail Word accessibility gate")
+    parser.add_argument('files', nargs='*', help=".docx files to check")
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help="overall time budget in seconds (default 10); a part being parsed is not "
+                             "interrupted, but a worker still busy a second after the budget is killed")
+    parser.add_argument('--strict', action='store_true',
+                        help="treat warnings (contrast, headings, merged cells) as blocking")
+    parser.add_argument('--keep-going', action='store_true',
+                        help="check every file instead of stopping at the first failure")
+    parser.add_argument('--filter', action='store_true',
+                        help="git clean filter: read the document on stdin and pass it through to stdout")
+    parser.add_argument('--quarantine', default=None,
+                        help="keep documents that hung or crashed the checker in this file, so later runs "
+                             "fail them at once (default: remembered for this run only)")
+    args = parser.parse_args(argv)
+
+    deadline = time.monotonic() + args.budget
+    task = {'deadline': deadline, 'strict': args.strict}
+
+    if args.filter:
+        data = sys.stdin.buffer.read()
+        with Supervisor(gate_task, 1, args.budget + GRACE) as supervisor:
+            code, reason = supervised_gate(supervisor, dict(task, path='<stdin>', data=data))
+        if code == PASS:
+            sys.stdout.buffer.write(data)
+        else:
+            print(f"a11y gate: {reason}", file=sys.stderr)
+        return code
+
+    worst = PASS
+    files = [path for path in args.files if is_checkable(path)]
+    if not files:
+        return worst
+    with Supervisor(gate_task, 1, args.budget + GRACE, Quarantine(args.quarantine)) as supervisor:
+        for path in files:
+            if time.monotonic() > deadline:
+                print(f"{path}: time budget exceeded before check")
+                worst = max(worst, OUT_OF_TIME)
+                break
+            code, reason = supervised_gate(supervisor, dict(task, path=path))
+            if code != PASS:
+                print(f"{path}: {reason}")
+                # A real failure outranks running out of time
+                worst = FAIL if FAIL in (code, worst) else max(worst, code)
+                if code == FAIL and not args.keep_going:
+                    break
+    return worst
+
+
+if __name__ == "__main__":
+    sys.exit(main())
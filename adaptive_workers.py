@@ -0,0 +1,222 @@
+"""Worker count that follows measured throughput, memory and queue depth.
+
+The batch supervisor asks the controller every interval how many workers it
+should run. The controller looks at:
+
+- throughput since the last change: estimated seconds of work finished per
+  second (the batch cost model's 'cost' of each finished task), so a window
+  spent on one huge report and a window of small resumes compare fairly
+- the resident memory (RSS) of every worker, read from the OS
+- how many tasks are still queued
+
+It then decides, in this order:
+
+1. Memory: when the workers' total RSS is over the ceiling, shed enough
+   workers to get under it. Busy workers finish their document first and no
+   new document is started until the pool is down to size. Growth is then
+   held off for a few intervals.
+2. Queue: never run more workers than there are tasks left.
+3. Throughput: with a deep queue, add a worker and compare throughput over
+   the following intervals, once enough tasks have finished to tell. If it
+   improved by at least GAIN, keep it and try another. Otherwise go back and
+   hold for a while. A worker is only added when an average worker's RSS
+   still fits under the ceiling.
+
+Every change is logged with its reason and kept in decisions. A worker
+whose own RSS goes over worker_memory is recycled after its current
+document. This catches parsers that hold on to memory after a huge file.
+"""
+import math
+import os
+import sys
+import time
+
+# Relative throughput gain that justifies keeping an added worker
+GAIN = 0.05
+# Intervals without growth after a failed probe, and after a memory cut
+HOLD_AFTER_PROBE = 5
+HOLD_AFTER_MEMORY = 3
+
+
+def process_rss(pid):
+    """Resident memory of a process in bytes, or None where it cannot be read"""
+    if sys.platform.startswith('linux'):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        # PROCESS_QUERY_LIMITED_INFORMATION | PROCESS_VM_READ
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000 | 0x0010, False, pid)
+        if not handle:
+            return None
+        try:
+            counters = Counters()
+            counters.cb = ctypes.sizeof(counters)
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return None
+            return counters.WorkingSetSize
+        finally:
+            ctypes.windll.kernel32.CloseHandle(handle)
+    return None
+
+
+def physical_memory():
+    """Installed memory in bytes, or None"""
+    if sys.platform == 'win32':
+        import ctypes
+
+        class Status(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong)] + [
+                (name, ctypes.c_ulonglong) for name in (
+                    'ullTotalPhys', 'ullAvailPhys', 'ullTotalPageFile', 'ullAvailPageFile',
+                    'ullTotalVirtual', 'ullAvailVirtual', 'ullAvailExtendedVirtual')]
+
+        status = Status()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class ConcurrencyController:
+    """Decides how many workers a Supervisor runs; see the module docstring"""
+
+    def __init__(self, workers=None, min_workers=1, max_workers=None, memory_limit=None, worker_memory=None,
+                 interval=2.0, log=print):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.workers = max(self.min_workers, min(workers or self.min_workers, self.max_workers))
+        if memory_limit is None:
+            # Leave room for Word, the OS and the parent process
+            total = physical_memory()
+            memory_limit = total * 0.7 if total else None
+        self.memory_limit = memory_limit
+        self.worker_memory = worker_memory
+        self.interval = interval
+        self.log = log
+        self.decisions = []
+
+        self._started = time.monotonic()
+        self._last_tick = self._started
+        # (time, tasks finished, work finished) when the worker count last changed
+        self._window = (self._started, 0, 0.0)
+        self._probe = None
+        self._hold = 0
+        self.peak_rss = 0
+
+    def next_tick(self):
+        """time.monotonic() of the next decision"""
+        return self._last_tick + self.interval
+
+    def update(self, now, completed, work, pids, queued, busy):
+        """New worker count, or None to keep the current one (also None between intervals).
+
+        completed and work are the tasks and the estimated work finished so far.
+        pids are the workers that stay: not those retiring after a cut, whose
+        memory is already accounted for.
+        """
+        if now - self._last_tick < self.interval:
+            return None
+        self._last_tick = now
+        since, completed_before, work_before = self._window
+        elapsed = max(now - since, 1e-9)
+        tasks = (completed - completed_before) / elapsed
+        throughput = (work - work_before) / elapsed
+
+        sizes = [size for size in (process_rss(pid) for pid in pids) if size is not None]
+        rss = sum(sizes)
+        average = rss / len(sizes) if sizes else 0
+        self.peak_rss = max(self.peak_rss, rss)
+        workers, reason = self.workers, None
+
+        if self.memory_limit and rss > self.memory_limit and workers > self.min_workers:
+            cut = max(1, math.ceil((rss - self.memory_limit) / average)) if average else 1
+            workers = max(self.min_workers, workers - cut)
+            reason = "workers' RSS over the ceiling"
+            self._probe, self._hold = None, HOLD_AFTER_MEMORY
+        elif queued + busy < workers:
+            workers = max(self.min_workers, queued + busy)
+            reason = "fewer tasks left than workers"
+            self._probe = None
+        elif self._probe is not None:
+            if completed - completed_before < workers:
+                # Too few tasks finished since the change to tell
+                return None
+            before, added = self._probe
+            self._probe = None
+            if throughput >= before * (1 + GAIN):
+                self._hold = 0
+                reason = f"throughput up {self._change(before, throughput)} with {workers} workers"
+                # The grow branch below may probe further; log this outcome either way
+                self._record(now, workers, workers, reason, tasks, throughput, rss, queued)
+                self._window = (now, completed, work)
+                reason = None
+            else:
+                workers -= added
+                reason = f"throughput {self._change(before, throughput)} with {self.workers} workers, no gain"
+                self._hold = HOLD_AFTER_PROBE
+        elif self._hold:
+            self._hold -= 1
+
+        if (reason is None and not self._hold and queued > workers and workers < self.max_workers
+                and (not self.memory_limit or rss + average <= self.memory_limit)):
+            self._probe = (throughput, 1)
+            workers += 1
+            reason = "probing: queue is deep and memory allows another worker"
+
+        if workers == self.workers:
+            return None
+        self._record(now, self.workers, workers, reason, tasks, throughput, rss, queued)
+        self.workers = workers
+        self._window = (now, completed, work)
+        return workers
+
+    @staticmethod
+    def _change(before, after):
+        if not before:
+            return "from 0"
+        return f"{(after - before) / before * 100:+.0f}%"
+
+    def _record(self, now, old, new, reason, tasks, throughput, rss, queued):
+        decision = {'time': now - self._started, 'from': old, 'to': new, 'reason': reason,
+                    'tasks': tasks, 'throughput': throughput, 'rss': rss, 'queued': queued}
+        self.decisions.append(decision)
+        if self.log:
+            self.log(format_decision(decision, self.memory_limit))
+
+    def recycle(self, pid):
+        """Whether a worker that just finished a task has grown past worker_memory"""
+        if not self.worker_memory:
+            return False
+        rss = process_rss(pid)
+        if rss is None or rss <= self.worker_memory:
+            return False
+        if self.log:
+            self.log(f"[workers] recycling worker {pid}: RSS {rss / 1e6:.0f} MB over "
+                     f"{self.worker_memory / 1e6:.0f} MB")
+        return True
+
+
+def format_decision(decision, memory_limit=None):
+    """'[workers  12.0s] 4 -> 5: probing ... (31.5 tasks/s, work rate 2.40, RSS 820 of 4000 MB, 120 queued)'"""
+    ceiling = f" of {memory_limit / 1e6:.0f}" if memory_limit else ""
+    change = (f"{decision['from']} -> {decision['to']}" if decision['from'] != decision['to']
+              else f"stay at {decision['to']}")
+    return (f"[workers {decision['time']:6.1f}s] {change}: {decision['reason']} "
+            f"({decision['tasks']:.1f} tasks/s, work rate {decision['throughput']:.2f}, RSS {decision['rss'] / 1e6:.0f}{ceiling} MB, "
+            f"{decision['queued']} queued)")
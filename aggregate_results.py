@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Corpus-level totals and trends from the results index.
+
+Each document counts once, with its most recent result as of the reporting
+date. Totals are grouped by folder, author and category, and the weekly
+trend shows how the totals changed week over week. The grouping runs as SQL
+GROUP BY inside SQLite, so the rows are never loaded into Python one by one.
+
+    python aggregate_results.py --db a11y_results.db --under /shared/docs/Finance
+    python aggregate_results.py --import /shared/docs     # index existing text reports
+"""
+import argparse
+import os
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+from native_checker import CATEGORIES, DocxPackage, document_author
+from results_store import DEFAULT_DB, ResultsStore, load_results_file
+
+# Paths under a folder are a range of strings: folder + sep up to (not
+# including) folder + the character after sep. Unlike LIKE, the comparison is
+# exact: no wildcards, case-sensitive, and /docs/Finance2 is not in /docs/Finance.
+LATEST_AS_OF = """
+    SELECT * FROM results WHERE id IN (
+        SELECT MAX(id) FROM results WHERE checked_at < :as_of
+            AND (:folder IS NULL OR path = :folder OR (path >= :prefix AND path < :beyond))
+        GROUP BY path)
+"""
+
+
+def folder_range(under):
+    """LATEST_AS_OF parameters that select the paths under a folder (every path when under is empty)"""
+    if not under:
+        return {'folder': None, 'prefix': None, 'beyond': None}
+    folder = os.path.abspath(under)
+    prefix = folder if folder.endswith(os.sep) else folder + os.sep
+    return {'folder': folder, 'prefix': prefix, 'beyond': prefix[:-1] + chr(ord(os.sep) + 1)}
+
+
+def category_sums():
+    return ', '.join(f'COALESCE(SUM("{c}"), 0)' for c, _ in CATEGORIES)
+
+
+class Snapshot:
+    """Latest result per document as of a date, materialised once for several group-bys.
+
+    under limits it to the documents in a folder (and its subfolders).
+    """
+
+    count = 0
+
+    def __init__(self, store, as_of, under=''):
+        Snapshot.count += 1
+        self.conn = store.conn
+        self.table = f"snapshot_{Snapshot.count}"
+        self.conn.execute(f"CREATE TEMP TABLE {self.table} AS {LATEST_AS_OF}",
+                          dict(folder_range(under), as_of=as_of))
+
+    def totals(self):
+        """[documents, per-category totals...] over the whole snapshot"""
+        return list(self.conn.execute(f"SELECT COUNT(*), {category_sums()} FROM {self.table}").fetchone())
+
+    def totals_by(self, column):
+        """{group: [documents, per-category totals...]}"""
+        rows = self.conn.execute(
+            f"SELECT {column}, COUNT(*), {category_sums()} FROM {self.table} GROUP BY {column}")
+        return {row[0]: list(row[1:]) for row in rows}
+
+
+def week_starts(end, weeks):
+    """Monday 00:00 of each of the last `weeks` weeks, oldest first"""
+    monday = datetime(end.year, end.month, end.day) - timedelta(days=end.weekday())
+    return [monday - timedelta(weeks=i) for i in reversed(range(weeks))]
+
+
+def report_author(doc_path):
+    """Author from docProps/core.xml of the document a report sits next to, or None"""
+    if not os.path.exists(doc_path):
+        return None
+    try:
+        with DocxPackage(doc_path) as pkg:
+            return None if pkg.encrypted else document_author(pkg)
+    except (OSError, zipfile.BadZipFile, ET.ParseError):
+        return None
+
+
+def import_reports(store, folder):
+    """Index the *_accessibility_results.txt reports under folder (skips ones already indexed)"""
+    imported = 0
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if not name.endswith('_accessibility_results.txt'):
+                continue
+            results = load_results_file(os.path.join(root, name))
+            if not results['document'] or not results['timestamp']:
+                continue
+            doc_path = os.path.abspath(os.path.join(root, results['document']))
+            seen = store.conn.execute(
+                "SELECT 1 FROM results WHERE path = ? AND checked_at = ?",
+                (doc_path, results['timestamp'])).fetchone()
+            if not seen:
+                results['author'] = report_author(doc_path)
+                store.record(doc_path, results, backend='report')
+                imported += 1
+    return imported
+
+
+def format_row(label, values, previous=None, width=40):
+    cells = []
+    for i, value in enumerate(values):
+        cell = str(value)
+        if previous is not None:
+            delta = value - previous[i]
+            cell += f" ({delta:+d})" if delta else ""
+        cells.append(cell.rjust(16))
+    return f"{str(label)[:width].ljust(width)}{''.join(cells)}"
+
+
+def render_summary(store, under='', weeks=4, top=20, now=None):
+    """Build the summary report as a list of lines"""
+    now = now or datetime.now()
+    as_of = now.isoformat()
+    week_ago = (now - timedelta(weeks=1)).isoformat()
+    header = format_row('', ['documents'] + [c for c, _ in CATEGORIES])
+
+    lines = ["Accessibility summary", "=" * 50, f"As of: {as_of[:19]}", ""]
+
+    current = Snapshot(store, as_of, under)
+    previous = Snapshot(store, week_ago, under)
+    lines += ["Totals (change since a week ago)", "-" * 20, header,
+              format_row('all documents', current.totals(), previous.totals()), ""]
+
+    for title, column in (("By folder", 'folder'), ("By author", 'author')):
+        groups = current.totals_by(column)
+        before = previous.totals_by(column)
+        # Largest issue totals first
+        ranked = sorted(groups.items(), key=lambda item: -sum(item[1][1:]))[:top]
+        lines += [title, "-" * 20, header]
+        for group, values in ranked:
+            lines.append(format_row(group or '(unknown)', values, before.get(group, [0] * len(values))))
+        if len(groups) > top:
+            lines.append(f"... {len(groups) - top} more")
+        lines.append("")
+
+    lines += ["Weekly trend (state at the start of each week)", "-" * 20, header]
+    previous = None
+    for start in week_starts(now, weeks):
+        values = Snapshot(store, start.isoformat(), under).totals()
+        lines.append(format_row(f"week of {start:%Y-%m-%d}", values, previous))
+        previous = values
+    lines.append(format_row('now', current.totals(), previous))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise stored accessibility results")
+    parser.add_argument('--db', default=DEFAULT_DB, help="results index (SQLite file)")
+    parser.add_argument('--under', default='', help="only documents under this folder (e.g. a department)")
+    parser.add_argument('--weeks', type=int, default=4, help="weeks of trend to show")
+    parser.add_argument('--top', type=int, default=20, help="rows to show per folder/author table")
+    parser.add_argument('--import', dest='import_dir',
+                        help="first index the *_accessibility_results.txt reports under this folder")
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        if args.import_dir:
+            print(f"Imported {import_reports(store, args.import_dir)} reports")
+        print('\n'.join(render_summary(store, args.under, args.weeks, args.top)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
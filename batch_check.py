@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Check many documents in parallel with the native engine.
+
+Each document's cost is estimated from the zip central directory alone
+(uncompressed story part sizes and media count, no decompression). Tables
+are not counted: a table costs the rules about the same per byte of XML as
+paragraphs do, so counting them would mean inflating every document.xml for
+no better estimate. Work is
+dispatched most expensive first, so one huge report does not hold up the tail
+of the run. Very large documents are split by story part: the main
+document, and big headers, footers and notes, each become their own task.
+At the end the achieved makespan is compared with naive FIFO ordering.
+
+    python batch_check.py corpus/ --workers 8 --db a11y_results.db
+"""
+import argparse
+import heapq
+import os
+import re
+import sys
+import time
+import zipfile
+
+from a11y_gate import is_checkable
+from deadline_supervisor import QUARANTINE_FILE, Quarantine, Supervisor
+from native_checker import CATEGORIES, RULES, DocxPackage, document_author, evaluate, format_results
+
+# Rough cost model in seconds, fitted on ConflictDoc.docx (0.9 MB document.xml, ~30 ms)
+SECONDS_PER_XML_BYTE = 3e-8
+SECONDS_PER_MEDIA = 1e-4
+SECONDS_PER_DOCUMENT = 2e-3
+
+MAIN_PART = 'word/document.xml'
+STORY_PART = re.compile(r'word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+
+
+def find_documents(inputs):
+    """Expand files and folders into the list of checkable documents, in input order"""
+    documents = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                documents.extend(os.path.join(root, name) for name in sorted(files)
+                                 if is_checkable(name))
+        elif is_checkable(item):
+            documents.append(item)
+    return documents
+
+
+def estimate_cost(path):
+    """Estimated seconds to check a document, plus per-story estimates, from zip metadata only"""
+    stories = {}
+    media = 0
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if STORY_PART.match(info.filename):
+                    stories[info.filename] = info.file_size * SECONDS_PER_XML_BYTE
+                elif info.filename.startswith('word/media/'):
+                    media += 1
+    except (OSError, zipfile.BadZipFile):
+        # Encrypted or unreadable: the checker gives up almost immediately
+        pass
+    total = SECONDS_PER_DOCUMENT + media * SECONDS_PER_MEDIA + sum(stories.values())
+    return total, stories
+
+
+def plan_tasks(documents, split_above=1.0, order='cost'):
+    """Turn documents into tasks, splitting large ones by story part, most expensive first"""
+    tasks = []
+    for index, path in enumerate(documents):
+        cost, stories = estimate_cost(path)
+        if cost < split_above or MAIN_PART not in stories or len(stories) < 2:
+            tasks.append({'path': path, 'index': index, 'stories': None, 'package': True, 'cost': cost})
+            continue
+        # Parts big enough to be worth their own worker; the rest stay with the main part
+        main = [MAIN_PART]
+        main_cost = cost - sum(stories.values()) + stories[MAIN_PART]
+        for name, part_cost in stories.items():
+            if name == MAIN_PART:
+                continue
+            if part_cost >= split_above / 10:
+                tasks.append({'path': path, 'index': index, 'stories': [name], 'package': False,
+                              'cost': part_cost, 'part': name})
+            else:
+                main.append(name)
+                main_cost += part_cost
+        tasks.append({'path': path, 'index': index, 'stories': main, 'package': True, 'cost': main_cost,
+                      'part': MAIN_PART})
+
+    if order == 'cost':
+        tasks.sort(key=lambda task: -task['cost'])
+    else:
+        tasks.sort(key=lambda task: task['index'])
+    for seq, task in enumerate(tasks):
+        task['seq'] = seq
+    return tasks
+
+
+def run_task(task):
+    """Worker: check one document (or some of its story parts)"""
+    if task.get('profile'):
+        from doc_profiler import profile_call
+        return profile_call(_run_task, task)
+    return _run_task(task)
+
+
+def _run_task(task):
+    start = time.perf_counter()
+    result = dict(task, counts={}, author=None, error=None, locations=None)
+    try:
+        with DocxPackage(task['path'], stories=task['stories']) as pkg:
+            rules = RULES if task['package'] else [r for r in RULES if r['scope'] == 'story']
+            outcome = evaluate(pkg, rules, locate=task.get('locate', False))
+            result['counts'] = outcome['counts']
+            if task['package']:
+                result['author'] = document_author(pkg)
+            if task.get('locate'):
+                from issue_locations import build_index
+                result['locations'] = build_index(pkg, outcome['found'])
+            if task.get('ir_cache') and task['stories'] is None:
+                # So a later `a11y revision` finds this version (see revision_check)
+                from doc_ir import IRCache
+                from results_store import file_digest
+                IRCache(task['ir_cache']).add(pkg, file_digest(task['path']))
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def simulate_makespan(durations, workers):
+    """Makespan of list scheduling: each job goes to whichever worker frees up first"""
+    finish = [0.0] * workers
+    for duration in durations:
+        heapq.heappush(finish, heapq.heappop(finish) + duration)
+    return max(finish) if durations else 0.0
+
+
+def merge_results(task_results):
+    """Combine split tasks back into one entry per document"""
+    merged = {}
+    for result in task_results:
+        doc = merged.setdefault(result['path'], {'index': result['index'], 'counts': {}, 'author': None,
+                                                 'elapsed': 0.0, 'error': None, 'locations': []})
+        doc['elapsed'] += result['elapsed']
+        doc['error'] = doc['error'] or result['error']
+        doc['author'] = doc['author'] or result['author']
+        for category, count in result['counts'].items():
+            doc['counts'][category] = doc['counts'].get(category, 0) + count
+        if result.get('locations'):
+            doc['locations'].append(result['locations'])
+    for doc in merged.values():
+        if doc['locations']:
+            from issue_locations import merge_indexes
+            doc['locations'] = merge_indexes(doc['locations'])
+        else:
+            doc['locations'] = None
+    return merged
+
+
+def run_batch(documents, workers=None, split_above=1.0, order='cost', on_result=None, locate=False,
+              deadline=120.0, quarantine=None, profile_rate=0.0, controller=None, ir_cache=None):
+    """Check documents in supervised worker processes; returns (merged results, stats).
+
+    A task running longer than deadline seconds has its worker killed and
+    goes to the quarantine (see deadline_supervisor). A profile_rate fraction
+    of documents is checked under the profiler (see doc_profiler). With a
+    controller (see adaptive_workers), the worker count follows throughput,
+    memory and queue depth, and workers is ignored. With ir_cache, the IR of
+    every document that is not split is cached in that folder (see doc_ir).
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = plan_tasks(documents, split_above, order)
+    if profile_rate:
+        from doc_profiler import sampled
+    for task in tasks:
+        task['locate'] = locate
+        task['ir_cache'] = ir_cache
+        task['profile'] = bool(profile_rate) and sampled(task['path'], profile_rate)
+
+    start = time.perf_counter()
+    task_results = []
+    with Supervisor(run_task, workers, deadline, quarantine, controller=controller) as supervisor:
+        for task, status, value in supervisor.run(tasks):
+            if status == 'ok':
+                result = value
+            else:
+                result = dict(task, counts={}, author=None, error=value, locations=None,
+                              elapsed=deadline if status == 'quarantined' else 0.0)
+            task_results.append(result)
+            if on_result:
+                on_result(result)
+        killed, recycled, workers = supervisor.killed, supervisor.recycled, supervisor.peak_workers
+    makespan = time.perf_counter() - start
+
+    merged = merge_results(task_results)
+    # What the same work would have taken in input order, unsplit
+    fifo = [doc['elapsed'] for doc in sorted(merged.values(), key=lambda doc: doc['index'])]
+    stats = {
+        'documents': len(merged),
+        'tasks': len(tasks),
+        'workers': workers,
+        'killed': killed,
+        'recycled': recycled,
+        'scaling': controller.decisions if controller is not None else None,
+        'peak_rss': controller.peak_rss if controller is not None else None,
+        'makespan': makespan,
+        'busy': sum(r['elapsed'] for r in task_results),
+        'fifo_estimate': simulate_makespan(fifo, workers),
+        'planned_estimate': simulate_makespan(
+            [r['elapsed'] for r in sorted(task_results, key=lambda r: r['seq'])], workers),
+    }
+    return merged, stats
+
+
+def format_stats(stats):
+    lower_bound = stats['busy'] / stats['workers']
+    killed = f", stuck workers replaced: {stats['killed']}" if stats['killed'] else ""
+    adaptive = ""
+    if stats['scaling'] is not None:
+        peak = f", peak worker RSS {stats['peak_rss'] / 1e6:.0f} MB" if stats['peak_rss'] else ""
+        adaptive = f" (at most; {len(stats['scaling'])} scaling decisions, {stats['recycled']} recycled{peak})"
+    return (f"Checked {stats['documents']} documents as {stats['tasks']} tasks on {stats['workers']} workers"
+            f"{adaptive}{killed}\n"
+            f"  makespan {stats['makespan']:.2f}s (work {stats['busy']:.2f}s, ideal {lower_bound:.2f}s)\n"
+            f"  with the same durations: this order {stats['planned_estimate']:.2f}s, "
+            f"FIFO {stats['fifo_estimate']:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check many Word documents in parallel")
+    parser.add_argument('inputs', nargs='+', help="documents or folders")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: CPU count; with --adaptive, the starting count)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="adjust the worker count from throughput, worker memory and queue depth")
+    parser.add_argument('--min-workers', type=int, default=1, help="with --adaptive, never fewer workers")
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help="with --adaptive, never more workers (default: CPU count)")
+    parser.add_argument('--memory-limit', type=float, default=None, metavar='MB',
+                        help="with --adaptive, total worker RSS to stay under (default: 70%% of RAM)")
+    parser.add_argument('--worker-memory', type=float, default=None, metavar='MB',
+                        help="with --adaptive, recycle a worker after its document once its RSS is above this")
+    parser.add_argument('--adapt-every', type=float, default=2.0, metavar='SECONDS',
+                        help="with --adaptive, seconds between scaling decisions")
+    parser.add_argument('--order', choices=('cost', 'fifo'), default='cost',
+                        help="dispatch most expensive first (default) or in input order")
+    parser.add_argument('--split-above', type=float, default=1.0,
+                        help="split documents estimated to take longer than this many seconds")
+    parser.add_argument('--db', default=None, help="record results in this results index")
+    parser.add_argument('--reports', action='store_true',
+                        help="write *_native_accessibility_results.txt next to each document")
+    parser.add_argument('--locations', action='store_true',
+                        help="store where each issue is with the results (needs --db)")
+    parser.add_argument('--ir-cache', default=None, metavar='FOLDER',
+                        help="also cache each document's IR here, so `a11y revision` can compare later "
+                             "versions with this one (documents split by part are left out)")
+    parser.add_argument('--deadline', type=float, default=120.0,
+                        help="seconds a document may take before its worker is killed and it is quarantined")
+    parser.add_argument('--quarantine', default=QUARANTINE_FILE, help="quarantine file")
+    parser.add_argument('--profile-sample', type=float, default=0.0, metavar='FRACTION',
+                        help="profile this fraction of documents (cProfile + tracemalloc) and report the worst")
+    parser.add_argument('--profile-keep', type=int, default=10, help="documents kept in the profile report")
+    parser.add_argument('--profile-dir', default=None, help="save the kept profiles here as .prof files")
+    args = parser.parse_args(argv)
+    if args.locations and not args.db:
+        parser.error("--locations needs --db")
+
+    documents = find_documents(args.inputs)
+    if not documents:
+        print("No documents found")
+        return 1
+
+    report = None
+    if args.profile_sample:
+        from doc_profiler import ProfileReport
+        report = ProfileReport(args.profile_keep)
+    controller = None
+    if args.adaptive:
+        from adaptive_workers import ConcurrencyController
+        controller = ConcurrencyController(
+            args.workers, args.min_workers, args.max_workers,
+            memory_limit=args.memory_limit * 1e6 if args.memory_limit else None,
+            worker_memory=args.worker_memory * 1e6 if args.worker_memory else None,
+            interval=args.adapt_every)
+    merged, stats = run_batch(documents, args.workers, args.split_above, args.order,
+                              on_result=report.add if report else None,
+                              locate=args.locations, deadline=args.deadline,
+                              quarantine=Quarantine(args.quarantine), profile_rate=args.profile_sample,
+                              controller=controller, ir_cache=args.ir_cache)
+
+    store = None
+    if args.db or args.reports:
+        from results_store import ResultsStore, file_digest, results_file_for, save_results_to_file
+        store = ResultsStore(args.db) if args.db else None
+
+    failed = 0
+    for path, doc in merged.items():
+        if doc['error']:
+            print(f"{path}: {doc['error']}")
+            failed += 1
+            continue
+        if store is None and not args.reports:
+            continue
+        results = format_results(doc['counts'])
+        results['author'] = doc['author']
+        results['locations'] = doc['locations']
+        if store:
+            store.record(path, results, digest=file_digest(path), elapsed=doc['elapsed'])
+        if args.reports:
+            save_results_to_file(results, results_file_for(path), os.path.basename(path))
+    if store:
+        store.close()
+
+    totals = {category: sum(doc['counts'].get(category, 0) for doc in merged.values())
+              for category, _ in CATEGORIES}
+    print(', '.join(f"{category} {count}" for category, count in totals.items()))
+    print(format_stats(stats))
+    if report:
+        print()
+        print('\n'.join(report.render()))
+        if args.profile_dir:
+            print(f"Saved {len(report.save(args.profile_dir))} profiles to {args.profile_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""Run documents through a checker backend under a hard per-document deadline.
+
+Each worker is a process of its own with a private pipe. The supervisor
+knows when every worker started its current document. A worker that goes
+past the deadline, for example on a hung Documents.Open or an endless UIA
+search, is killed and replaced. A worker that dies is replaced too. Its
+document goes into the quarantine and is retried with exponential backoff.
+After max_attempts the document stays quarantined and is skipped until
+someone releases it, so one bad file cannot stall a batch.
+
+The quarantine is a small JSON file, so it survives between runs. It is
+keyed by document, or by document and part for tasks that check one part of
+a split document (a task's optional 'part'), so the parts of one document
+keep their own attempts and backoff.
+
+With a controller (see adaptive_workers) the number of workers changes during
+the run. Extra workers are started at once. Workers that are no longer
+wanted are retired when they finish their current document.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+
+QUARANTINE_FILE = 'a11y_quarantine.json'
+# Between a document's path and a part name in quarantine keys
+PART_SEPARATOR = '#'
+
+
+def quarantine_key(path, part=None):
+    key = os.path.abspath(path)
+    return f"{key}{PART_SEPARATOR}{part}" if part else key
+
+
+class Quarantine:
+    """Documents that timed out or crashed their worker, and when to try them again"""
+
+    def __init__(self, filename=QUARANTINE_FILE, backoff=30.0, max_attempts=3):
+        self.filename = filename
+        self.backoff = backoff
+        self.max_attempts = max_attempts
+        self.entries = {}
+        if filename and os.path.exists(filename):
+            with open(filename, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def retry_at(self, path, part=None):
+        """When path may be tried again: None if it is not quarantined, inf once it has used up its attempts"""
+        entry = self.entries.get(quarantine_key(path, part))
+        if entry is None:
+            return None
+        if entry['attempts'] >= self.max_attempts:
+            return float('inf')
+        return entry['retry_at']
+
+    def add(self, path, reason, part=None):
+        """Record a failed attempt; returns when the document may be retried (inf for never)"""
+        entry = self.entries.setdefault(quarantine_key(path, part), {'attempts': 0})
+        entry['attempts'] += 1
+        entry['reason'] = reason
+        entry['retry_at'] = time.time() + self.backoff * 2 ** (entry['attempts'] - 1)
+        self.save()
+        return self.retry_at(path, part)
+
+    def release(self, path, part=None):
+        """Let a part be tried again, or without a part the whole document and all of its parts"""
+        key = quarantine_key(path, part)
+        keys = [k for k in self.entries if k == key or not part and k.startswith(key + PART_SEPARATOR)]
+        for key in keys:
+            del self.entries[key]
+        if keys:
+            self.save()
+
+    def save(self):
+        if not self.filename:
+            return
+        # Replace the file in one step so an interrupted run cannot truncate it
+        folder = os.path.dirname(os.path.abspath(self.filename))
+        fd, temp = tempfile.mkstemp(suffix='.json', dir=folder)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(temp, self.filename)
+
+
+def _worker(conn, target):
+    """Worker process: run target on every task received until told to stop"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            outcome = ('ok', target(task))
+        except Exception as e:
+            outcome = ('error', f"{type(e).__name__}: {e}")
+        conn.send(outcome)
+
+
+class WordReaper:
+    """Kills Word processes started after the snapshot (Windows).
+
+    Killing a worker does not end the WINWORD.EXE it was driving over COM,
+    and a hung Word would block the next worker's Dispatch as well.
+    """
+
+    def __init__(self):
+        self.known = self.word_processes()
+
+    @staticmethod
+    def word_processes():
+        if sys.platform != 'win32':
+            return set()
+        out = subprocess.run(['tasklist', '/FI', 'IMAGENAME eq WINWORD.EXE', '/FO', 'CSV', '/NH'],
+                             capture_output=True, text=True).stdout
+        return {int(line.split('","')[1]) for line in out.splitlines() if line.startswith('"WINWORD')}
+
+    def __call__(self):
+        for pid in self.word_processes() - self.known:
+            subprocess.run(['taskkill', '/PID', str(pid), '/F'], capture_output=True)
+
+
+class Supervisor:
+    """Runs target(task) in worker processes, one task at a time each, with a deadline per task"""
+
+    def __init__(self, target, workers=1, deadline=120.0, quarantine=None, on_kill=None, controller=None):
+        self.target = target
+        self.deadline = deadline
+        self.quarantine = quarantine if quarantine is not None else Quarantine(None)
+        self.on_kill = on_kill
+        self.controller = controller
+        if controller is not None:
+            workers = controller.workers
+        self.slots = [self._spawn() for _ in range(workers)]
+        self.peak_workers = workers
+        self.killed = 0
+        self.recycled = 0
+        self.completed = 0
+        # Sum of the finished tasks' 'cost' estimates (1 per task without one)
+        self.work_done = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spawn(self):
+        parent, child = Pipe()
+        process = Process(target=_worker, args=(child, self.target), daemon=True)
+        process.start()
+        child.close()
+        return {'process': process, 'conn': parent, 'task': None, 'started': None, 'retiring': False}
+
+    def _replace(self, slot):
+        slot['process'].kill()
+        slot['process'].join()
+        slot['conn'].close()
+        if self.on_kill:
+            self.on_kill()
+        self.killed += 1
+        if slot['retiring']:
+            self.slots.remove(slot)
+        else:
+            slot.update(self._spawn())
+
+    def _stop(self, slot):
+        """Let an idle worker exit"""
+        try:
+            slot['conn'].send(None)
+        except OSError:
+            pass
+        slot['conn'].close()
+        slot['process'].join(timeout=5)
+        if slot['process'].is_alive():
+            slot['process'].kill()
+            slot['process'].join()
+
+    def resize(self, workers):
+        """Run this many workers: start new ones now, retire surplus ones as they become idle"""
+        active = [slot for slot in self.slots if not slot['retiring']]
+        for _ in range(workers - len(active)):
+            self.slots.append(self._spawn())
+        # Idle workers go first, so no document is held up
+        for slot in sorted(active, key=lambda slot: slot['task'] is not None)[:max(0, len(active) - workers)]:
+            slot['retiring'] = True
+        self._retire_idle()
+        self.peak_workers = max(self.peak_workers, workers)
+
+    def _retire_idle(self):
+        for slot in [slot for slot in self.slots if slot['retiring'] and slot['task'] is None]:
+            self._stop(slot)
+            self.slots.remove(slot)
+
+    def close(self):
+        for slot in self.slots:
+            try:
+                slot['conn'].send(None)
+            except OSError:
+                pass
+            slot['conn'].close()
+        for slot in self.slots:
+            slot['process'].join(timeout=5)
+            if slot['process'].is_alive():
+                slot['process'].kill()
+                slot['process'].join()
+
+    def run(self, tasks):
+        """Yield (task, status, value) as tasks finish, in completion order.
+
+        Tasks are dicts with a 'path' and, when they check only part of a
+        document, a 'part' naming it. status is 'ok' (value is target's return value), 'error' (the target
+        raised; value is the message) or 'quarantined' (timed out or crashed
+        its worker; value says why). A quarantined document is retried in
+        the same run if its backoff ends while other documents are still
+        being checked, otherwise in a later run.
+        """
+        pending = deque()
+        backing_off = []
+        for task in tasks:
+            retry_at = self.quarantine.retry_at(task['path'], task.get('part'))
+            if retry_at is None:
+                pending.append(task)
+            elif retry_at == float('inf'):
+                yield task, 'quarantined', self._why(task)
+            else:
+                # Still backing off from an earlier run
+                backing_off.append((retry_at, task))
+
+        while pending or backing_off or any(slot['task'] for slot in self.slots):
+            if self.controller is not None:
+                busy = [slot for slot in self.slots if slot['task'] is not None]
+                # Retiring workers are already cut; counting their RSS again would cut again every tick
+                workers = self.controller.update(time.monotonic(), self.completed, self.work_done,
+                                                 [slot['process'].pid for slot in self.slots if not slot['retiring']],
+                                                 len(pending), len(busy))
+                if workers is not None:
+                    self.resize(workers)
+            self._retire_idle()
+
+            now = time.time()
+            for item in [item for item in backing_off if item[0] <= now]:
+                backing_off.remove(item)
+                pending.append(item[1])
+            if not pending and not any(slot['task'] for slot in self.slots):
+                # Only backoff waits left: leave those documents to a later run
+                for _, task in backing_off:
+                    yield task, 'quarantined', self._why(task)
+                break
+
+            for slot in self.slots:
+                if slot['task'] is None and not slot['retiring'] and pending:
+                    slot['task'], slot['started'] = pending.popleft(), time.monotonic()
+                    slot['conn'].send(slot['task'])
+
+            busy = [slot for slot in self.slots if slot['task'] is not None]
+            timeouts = [slot['started'] + self.deadline - time.monotonic() for slot in busy]
+            timeouts += [retry_at - now for retry_at, _ in backing_off]
+            if self.controller is not None:
+                timeouts.append(self.controller.next_tick() - time.monotonic())
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+
+            ready = wait([slot['conn'] for slot in busy], timeout)
+            for slot in busy:
+                task = slot['task']
+                if slot['conn'] in ready:
+                    try:
+                        status, value = slot['conn'].recv()
+                    except (EOFError, OSError):
+                        # The worker died (crashed in a native library, or was killed from outside)
+                        failure = f"worker exited with code {slot['process'].exitcode}"
+                        self._replace(slot)
+                    else:
+                        slot['task'] = None
+                        self.completed += 1
+                        self.work_done += task.get('cost', 1.0)
+                        if status == 'ok':
+                            self.quarantine.release(task['path'], task.get('part'))
+                        if (self.controller is not None and not slot['retiring']
+                                and self.controller.recycle(slot['process'].pid)):
+                            self._stop(slot)
+                            slot.update(self._spawn())
+                            self.recycled += 1
+                        yield task, status, value
+                        continue
+                elif time.monotonic() - slot['started'] > self.deadline:
+                    failure = f"timed out after {self.deadline:g}s"
+                    self._replace(slot)
+                else:
+                    continue
+
+                slot['task'] = None
+                retry_at = self.quarantine.add(task['path'], failure, task.get('part'))
+                if retry_at == float('inf'):
+                    yield task, 'quarantined', self._why(task)
+                else:
+                    backing_off.append((retry_at, task))
+
+    def _why(self, task):
+        entry = self.quarantine.entries[quarantine_key(task['path'], task.get('part'))]
+        if entry['attempts'] >= self.quarantine.max_attempts:
+            return f"quarantined after {entry['attempts']} attempts ({entry['reason']})"
+        wait_for = max(0, entry['retry_at'] - time.time())
+        return f"quarantined, retry in {wait_for:.0f}s ({entry['reason']})"
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show or clear the quarantine of documents that hung or crashed")
+    parser.add_argument('--file', default=QUARANTINE_FILE, help="quarantine file")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="quarantined documents, attempts and reason")
+    release = sub.add_parser('release', help="let documents be checked again")
+    release.add_argument('paths', nargs='*', help="documents to release, with all their parts (default: all)")
+    args = parser.parse_args(argv)
+
+    quarantine = Quarantine(args.file)
+    if args.command == 'list':
+        now = time.time()
+        for path, entry in sorted(quarantine.entries.items()):
+            if entry['attempts'] >= quarantine.max_attempts:
+                when = "gave up"
+            else:
+                when = f"retry in {max(0, entry['retry_at'] - now):.0f}s"
+            print(f"{path}: {entry['attempts']} attempts, {when} ({entry['reason']})")
+        print(f"{len(quarantine.entries)} quarantined")
+    else:
+        for path in args.paths or list(quarantine.entries):
+            quarantine.release(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
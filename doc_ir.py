@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""Compact intermediate document model, cached per document content.
+
+The parse stage (extract) reads a package once and records what the rules
+look at:
+
+- runs: columns of text length, style and direct formatting
+- paragraphs: style, outline level, shading, w14:paraId and a text hash
+- tables, with a cell grid of spans and vertical merges
+- drawings
+- tracked changes: whether a run, paragraph mark, drawing or table row was
+  inserted, deleted or re-formatted (deleted runs are recorded, but the rules
+  skip them as the XML rules do)
+- styles and package facts
+
+IR_RULES compute the same counts as the native checker's XML rules, from the
+IR alone. The IR is stored in a small binary format: typed little-endian
+column arrays plus a string table, keyed by the document digest and
+IR_VERSION, and ends with a CRC-32 of everything before it. A cache file that
+is truncated, corrupt or of another version is a cache miss. Changing a rule
+therefore only means re-evaluating the cached IR; the corpus is not unzipped
+and parsed again. Bump IR_VERSION whenever extract records something new or
+differently.
+
+    python doc_ir.py corpus/ --cache .a11y_ir             # builds the cache on the first run
+    python doc_ir.py corpus/ --cache .a11y_ir --verify    # compare with the XML rules
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+
+from bisect import bisect_left, bisect_right
+
+from native_checker import (CATEGORIES, HIGHLIGHT_COLORS, RUN_CONTAINERS, W, WP, ADEC, DocxPackage, StyleIndex,
+                            _rpr_props, _shading, _val, contrast_ratio, document_author, iter_paragraphs,
+                            run_text)
+
+IR_VERSION = 3
+# $A11Y_IR_CACHE, else .a11y_ir in the current folder
+IR_CACHE = os.environ.get('A11Y_IR_CACHE') or '.a11y_ir'
+MAGIC = b'A11YIR\0'
+W14_PARA_ID = '{http://schemas.microsoft.com/office/word/2010/wordml}paraId'
+
+# revision column of runs and drawings
+INSERTED, DELETED, FORMATTED = 1, 2, 3
+# revision flags of paragraphs (their mark) and tables (their rows)
+MARK_INSERTED, MARK_DELETED, PROPERTIES_CHANGED = 1, 2, 4
+REVISION_MARKS = {W + 'ins': INSERTED, W + 'del': DELETED}
+
+# table -> [(column, typecode)]; 's' columns hold string table indexes (-1 = None)
+SCHEMA = {
+    'parts': [('name', 's'), ('background', 's')],
+    'paragraphs': [('part', 'i'), ('style', 's'), ('outline', 'b'), ('fill', 's'), ('cell_fill', 's'),
+                   ('para_id', 'I'), ('text_hash', 'I'), ('revision', 'B')],
+    'runs': [('paragraph', 'i'), ('length', 'i'), ('blank', 'B'), ('style', 's'), ('color', 's'),
+             ('size', 'h'), ('bold', 'b'), ('highlight', 's'), ('shading', 's'), ('revision', 'B')],
+    'drawings': [('part', 'i'), ('paragraph', 'i'), ('descr', 's'), ('decorative', 'B'), ('revision', 'B')],
+    'tables': [('part', 'i'), ('paragraph', 'i'), ('rows', 'i'), ('tbl_header', 'B'), ('look_first_row', 'b'),
+               ('revision', 'B')],
+    'cells': [('table', 'i'), ('row', 'i'), ('cells_in_row', 'h'), ('grid_span', 'h'), ('v_merge', 'B')],
+}
+
+SECTION = struct.Struct('<HcI')
+CHECKSUM = struct.Struct('<I')
+
+
+class DocumentIR:
+    """Columnar tables plus package facts ('meta') for one document"""
+
+    def __init__(self, meta=None, strings=None, columns=None):
+        self.meta = meta or {}
+        self.strings = strings or []
+        self.columns = columns or {f"{table}.{name}": array('i' if code == 's' else code)
+                                   for table, spec in SCHEMA.items() for name, code in spec}
+        self._string_ids = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self, value):
+        if value is None:
+            return -1
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def add(self, table, /, **values):
+        """Append a row; string columns take str or None"""
+        for name, code in SCHEMA[table]:
+            value = values[name]
+            self.columns[f"{table}.{name}"].append(self.intern(value) if code == 's' else value)
+        return len(self.columns[f"{table}.{SCHEMA[table][0][0]}"]) - 1
+
+    def column(self, table, name):
+        return self.columns[f"{table}.{name}"]
+
+    def strings_of(self, table, name):
+        """A string column decoded back to str/None"""
+        strings = self.strings
+        return [strings[i] if i >= 0 else None for i in self.column(table, name)]
+
+    def rows(self, table):
+        return len(self.column(table, SCHEMA[table][0][0]))
+
+    def styles(self):
+        """StyleIndex rebuilt from the recorded styles"""
+        index = StyleIndex(None)
+        index.default_paragraph = self.meta.get('default_paragraph')
+        index.default_rpr = self.meta.get('default_rpr', {})
+        index.styles = {style_id: dict(style) for style_id, style in self.meta.get('styles', {}).items()}
+        return index
+
+    def to_bytes(self):
+        """MAGIC, version, (name, typecode, length) sections with little-endian data, then a CRC-32"""
+        sections = [('meta', b'J', json.dumps(self.meta, separators=(',', ':')).encode('utf-8'))]
+        encoded = [s.encode('utf-8') for s in self.strings]
+        offsets = array('I', [0])
+        for s in encoded:
+            offsets.append(offsets[-1] + len(s))
+        sections.append(('strings', b'U', b''.join(encoded)))
+        columns = [('strings.offsets', offsets)] + list(self.columns.items())
+        for name, values in columns:
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            sections.append((name, values.typecode.encode('ascii'), values.tobytes()))
+
+        out = [MAGIC, struct.pack('<HH', IR_VERSION, len(sections))]
+        for name, code, data in sections:
+            raw_name = name.encode('utf-8')
+            out.append(SECTION.pack(len(raw_name), code, len(data)))
+            out.append(raw_name)
+            out.append(data)
+        body = b''.join(out)
+        return body + CHECKSUM.pack(zlib.crc32(body))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Parse to_bytes output; None if it is not intact IR of the current version"""
+        if not data.startswith(MAGIC) or len(data) < len(MAGIC) + 4 + CHECKSUM.size:
+            return None
+        end = len(data) - CHECKSUM.size
+        if CHECKSUM.unpack_from(data, end)[0] != zlib.crc32(memoryview(data)[:end]):
+            return None
+        pos = len(MAGIC)
+        version, count = struct.unpack_from('<HH', data, pos)
+        if version != IR_VERSION:
+            return None
+        pos += 4
+        meta, blob, columns = {}, b'', {}
+        try:
+            for _ in range(count):
+                name_length, code, length = SECTION.unpack_from(data, pos)
+                pos += SECTION.size
+                name = data[pos:pos + name_length].decode('utf-8')
+                pos += name_length
+                payload = data[pos:pos + length]
+                pos += length
+                if pos > end:
+                    return None
+                if code == b'J':
+                    meta = json.loads(payload)
+                elif code == b'U':
+                    blob = payload
+                else:
+                    values = array(code.decode('ascii'))
+                    values.frombytes(payload)
+                    if sys.byteorder == 'big':
+                        values.byteswap()
+                    columns[name] = values
+            offsets = columns.pop('strings.offsets')
+            strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        except (struct.error, ValueError, KeyError, UnicodeDecodeError):
+            # A checksum match on damaged data, or a file written by a broken build
+            return None
+        if pos != end:
+            return None
+        return cls(meta, strings, columns)
+
+
+def _revision_runs(paragraph, revision=0):
+    """Yield (run, revision) for a paragraph's runs, deleted ones included"""
+    for child in paragraph:
+        if child.tag == W + 'r':
+            yield child, revision
+        elif child.tag in REVISION_MARKS:
+            yield from _revision_runs(child, REVISION_MARKS[child.tag])
+        elif child.tag in RUN_CONTAINERS:
+            yield from _revision_runs(child, revision)
+
+
+def _paragraph_revision(ppr):
+    if ppr is None:
+        return 0
+    flags = PROPERTIES_CHANGED if ppr.find(W + 'pPrChange') is not None else 0
+    mark = ppr.find(W + 'rPr')
+    if mark is not None:
+        if mark.find(W + 'ins') is not None:
+            flags |= MARK_INSERTED
+        if mark.find(W + 'del') is not None:
+            flags |= MARK_DELETED
+    return flags
+
+
+def _table_revision(table, rows):
+    flags = PROPERTIES_CHANGED if table.find(f"{W}tblPr/{W}tblPrChange") is not None else 0
+    deleted = [row.find(f"{W}trPr/{W}del") is not None for row in rows]
+    if any(row.find(f"{W}trPr/{W}ins") is not None for row in rows):
+        flags |= MARK_INSERTED
+    if deleted and all(deleted):
+        flags |= MARK_DELETED
+    return flags
+
+
+def _outline_level(value):
+    # Rules only ask "set and not 9"; anything unparseable counts as a level
+    if value is None:
+        return -1
+    return int(value) if value.isdigit() and int(value) < 128 else 0
+
+
+def extract(pkg):
+    """Build the IR of a package (of its pkg.stories subset, if one is set)"""
+    ir = DocumentIR()
+    ir.meta = {'encrypted': pkg.encrypted}
+    if pkg.encrypted:
+        return ir
+
+    settings = pkg.xml('word/settings.xml')
+    protection = settings.find(W + 'documentProtection') if settings is not None else None
+    ir.meta['protected'] = (protection is not None
+                            and protection.get(W + 'enforcement') in ('1', 'true', 'on'))
+    ir.meta['author'] = document_author(pkg)
+    styles = pkg.styles()
+    ir.meta['styles'] = styles.styles
+    ir.meta['default_paragraph'] = styles.default_paragraph
+    ir.meta['default_rpr'] = styles.default_rpr
+
+    for part_number, part in enumerate(pkg.story_parts()):
+        root = pkg.xml(part)
+        ir.add('parts', name=part, background=_val(root, 'background', 'color'))
+
+        paragraph_numbers = {}
+        anchors = {}
+        for paragraph, cell_fill in iter_paragraphs(root):
+            ppr = paragraph.find(W + 'pPr')
+            para_id = paragraph.get(W14_PARA_ID)
+            texts = []
+            number = ir.rows('paragraphs')
+            paragraph_numbers[paragraph] = number
+            for run, revision in _revision_runs(paragraph):
+                rpr = run.find(W + 'rPr')
+                if revision == DELETED:
+                    text = ''.join(t.text or '' for t in run.iter(W + 'delText'))
+                else:
+                    text = run_text(run)
+                    texts.append(text)
+                    if rpr is not None and rpr.find(W + 'rPrChange') is not None and not revision:
+                        revision = FORMATTED
+                direct = _rpr_props(rpr) if rpr is not None else {}
+                ir.add('runs', paragraph=number, length=len(text), blank=not text.strip(),
+                       style=_val(rpr, 'rStyle'), color=direct.get('color'), size=direct.get('size', -1),
+                       bold=int(direct['bold']) if 'bold' in direct else -1,
+                       highlight=_val(rpr, 'highlight'), shading=_shading(rpr) if rpr is not None else None,
+                       revision=revision)
+                for doc_pr in run.iter(WP + 'docPr'):
+                    anchors[doc_pr] = (number, revision)
+            ir.add('paragraphs', part=part_number, style=_val(ppr, 'pStyle'),
+                   outline=_outline_level(_val(ppr, 'outlineLvl')),
+                   fill=_shading(ppr) if ppr is not None else None, cell_fill=cell_fill,
+                   para_id=int(para_id, 16) if para_id else 0,
+                   text_hash=zlib.crc32(''.join(texts).encode('utf-8')), revision=_paragraph_revision(ppr))
+
+        for doc_pr in root.iter(WP + 'docPr'):
+            decorative = next(doc_pr.iter(ADEC + 'decorative'), None)
+            paragraph, revision = anchors.get(doc_pr, (-1, 0))
+            ir.add('drawings', part=part_number, paragraph=paragraph, descr=doc_pr.get('descr'),
+                   decorative=decorative is not None and decorative.get('val') in ('1', 'true'),
+                   revision=revision)
+
+        for table in root.iter(W + 'tbl'):
+            rows = table.findall(W + 'tr')
+            look = table.find(f"{W}tblPr/{W}tblLook")
+            if look is None:
+                look_first_row = -1
+            elif look.get(W + 'firstRow') is not None:
+                look_first_row = int(look.get(W + 'firstRow') in ('1', 'true'))
+            else:
+                look_first_row = int(bool(int(look.get(W + 'val', '0'), 16) & 0x0020))
+            first_paragraph = next(table.iter(W + 'p'), None)
+            number = ir.add('tables', part=part_number, paragraph=paragraph_numbers.get(first_paragraph, -1),
+                            rows=len(rows), look_first_row=look_first_row,
+                            tbl_header=bool(rows) and rows[0].find(f"{W}trPr/{W}tblHeader") is not None,
+                            revision=_table_revision(table, rows))
+            for row_number, row in enumerate(rows):
+                cells = row.findall(W + 'tc')
+                for cell in cells:
+                    span = _val(cell.find(W + 'tcPr'), 'gridSpan')
+                    ir.add('cells', table=number, row=row_number, cells_in_row=len(cells),
+                           grid_span=int(span) if span else 1,
+                           v_merge=cell.find(f"{W}tcPr/{W}vMerge") is not None)
+    return ir
+
+
+# Rules over the IR. Each takes a DocumentIR and returns the number of issues,
+# exactly like the XML rules in native_checker. The *_failures generators
+# behind them take an optional subset of rows, so part of a document can be
+# evaluated on its own (see revision_check).
+
+def ir_restricted_access(ir):
+    return 1 if ir.meta.get('encrypted') or ir.meta.get('protected') else 0
+
+
+def missing_alt_failures(ir, drawings=None):
+    """Drawings with neither a description nor a decorative mark"""
+    strings = ir.strings
+    descr, decorative = ir.column('drawings', 'descr'), ir.column('drawings', 'decorative')
+    for i in range(ir.rows('drawings')) if drawings is None else drawings:
+        if not decorative[i] and (descr[i] < 0 or not strings[descr[i]].strip()):
+            yield i
+
+
+def ir_missing_alt_text(ir):
+    return sum(1 for _ in missing_alt_failures(ir))
+
+
+def table_header_failures(ir, tables=None):
+    """Tables of more than one row with no header row"""
+    rows, tbl_header = ir.column('tables', 'rows'), ir.column('tables', 'tbl_header')
+    look_first_row = ir.column('tables', 'look_first_row')
+    for i in range(ir.rows('tables')) if tables is None else tables:
+        if rows[i] > 1 and not tbl_header[i] and look_first_row[i] != 1:
+            yield i
+
+
+def ir_missing_table_header(ir):
+    return sum(1 for _ in table_header_failures(ir))
+
+
+def merged_cell_failures(ir, tables=None):
+    """Tables with vertically merged cells, or cells spanning part of a row"""
+    # Cells are recorded table by table, so each table's cells are one slice
+    cell_table = ir.column('cells', 'table')
+    cells_in_row, grid_span = ir.column('cells', 'cells_in_row'), ir.column('cells', 'grid_span')
+    v_merge = ir.column('cells', 'v_merge')
+    for i in range(ir.rows('tables')) if tables is None else tables:
+        for cell in range(bisect_left(cell_table, i), bisect_right(cell_table, i)):
+            # A single cell spanning the whole row (a title row) reads fine
+            if v_merge[cell] or (grid_span[cell] > 1 and cells_in_row[cell] > 1):
+                yield i
+                break
+
+
+def ir_merged_cells(ir):
+    return sum(1 for _ in merged_cell_failures(ir))
+
+
+def ir_no_headings(ir):
+    styles = ir.styles()
+    heading_styles = {}
+    for part, style, outline in zip(ir.column('paragraphs', 'part'), ir.strings_of('paragraphs', 'style'),
+                                    ir.column('paragraphs', 'outline')):
+        if part != 0:
+            continue
+        if outline not in (-1, 9):
+            return 0
+        if style not in heading_styles:
+            heading_styles[style] = styles.is_heading(style)
+        if heading_styles[style]:
+            return 0
+    return 1
+
+
+def contrast_failures(ir, runs=None):
+    """(run, (colour, background)) for text runs below the WCAG AA contrast ratio.
+
+    runs defaults to every run that is not a tracked deletion.
+    """
+    styles = ir.styles()
+    strings = ir.strings
+    backgrounds = [(bg if bg and bg.lower() != 'auto' else 'FFFFFF') for bg in ir.strings_of('parts', 'background')]
+    para_part = ir.column('paragraphs', 'part')
+    para_style = ir.strings_of('paragraphs', 'style')
+    para_fill = ir.strings_of('paragraphs', 'fill')
+    cell_fill = ir.strings_of('paragraphs', 'cell_fill')
+    run_paragraph, run_blank, run_style_ids, run_color, run_size, run_bold, run_highlight, run_shading = (
+        ir.column('runs', name) for name in ('paragraph', 'blank', 'style', 'color', 'size', 'bold',
+                                             'highlight', 'shading'))
+    if runs is None:
+        revisions = ir.column('runs', 'revision')
+        runs = (i for i in range(ir.rows('runs')) if revisions[i] != DELETED)
+
+    resolved = {}
+    ratios = {}
+    for i in runs:
+        if run_blank[i]:
+            continue
+        paragraph = run_paragraph[i]
+        run_style = strings[run_style_ids[i]] if run_style_ids[i] >= 0 else None
+        style = para_style[paragraph]
+        key = (run_style, style)
+        if key not in resolved:
+            resolved[key] = (styles.run_prop('color', run_style, style), styles.run_prop('size', run_style, style),
+                             styles.run_prop('bold', run_style, style))
+        style_color, style_size, style_bold = resolved[key]
+
+        color = (strings[run_color[i]] if run_color[i] >= 0 else None) or style_color
+        if not color or color.lower() == 'auto':
+            continue
+        background = ((strings[run_shading[i]] if run_shading[i] >= 0 else None)
+                      or HIGHLIGHT_COLORS.get(strings[run_highlight[i]] if run_highlight[i] >= 0 else None)
+                      or para_fill[paragraph] or cell_fill[paragraph] or backgrounds[para_part[paragraph]])
+        size = (run_size[i] if run_size[i] >= 0 else None) or style_size or 22
+        bold = bool(run_bold[i]) if run_bold[i] >= 0 else style_bold
+        large = size >= 36 or (bold and size >= 28)
+
+        if (color, background) not in ratios:
+            try:
+                ratios[color, background] = contrast_ratio(color, background)
+            except ValueError:
+                ratios[color, background] = None
+        ratio = ratios[color, background]
+        if ratio is not None and ratio < (3.0 if large else 4.5):
+            yield i, (color, background)
+
+
+def ir_text_contrast(ir):
+    return sum(1 for _ in contrast_failures(ir))
+
+
+IR_RULES = {
+    'contrast': ir_text_contrast,
+    'heading': ir_no_headings,
+    'image': ir_missing_alt_text,
+    'table': ir_missing_table_header,
+    'cell': ir_merged_cells,
+    'access': ir_restricted_access,
+}
+
+
+def evaluate_ir(ir, rules=None):
+    """Counts per category from the IR"""
+    if ir.meta.get('encrypted'):
+        return {category: int(category == 'access') for category in (rules or IR_RULES)}
+    return {category: IR_RULES[category](ir) for category in (rules or IR_RULES)}
+
+
+class IRCache:
+    """IR files under a folder, named by document digest and IR version"""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path_for(self, digest):
+        return os.path.join(self.folder, digest[:2], f"{digest}.v{IR_VERSION}.air")
+
+    def load(self, digest):
+        """Cached IR of the document content, or None (missing, unreadable, damaged or an old version)"""
+        try:
+            with open(self.path_for(digest), 'rb') as f:
+                return DocumentIR.from_bytes(f.read())
+        except OSError:
+            return None
+
+    def add(self, pkg, digest):
+        """Cache the IR of an open package unless this content is cached already"""
+        if not os.path.exists(self.path_for(digest)):
+            self.save(digest, extract(pkg))
+
+    def save(self, digest, ir):
+        path = self.path_for(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp = tempfile.mkstemp(suffix='.air', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(ir.to_bytes())
+        os.replace(temp, path)
+
+    def get(self, path, digest=None):
+        """(IR, whether it came from the cache); parses the document on a miss"""
+        if digest is None:
+            from results_store import file_digest
+            digest = file_digest(path)
+        ir = self.load(digest)
+        if ir is not None:
+            return ir, True
+        with DocxPackage(path) as pkg:
+            ir = extract(pkg)
+        self.save(digest, ir)
+        return ir, False
+
+
+def main(argv=None):
+    from batch_check import find_documents
+    from native_checker import evaluate
+
+    parser = argparse.ArgumentParser(description="Evaluate the rules over cached document IR")
+    parser.add_argument('inputs', nargs='+', help="documents or folders")
+    parser.add_argument('--cache', default=IR_CACHE,
+                        help="IR cache folder (default %(default)s; set A11Y_IR_CACHE to change it)")
+    parser.add_argument('--verify', action='store_true', help="also run the XML rules and compare the counts")
+    args = parser.parse_args(argv)
+
+    cache = IRCache(args.cache)
+    totals = dict.fromkeys(IR_RULES, 0)
+    hits = misses = mismatches = failed = 0
+    xml_seconds = 0.0
+    start = time.perf_counter()
+    for path in find_documents(args.inputs):
+        try:
+            ir, cached = cache.get(path)
+        except Exception as e:
+            print(f"{path}: {type(e).__name__}: {e}")
+            failed += 1
+            continue
+        hits += cached
+        misses += not cached
+        counts = evaluate_ir(ir)
+        for category, count in counts.items():
+            totals[category] += count
+        if args.verify:
+            xml_start = time.perf_counter()
+            with DocxPackage(path) as pkg:
+                expected = evaluate(pkg)['counts']
+            xml_seconds += time.perf_counter() - xml_start
+            if expected != counts:
+                mismatches += 1
+                print(f"{path}: XML rules {expected}, IR rules {counts}")
+    elapsed = time.perf_counter() - start - xml_seconds
+
+    print(', '.join(f"{category} {totals[category]}" for category, _ in CATEGORIES))
+    print(f"{hits + misses} documents in {elapsed:.2f}s ({hits} from the IR cache, {misses} parsed)")
+    if args.verify:
+        print(f"XML rules took {xml_seconds:.2f}s; {mismatches} documents disagree")
+    return 1 if mismatches or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Opt-in profiling of single document checks.
+
+A sampled fraction of documents is checked under cProfile and tracemalloc.
+Sampling hashes the path, so a rerun profiles the same documents. The batch
+keeps the slowest and the most memory-hungry profiled documents, prints a
+ranked report at the end, and can save their profiles as .prof files (load
+them with pstats or snakeviz). Documents that are not sampled take the
+normal code path and pay nothing.
+"""
+import cProfile
+import heapq
+import marshal
+import os
+import pstats
+import re
+import time
+import tracemalloc
+import zlib
+
+
+def sampled(path, rate):
+    """Stable per-path sampling decision"""
+    if rate <= 0:
+        return False
+    return zlib.crc32(os.path.abspath(path).encode('utf-8')) / 2 ** 32 < rate
+
+
+def profile_call(function, task):
+    """Run function(task) under cProfile and tracemalloc; the result dict gets a 'profile_data' entry"""
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = function(task)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result['profile_data'] = {'elapsed': elapsed, 'peak_memory': peak, 'stats': pstats.Stats(profiler).stats}
+    return result
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        # Built-ins: "<method 'feed' of 'xml.etree.ElementTree.XMLParser' objects>"
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def top_functions(stats, count=5, key=2):
+    """(label, calls, own seconds, cumulative seconds), sorted by own time (key=2) or cumulative (key=3)"""
+    rows = [(func, nc, tt, ct) for func, (cc, nc, tt, ct, callers) in stats.items()]
+    rows.sort(key=lambda row: -row[key])
+    return [(_label(func), nc, tt, ct) for func, nc, tt, ct in rows[:count]]
+
+
+class ProfileReport:
+    """Collects task results; keeps the N slowest tasks, and the N slowest and N most memory-hungry profiled ones"""
+
+    def __init__(self, keep=10):
+        self.keep = keep
+        self.slowest = []
+        self.hungriest = []
+        # Min-heap of (elapsed, seq, name, profiled) of the slowest tasks, profiled or not
+        self.durations = []
+        self.tasks = 0
+        self.elapsed = 0.0
+        self.profiled = 0
+        self._seq = 0
+
+    def _push(self, heap, item):
+        # Min-heaps of size keep: the smallest of the kept entries is pushed out first
+        if len(heap) < self.keep:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
+
+    def add(self, result):
+        name = result['path'] if not result.get('stories') else f"{result['path']} [{', '.join(result['stories'])}]"
+        profile = result.get('profile_data')
+        self.tasks += 1
+        self.elapsed += result['elapsed']
+        self._seq += 1
+        self._push(self.durations, (result['elapsed'], self._seq, name, profile is not None))
+        if not profile:
+            return
+        self.profiled += 1
+        entry = (name, profile)
+        self._push(self.slowest, (profile['elapsed'], self._seq, entry))
+        self._push(self.hungriest, (profile['peak_memory'], self._seq, entry))
+
+    def render(self, functions=3):
+        lines = [f"Profiled {self.profiled} of {self.tasks} tasks ({self.elapsed:.2f}s of checking in all)"]
+
+        lines += ["", "Slowest tasks (all, * = profiled):"]
+        for elapsed, _, name, profiled in sorted(self.durations, reverse=True):
+            lines.append(f"  {elapsed * 1000:9.0f} ms {'*' if profiled else ' '} {name}")
+
+        for title, heap in (("Slowest profiled tasks", self.slowest),
+                            ("Most memory-hungry profiled tasks", self.hungriest)):
+            lines += ["", f"{title}:"]
+            for _, _, (name, profile) in sorted(heap, reverse=True):
+                lines.append(f"  {profile['elapsed'] * 1000:9.0f} ms {profile['peak_memory'] / 1e6:8.1f} MB  {name}")
+                for label, calls, own, cumulative in top_functions(profile['stats'], functions):
+                    lines.append(f"      {own * 1000:8.1f} ms own {cumulative * 1000:8.1f} ms cum {calls:>8} calls  {label}")
+
+        # Where the profiled time went across every kept task
+        combined = {}
+        kept = {seq: profile for _, seq, (_, profile) in self.slowest + self.hungriest}
+        for profile in kept.values():
+            for func, (cc, nc, tt, ct, callers) in profile['stats'].items():
+                calls, own, cumulative = combined.get(func, (0, 0.0, 0.0))
+                combined[func] = (calls + nc, own + tt, cumulative + ct)
+        if combined:
+            lines += ["", "Hottest functions in the kept tasks (own time):"]
+            for func, (calls, own, cumulative) in sorted(combined.items(), key=lambda item: -item[1][1])[:10]:
+                lines.append(f"  {own * 1000:9.1f} ms {calls:>9} calls  {_label(func)}")
+        return lines
+
+    def save(self, folder):
+        """Write the kept profiles as pstats files; returns the paths"""
+        os.makedirs(folder, exist_ok=True)
+        written = {}
+        for _, _, (name, profile) in sorted(self.slowest, reverse=True) + sorted(self.hungriest, reverse=True):
+            if name in written:
+                continue
+            # 'folder/report.docx [word/header1.xml]' -> report.docx_word_header1.xml_
+            path, _, stories = name.partition(' [')
+            slug = re.sub(r'[^\w.-]+', '_', f"{os.path.basename(path)} {stories}".strip())[:80]
+            path = os.path.join(folder, f"{len(written) + 1:02d}_{slug}.prof")
+            with open(path, 'wb') as f:
+                # Same format as pstats.Stats.dump_stats
+                marshal.dump(profile['stats'], f)
+            written[name] = path
+        return list(written.values())
@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""Font metrics for font-aware rules, parsed once and cached.
+
+A font's metrics come from its sfnt tables (head, OS/2, name, cmap and, when
+OS/2 has no x-height, the 'x' glyph in glyf):
+
+- family name
+- units per em, x-height and cap height
+- whether it is a symbol-encoded font
+- the characters its cmap covers, as ranges
+
+Parsing a font takes milliseconds. Looking its metrics up afterwards is a
+dictionary lookup, so the rules below cost one lookup per run.
+
+Fonts embedded in a package (word/fonts/*, deobfuscated with their fontKey)
+are keyed by the CRC-32, size and key from the zip central directory, so a
+cache hit reads nothing. Fonts that are only named in fontTable.xml are found
+by family name in the system font folders. The family index records the
+folders' file list and is rebuilt only when a font is added or changed. The
+metrics are kept in memory per process and as JSON under a cache folder
+shared by every worker, so a font is parsed once for the whole corpus.
+
+Two advisory rules, outside the Word pane categories, use them:
+
+    small_text  runs whose x-height is below MIN_X_HEIGHT points
+    glyphs      runs in a symbol-encoded font, w:sym characters, and runs with
+                characters their font has no glyph for (Word substitutes
+                another font, or shows boxes); also list levels whose bullet
+                or marker text (numbering.xml lvlText) is missing from the
+                font the level sets, once per level at its first item
+
+    python font_metrics.py corpus/ --cache .a11y_fonts
+    python font_metrics.py Minster_Resume.docx --list
+"""
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from bisect import bisect_right
+
+from native_checker import (PKG_REL, W, _found, _rpr_props, _val, evaluate, iter_paragraphs, iter_runs, rel_part,
+                            run_text)
+
+# $A11Y_FONT_CACHE, else .a11y_fonts in the current folder
+FONT_CACHE = os.environ.get('A11Y_FONT_CACHE') or '.a11y_fonts'
+CACHE_VERSION = 1
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.odttf')
+
+REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+# Points of x-height below which text counts as too small (Calibri at about
+# 8.5 pt, Times New Roman at 9 pt)
+MIN_X_HEIGHT = 4.0
+# x-height / em for fonts whose metrics are unknown (typical of text faces)
+DEFAULT_X_HEIGHT = 0.5
+# Word's fallback when neither the run, its styles nor the defaults name a font
+DEFAULT_FONT = 'Times New Roman'
+# Symbol-encoded fonts that are not always installed where the check runs
+SYMBOL_FAMILIES = {'symbol', 'wingdings', 'wingdings 2', 'wingdings 3', 'webdings', 'marlett', 'ms outlook'}
+
+# Level number placeholders in a w:lvlText
+LEVEL_NUMBER = re.compile(r'%[1-9]')
+
+EMBED_VARIANTS = {'embedRegular': 'regular', 'embedBold': 'bold', 'embedItalic': 'italic',
+                  'embedBoldItalic': 'bold_italic'}
+
+SFNT_TABLE = struct.Struct('>4sLLL')
+
+
+class FontMetrics:
+    """What the rules need to know about one font face"""
+
+    __slots__ = ('family', 'subfamily', 'units_per_em', 'x_height', 'cap_height', 'symbol', 'starts', 'ends')
+
+    def __init__(self, family, subfamily, units_per_em, x_height, cap_height, symbol, ranges):
+        self.family = family
+        self.subfamily = subfamily
+        self.units_per_em = units_per_em
+        self.x_height = x_height
+        self.cap_height = cap_height
+        self.symbol = symbol
+        # Sorted, non-overlapping [start, end] code point ranges
+        self.starts = [start for start, _ in ranges]
+        self.ends = [end for _, end in ranges]
+
+    def x_height_ratio(self):
+        if not self.x_height or not self.units_per_em:
+            return DEFAULT_X_HEIGHT
+        return self.x_height / self.units_per_em
+
+    def covers(self, char):
+        code = ord(char)
+        i = bisect_right(self.starts, code) - 1
+        return i >= 0 and code <= self.ends[i]
+
+    def to_json(self):
+        return {'family': self.family, 'subfamily': self.subfamily, 'units_per_em': self.units_per_em,
+                'x_height': self.x_height, 'cap_height': self.cap_height, 'symbol': self.symbol,
+                'ranges': [[start, end] for start, end in zip(self.starts, self.ends)]}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['family'], data['subfamily'], data['units_per_em'], data['x_height'],
+                   data['cap_height'], data['symbol'], data['ranges'])
+
+
+def deobfuscate(data, font_key):
+    """Undo the XOR of the first 32 bytes of an embedded font with its fontKey GUID"""
+    digits = font_key.strip('{}').replace('-', '')
+    if len(digits) != 32 or not digits.strip('0'):
+        return data
+    # The GUID's bytes, last one first
+    key = bytes(int(digits[i - 2:i], 16) for i in range(32, 0, -2))
+    head = bytes(b ^ key[i % 16] for i, b in enumerate(data[:32]))
+    return head + bytes(data[32:])
+
+
+def _table_directory(data):
+    """{tag: (offset, length)} of the first font in a file (TrueType, OpenType or collection)"""
+    offset = 0
+    if data[:4] == b'ttcf':
+        offset = struct.unpack_from('>L', data, 12)[0]
+    count = struct.unpack_from('>H', data, offset + 4)[0]
+    tables = {}
+    for i in range(count):
+        tag, _, start, length = SFNT_TABLE.unpack_from(data, offset + 12 + i * SFNT_TABLE.size)
+        if start + length > len(data):
+            raise ValueError(f"font table {tag!r} runs past the end of the file")
+        tables[tag.decode('latin-1')] = (start, length)
+    return tables
+
+
+def _names(data, tables):
+    """(family, subfamily) from the name table, preferring typographic names in English"""
+    if 'name' not in tables:
+        return None, None
+    base = tables['name'][0]
+    _, count, strings = struct.unpack_from('>HHH', data, base)
+    found = {}
+    for i in range(count):
+        platform, encoding, language, name_id, length, offset = struct.unpack_from('>6H', data, base + 6 + i * 12)
+        if name_id not in (1, 2, 16, 17):
+            continue
+        raw = bytes(data[base + strings + offset:base + strings + offset + length])
+        if platform in (0, 3):
+            text = raw.decode('utf-16-be', 'replace')
+            rank = 0 if language == 0x409 else 1
+        elif platform == 1:
+            text = raw.decode('mac_roman', 'replace')
+            rank = 2
+        else:
+            continue
+        if name_id not in found or rank < found[name_id][0]:
+            found[name_id] = (rank, text)
+    family = found.get(16, found.get(1, (0, None)))[1]
+    subfamily = found.get(17, found.get(2, (0, None)))[1]
+    return family, subfamily
+
+
+def _cmap_subtable(data, tables):
+    """(offset, format, symbol) of the best Unicode cmap subtable, or None"""
+    if 'cmap' not in tables:
+        return None
+    base = tables['cmap'][0]
+    count = struct.unpack_from('>H', data, base + 2)[0]
+    subtables = {}
+    for i in range(count):
+        platform, encoding, offset = struct.unpack_from('>HHL', data, base + 4 + i * 8)
+        subtables.setdefault((platform, encoding), base + offset)
+    for key in ((3, 10), (0, 4), (0, 6), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0), (3, 0)):
+        if key in subtables:
+            offset = subtables[key]
+            form = struct.unpack_from('>H', data, offset)[0]
+            if form in (4, 12):
+                return offset, form, key == (3, 0)
+    return None
+
+
+def _format4_segments(data, offset):
+    """(start, end, delta, range offset, position of the range offset) per segment"""
+    segments = struct.unpack_from('>H', data, offset + 6)[0] // 2
+    ends = offset + 14
+    starts = ends + segments * 2 + 2
+    deltas = starts + segments * 2
+    range_offsets = deltas + segments * 2
+    for i in range(segments):
+        end = struct.unpack_from('>H', data, ends + i * 2)[0]
+        start = struct.unpack_from('>H', data, starts + i * 2)[0]
+        delta = struct.unpack_from('>h', data, deltas + i * 2)[0]
+        position = range_offsets + i * 2
+        range_offset = struct.unpack_from('>H', data, position)[0]
+        if start <= end and start != 0xFFFF:
+            yield start, end, delta, range_offset, position
+
+
+def _format4_glyph(data, code, delta, range_offset, position, start):
+    if not range_offset:
+        return (code + delta) & 0xFFFF
+    at = position + range_offset + (code - start) * 2
+    if at + 2 > len(data):
+        return 0
+    glyph = struct.unpack_from('>H', data, at)[0]
+    return (glyph + delta) & 0xFFFF if glyph else 0
+
+
+def _coverage(data, subtable):
+    """Sorted [start, end] ranges of the code points that map to a glyph"""
+    offset, form, _ = subtable
+    ranges = []
+
+    def add(start, end):
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    if form == 4:
+        for start, end, delta, range_offset, position in _format4_segments(data, offset):
+            if not range_offset:
+                # Consecutive glyph ids; at most one code wraps around to .notdef
+                hole = -delta & 0xFFFF
+                if start <= hole <= end:
+                    if hole > start:
+                        add(start, hole - 1)
+                    if hole < end:
+                        add(hole + 1, end)
+                else:
+                    add(start, end)
+                continue
+            run = None
+            for code in range(start, end + 1):
+                if _format4_glyph(data, code, delta, range_offset, position, start):
+                    run = [code, code] if run is None else [run[0], code]
+                elif run is not None:
+                    add(*run)
+                    run = None
+            if run is not None:
+                add(*run)
+    else:
+        groups = struct.unpack_from('>L', data, offset + 12)[0]
+        found = sorted(struct.unpack_from('>LLL', data, offset + 16 + i * 12)[:2] for i in range(groups))
+        for start, end in found:
+            add(start, end)
+    return ranges
+
+
+def _glyph_of(data, subtable, code):
+    offset, form, _ = subtable
+    if form == 4:
+        for start, end, delta, range_offset, position in _format4_segments(data, offset):
+            if start <= code <= end:
+                return _format4_glyph(data, code, delta, range_offset, position, start)
+        return 0
+    groups = struct.unpack_from('>L', data, offset + 12)[0]
+    for i in range(groups):
+        start, end, glyph = struct.unpack_from('>LLL', data, offset + 16 + i * 12)
+        if start <= code <= end:
+            return glyph + code - start
+    return 0
+
+
+def _glyph_top(data, tables, glyph):
+    """yMax of a TrueType outline glyph (None for CFF fonts or empty glyphs)"""
+    if not glyph or not {'head', 'loca', 'glyf'} <= set(tables):
+        return None
+    long_offsets = struct.unpack_from('>h', data, tables['head'][0] + 50)[0]
+    loca = tables['loca'][0]
+    if long_offsets:
+        start, end = struct.unpack_from('>LL', data, loca + glyph * 4)
+    else:
+        start, end = (2 * value for value in struct.unpack_from('>HH', data, loca + glyph * 2))
+    if end - start < 10:
+        return None
+    return struct.unpack_from('>h', data, tables['glyf'][0] + start + 8)[0]
+
+
+def parse_font(data):
+    """FontMetrics of a TrueType / OpenType font (the first face of a collection)"""
+    tables = _table_directory(data)
+    if 'head' not in tables:
+        raise ValueError("not an sfnt font (no head table)")
+    units_per_em = struct.unpack_from('>H', data, tables['head'][0] + 18)[0]
+    family, subfamily = _names(data, tables)
+
+    x_height = cap_height = None
+    if 'OS/2' in tables:
+        start, length = tables['OS/2']
+        if struct.unpack_from('>H', data, start)[0] >= 2 and length >= 90:
+            x_height, cap_height = struct.unpack_from('>hh', data, start + 86)
+    subtable = _cmap_subtable(data, tables)
+    symbol = bool(subtable and subtable[2])
+    if subtable and not x_height:
+        # Older OS/2 tables have no x-height: measure the outlines
+        x_height = _glyph_top(data, tables, _glyph_of(data, subtable, ord('x')))
+        cap_height = cap_height or _glyph_top(data, tables, _glyph_of(data, subtable, ord('H')))
+    ranges = _coverage(data, subtable) if subtable else []
+    return FontMetrics(family, subfamily, units_per_em, x_height or None, cap_height or None, symbol, ranges)
+
+
+def _read_names(path):
+    """(family, subfamily) read from a font file's name table only"""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        offset = 0
+        if header[:4] == b'ttcf':
+            f.seek(0)
+            offset = struct.unpack_from('>L', f.read(16), 12)[0]
+            f.seek(offset)
+            header = f.read(12)
+        count = struct.unpack_from('>H', header, 4)[0]
+        directory = f.read(count * SFNT_TABLE.size)
+        for i in range(count):
+            tag, _, start, length = SFNT_TABLE.unpack_from(directory, i * SFNT_TABLE.size)
+            if tag == b'name':
+                f.seek(start)
+                # _names works on whole-file offsets; give it a table that starts at 0
+                return _names(f.read(length), {'name': (0, length)})
+    return None, None
+
+
+def system_font_dirs():
+    """Where fonts are installed on this platform"""
+    home = os.path.expanduser('~')
+    if sys.platform == 'win32':
+        windir = os.environ.get('WINDIR', r'C:\Windows')
+        local = os.environ.get('LOCALAPPDATA', os.path.join(home, 'AppData', 'Local'))
+        return [os.path.join(windir, 'Fonts'), os.path.join(local, 'Microsoft', 'Windows', 'Fonts')]
+    if sys.platform == 'darwin':
+        return ['/System/Library/Fonts', '/Library/Fonts', os.path.join(home, 'Library', 'Fonts')]
+    return ['/usr/share/fonts', '/usr/local/share/fonts', os.path.join(home, '.fonts'),
+            os.path.join(home, '.local', 'share', 'fonts')]
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, temp = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(path) or '.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp, path)
+
+
+class FontCache:
+    """Font metrics in memory and as JSON under a folder that every worker shares"""
+
+    def __init__(self, folder=FONT_CACHE, font_dirs=None):
+        self.folder = folder
+        self.font_dirs = font_dirs if font_dirs is not None else system_font_dirs()
+        self._memory = {}
+        self._families = None
+        self.parsed = 0
+        self.loaded = 0
+
+    def path_for(self, key):
+        return os.path.join(self.folder, key[:2], f"{key}.v{CACHE_VERSION}.json")
+
+    def get(self, key, read_font):
+        """Metrics for key: from memory, else from the cache folder, else read_font() is parsed"""
+        metrics = self._memory.get(key)
+        if metrics is not None:
+            return metrics
+        path = self.path_for(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                metrics = FontMetrics.from_json(json.load(f))
+            self.loaded += 1
+        except (OSError, ValueError, KeyError):
+            metrics = parse_font(read_font())
+            self.parsed += 1
+            _write_json(path, metrics.to_json())
+        self._memory[key] = metrics
+        return metrics
+
+    def embedded(self, pkg, part, font_key):
+        entry = pkg.zip.entries[part]
+        digits = (font_key or '').strip('{}').replace('-', '').lower()
+        key = f"{entry.crc:08x}{entry.file_size:x}-{digits or 'plain'}"
+        return self.get(key, lambda: deobfuscate(pkg.read(part), font_key or ''))
+
+    def _font_files(self):
+        files = []
+        for folder in self.font_dirs:
+            for root, dirs, names in os.walk(folder):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.lower().endswith(FONT_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        files.append([path, stat.st_size, stat.st_mtime_ns])
+        return files
+
+    def families(self):
+        """{(family, bold): [path, size, mtime]} of the installed fonts, rebuilt when the font folders change"""
+        if self._families is None:
+            files = self._font_files()
+            index_path = os.path.join(self.folder, f"families.v{CACHE_VERSION}.json")
+            try:
+                with open(index_path, encoding='utf-8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = None
+            if stored is None or stored['files'] != files:
+                families = {}
+                for path, size, mtime in files:
+                    try:
+                        family, subfamily = _read_names(path)
+                    except (OSError, struct.error):
+                        continue
+                    if not family:
+                        continue
+                    style = (subfamily or '').lower()
+                    if 'italic' in style or 'oblique' in style:
+                        continue
+                    bold = 'bold' in style
+                    # A plain 'Regular' face wins over light or condensed ones
+                    slot = f"{family.lower()}|{int(bold)}"
+                    if slot not in families or style in ('regular', 'bold'):
+                        families[slot] = [path, size, mtime]
+                stored = {'files': files, 'families': families}
+                _write_json(index_path, stored)
+            self._families = stored['families']
+        return self._families
+
+    def family(self, name, bold=False):
+        """Metrics of an installed family (its bold face when asked and installed), or None"""
+        families = self.families()
+        found = families.get(f"{name.lower()}|{int(bold)}") or families.get(f"{name.lower()}|0")
+        if found is None:
+            return None
+        path, size, mtime = found
+        key = zlib.crc32(f"{path}|{size}|{mtime}".encode('utf-8')).to_bytes(4, 'big').hex() + f"{size:x}"
+
+        def read_font():
+            with open(path, 'rb') as f:
+                return f.read()
+
+        try:
+            return self.get(key, read_font)
+        except (OSError, ValueError, struct.error):
+            return None
+
+
+_shared = None
+
+
+def shared_cache():
+    """This process's FontCache, created on first use (folder FONT_CACHE)"""
+    global _shared
+    if _shared is None:
+        _shared = FontCache(FONT_CACHE)
+    return _shared
+
+
+class DocumentFonts:
+    """Font resolution for one package: theme fonts, embedded fonts, then installed fonts"""
+
+    def __init__(self, pkg, cache):
+        self.pkg = pkg
+        self.cache = cache
+        self.theme = {}
+        self.embedded = {}
+        self._metrics = {}
+
+        main = pkg.main_part()
+        folder, base = main.rsplit('/', 1)
+        targets = {}
+        rels = pkg.xml(f"{folder}/_rels/{base}.rels")
+        for rel in (rels.iter(PKG_REL) if rels is not None else ()):
+            targets[rel.get('Type', '').rsplit('/', 1)[-1]] = rel_part(folder, rel.get('Target'))
+
+        theme = pkg.xml(targets.get('theme', ''))
+        if theme is not None:
+            for scheme in ('major', 'minor'):
+                latin = theme.find(f".//{A}{scheme}Font/{A}latin")
+                if latin is not None and latin.get('typeface'):
+                    self.theme[scheme] = latin.get('typeface')
+
+        table_part = targets.get('fontTable', f"{folder}/fontTable.xml")
+        table = pkg.xml(table_part)
+        if table is not None:
+            table_folder, table_base = table_part.rsplit('/', 1)
+            font_rels = pkg.xml(f"{table_folder}/_rels/{table_base}.rels")
+            parts = {rel.get('Id'): rel_part(table_folder, rel.get('Target'))
+                     for rel in (font_rels.iter(PKG_REL) if font_rels is not None else ())}
+            for font in table.iter(W + 'font'):
+                variants = {}
+                for child in font:
+                    variant = EMBED_VARIANTS.get(child.tag[len(W):])
+                    part = parts.get(child.get(REL))
+                    if variant and part and pkg.has_part(part):
+                        variants[variant] = (part, child.get(W + 'fontKey'))
+                if variants:
+                    self.embedded[font.get(W + 'name')] = variants
+
+    def resolve(self, font):
+        """Family name of a run's font property ('theme:minorHAnsi' -> 'Calibri')"""
+        if not font:
+            return self.theme.get('minor', DEFAULT_FONT)
+        if font.startswith('theme:'):
+            theme = font[6:]
+            return self.theme.get('major' if theme.startswith('major') else 'minor', DEFAULT_FONT)
+        return font
+
+    def metrics(self, family, bold=False):
+        """FontMetrics of a family, or None when it is neither embedded nor installed"""
+        key = (family, bold)
+        if key not in self._metrics:
+            metrics = None
+            variants = self.embedded.get(family)
+            if variants:
+                part, font_key = variants.get('bold' if bold else 'regular') or next(iter(variants.values()))
+                try:
+                    metrics = self.cache.embedded(self.pkg, part, font_key)
+                except (ValueError, struct.error):
+                    metrics = None
+            if metrics is None:
+                metrics = self.cache.family(family, bold)
+            self._metrics[key] = metrics
+        return self._metrics[key]
+
+
+def _run_fonts(pkg):
+    """Yield (part, paragraph, run, text, offset, family, bold, size, w:sym elements) per run with something visible"""
+    styles = pkg.styles()
+    fonts = pkg.fonts()
+    for part in pkg.story_parts():
+        for paragraph, _ in iter_paragraphs(pkg.xml(part)):
+            para_style = _val(paragraph.find(W + 'pPr'), 'pStyle')
+            offset = 0
+            for run in iter_runs(paragraph):
+                text = run_text(run)
+                offset += len(text)
+                symbols = run.findall(W + 'sym')
+                if not text.strip() and not symbols:
+                    continue
+                rpr = run.find(W + 'rPr')
+                direct = _rpr_props(rpr) if rpr is not None else {}
+                run_style = _val(rpr, 'rStyle')
+                font = direct.get('font') or styles.run_prop('font', run_style, para_style)
+                size = direct.get('size') or styles.run_prop('size', run_style, para_style) or 22
+                bold = bool(direct.get('bold', styles.run_prop('bold', run_style, para_style)))
+                yield (part, paragraph, run, text, offset - len(text), fonts.resolve(font), bold, size, symbols)
+
+
+def check_small_text(pkg, found=None, min_x_height=None):
+    """Runs whose x-height (size times the font's x-height / em) is under MIN_X_HEIGHT points"""
+    fonts = pkg.fonts()
+    limit = MIN_X_HEIGHT if min_x_height is None else min_x_height
+    count = 0
+    for part, paragraph, run, text, offset, family, bold, size, _ in _run_fonts(pkg):
+        if not text.strip():
+            continue
+        metrics = fonts.metrics(family, bold)
+        ratio = metrics.x_height_ratio() if metrics is not None else DEFAULT_X_HEIGHT
+        if size / 2 * ratio < limit:
+            _found(found, part, 'paragraph', paragraph, offset)
+            count += 1
+    return count
+
+
+def _font_slot(char):
+    """Whether Word draws the character with the run's ascii/hAnsi font (not its East Asian or complex script one)"""
+    code = ord(char)
+    return not (0x0590 <= code <= 0x08FF or 0x2E80 <= code < 0xE000 or 0xF900 <= code <= 0xFFEF
+                or code >= 0x20000 or char.isspace() or code < 0x20)
+
+
+def _covers(metrics, char):
+    """Glyph coverage, with symbol fonts' characters also looked up at U+F000 + code as Word does"""
+    code = ord(char)
+    return metrics.covers(char) or (metrics.symbol and code < 0x100 and metrics.covers(chr(0xF000 + code)))
+
+
+def _marker_glyphs(pkg, fonts, found=None):
+    """List levels in use whose marker text has characters missing from the level's own font.
+
+    Symbol-font bullets are fine here: the list item is announced as such.
+    Levels without a font of their own follow the paragraph and are left out.
+    """
+    index = pkg.numbering()
+    if not index.levels:
+        return 0
+    count = 0
+    seen = set()
+    for part in pkg.story_parts():
+        for paragraph, item in index.part(part).items.items():
+            if item in seen:
+                continue
+            seen.add(item)
+            level = index.levels[item]
+            metrics = fonts.metrics(fonts.resolve(level.font)) if level.font else None
+            if metrics is None:
+                continue
+            # %1, %2... are the level numbers, drawn from the same font but not typed
+            marker = LEVEL_NUMBER.sub('', level.text)
+            if any(_font_slot(char) and not _covers(metrics, char) for char in marker):
+                _found(found, part, 'paragraph', paragraph, 0)
+                count += 1
+    return count
+
+
+def check_symbol_glyphs(pkg, found=None):
+    """Runs that screen readers or the font itself cannot render as the text they hold, and list markers missing
+    from their font"""
+    fonts = pkg.fonts()
+    count = _marker_glyphs(pkg, fonts, found)
+    for part, paragraph, run, text, offset, family, bold, size, symbols in _run_fonts(pkg):
+        metrics = fonts.metrics(family, bold)
+        symbol = family.lower() in SYMBOL_FAMILIES or (metrics is not None and metrics.symbol)
+        if symbols or (symbol and text.strip()):
+            # Symbol-encoded characters have no Unicode meaning to read out
+            problem = True
+        elif metrics is not None:
+            problem = any(_font_slot(char) and not metrics.covers(char) for char in text)
+        else:
+            problem = False
+        if problem:
+            _found(found, part, 'paragraph', paragraph, offset)
+            count += 1
+    return count
+
+
+# Same shape as native_checker.RULES; run them with evaluate(pkg, rules=FONT_RULES)
+FONT_RULES = [
+    {'category': 'small_text', 'severity': 'warning', 'cost': 7, 'scope': 'story', 'check': check_small_text},
+    {'category': 'glyphs', 'severity': 'warning', 'cost': 8, 'scope': 'story', 'check': check_symbol_glyphs},
+]
+
+
+def main(argv=None):
+    from batch_check import find_documents
+    from native_checker import DocxPackage
+
+    parser = argparse.ArgumentParser(description="Check text size and glyph coverage with cached font metrics")
+    parser.add_argument('inputs', nargs='+', help="documents or folders")
+    parser.add_argument('--cache', default=FONT_CACHE,
+                        help="font metrics cache folder (default %(default)s; set A11Y_FONT_CACHE to change it)")
+    parser.add_argument('--font-dir', action='append', help="font folder to search instead of the system ones")
+    parser.add_argument('--min-x-height', type=float, default=MIN_X_HEIGHT,
+                        help="smallest acceptable x-height in points (default %(default)s)")
+    parser.add_argument('--list', action='store_true', help="show each document's fonts and their metrics")
+    args = parser.parse_args(argv)
+
+    cache = FontCache(args.cache, args.font_dir)
+    rules = [dict(rule) for rule in FONT_RULES]
+    rules[0]['check'] = lambda pkg, found=None: check_small_text(pkg, found, args.min_x_height)
+
+    totals = {rule['category']: 0 for rule in rules}
+    documents = failed = 0
+    start = time.perf_counter()
+    for path in find_documents(args.inputs):
+        try:
+            with DocxPackage(path) as pkg:
+                if pkg.encrypted:
+                    continue
+                pkg.fonts(cache)
+                counts = evaluate(pkg, rules=rules)['counts']
+                if args.list:
+                    fonts = pkg.fonts()
+                    print(path)
+                    for family in sorted({family for _, _, _, _, _, family, _, _, _ in _run_fonts(pkg)}):
+                        metrics = fonts.metrics(family)
+                        source = 'embedded' if family in fonts.embedded else 'installed'
+                        if metrics is None:
+                            print(f"    {family}: unknown (x-height / em taken as {DEFAULT_X_HEIGHT})")
+                        else:
+                            print(f"    {family}: {source}, x-height / em {metrics.x_height_ratio():.3f}, "
+                                  f"{sum(e - s + 1 for s, e in zip(metrics.starts, metrics.ends))} characters"
+                                  f"{', symbol encoded' if metrics.symbol else ''}")
+        except Exception as e:
+            print(f"{path}: {type(e).__name__}: {e}")
+            failed += 1
+            continue
+        documents += 1
+        for category, count in counts.items():
+            totals[category] += count
+        if any(counts.values()):
+            print(f"{path}: " + ', '.join(f"{category} {count}" for category, count in counts.items()))
+    elapsed = time.perf_counter() - start
+
+    print(', '.join(f"{category} {count}" for category, count in totals.items()))
+    print(f"{documents} documents in {elapsed:.2f}s; fonts parsed {cache.parsed}, "
+          f"loaded from the cache {cache.loaded}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
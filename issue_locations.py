@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Where each finding is, so review tools can jump to it.
+
+Every issue gets a locator:
+
+    part       story part (word/document.xml, word/header1.xml, ...)
+    kind       paragraph, table or drawing (document/protection/package for
+               findings about the whole document)
+    ordinal    index of the element among elements of that kind in the part,
+               in document order
+    paragraph  ordinal of the paragraph holding it, and
+    offset     character offset of the issue in that paragraph's text
+    byte       byte offset of the element's start tag in the part's XML
+
+The locators of one check form a compact location index, stored with the
+result in the results index. A tool can then slice a part at the stored byte
+offset instead of parsing the document again.
+
+    python issue_locations.py report.docx
+    python issue_locations.py report.docx --category image --db a11y_results.db
+"""
+import argparse
+import json
+import sys
+from xml.parsers import expat
+
+from native_checker import CATEGORIES, MC_FALLBACK, W, WP, DocxPackage, evaluate, iter_runs, run_text
+
+INDEX_VERSION = 1
+
+# Locator kind -> tag whose start tags are counted for ordinals and byte offsets
+KIND_TAGS = {'paragraph': W + 'p', 'table': W + 'tbl', 'drawing': WP + 'docPr'}
+
+
+def _expat_name(tag):
+    # '{uri}local' -> 'uri local', expat's namespace_separator form
+    return tag[1:].replace('}', ' ')
+
+
+def element_offsets(data):
+    """Byte offsets of every paragraph, table and drawing start tag, per kind, in document order.
+
+    mc:Fallback branches are skipped, as DocxPackage.xml drops them too, so
+    the ordinals line up with ElementTree's iteration order.
+    """
+    wanted = {_expat_name(tag): kind for kind, tag in KIND_TAGS.items()}
+    fallback = _expat_name(MC_FALLBACK)
+    offsets = {kind: [] for kind in KIND_TAGS}
+    skipping = [0]
+    parser = expat.ParserCreate(namespace_separator=' ')
+
+    def start(name, attrs):
+        if skipping[0]:
+            skipping[0] += 1
+        elif name == fallback:
+            skipping[0] = 1
+        elif name in wanted:
+            offsets[wanted[name]].append(parser.CurrentByteIndex)
+
+    def end(name):
+        if skipping[0]:
+            skipping[0] -= 1
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.Parse(bytes(data), True)
+    return offsets
+
+
+class PartLocations:
+    """Ordinals and offsets for the elements of one story part"""
+
+    def __init__(self, pkg, part):
+        root = pkg.xml(part)
+        self.ordinals = {kind: {elem: i for i, elem in enumerate(root.iter(tag))}
+                         for kind, tag in KIND_TAGS.items()}
+        self.offsets = element_offsets(pkg.read(part))
+
+        # Paragraph and character offset of each drawing's anchor run; a drawing
+        # inside a text box ends up with the innermost paragraph
+        self.anchors = {}
+        for paragraph in root.iter(W + 'p'):
+            ordinal = self.ordinals['paragraph'][paragraph]
+            offset = 0
+            for run in iter_runs(paragraph):
+                for doc_pr in run.iter(WP + 'docPr'):
+                    self.anchors[doc_pr] = (ordinal, offset)
+                offset += len(run_text(run))
+
+    def locate(self, kind, element, offset):
+        ordinal = self.ordinals[kind][element]
+        byte = self.offsets[kind][ordinal]
+        if kind == 'paragraph':
+            return ordinal, ordinal, offset or 0, byte
+        if kind == 'drawing':
+            paragraph, offset = self.anchors.get(element, (None, None))
+            return ordinal, paragraph, offset, byte
+        first = next(element.iter(W + 'p'), None)
+        return ordinal, self.ordinals['paragraph'].get(first), 0, byte
+
+
+def build_index(pkg, found):
+    """Compact location index from evaluate(..., locate=True)['found'].
+
+    {'v': 1, 'parts': [part names], 'issues': {category: [[part number, kind,
+    ordinal, paragraph, offset, byte], ...]}}; part number is -1 for findings
+    about the package itself.
+    """
+    parts, located, issues = [], {}, {}
+    for category, findings in found.items():
+        rows = issues.setdefault(category, [])
+        for part, kind, element, offset in findings:
+            if part is not None and part not in parts:
+                parts.append(part)
+            number = parts.index(part) if part is not None else -1
+            if kind in KIND_TAGS:
+                if part not in located:
+                    located[part] = PartLocations(pkg, part)
+                rows.append([number, kind, *located[part].locate(kind, element, offset)])
+            else:
+                rows.append([number, kind, None, None, None, None])
+    return {'v': INDEX_VERSION, 'parts': parts, 'issues': issues}
+
+
+def merge_indexes(indexes):
+    """One index from the indexes of tasks that checked different story parts of a document"""
+    parts, issues = [], {}
+    for index in indexes:
+        for category, rows in index['issues'].items():
+            merged = issues.setdefault(category, [])
+            for number, *rest in rows:
+                if number >= 0:
+                    part = index['parts'][number]
+                    if part not in parts:
+                        parts.append(part)
+                    number = parts.index(part)
+                merged.append([number, *rest])
+    return {'v': INDEX_VERSION, 'parts': parts, 'issues': issues}
+
+
+def dumps(index):
+    return json.dumps(index, separators=(',', ':'))
+
+
+def loads(data):
+    index = json.loads(data)
+    if index.get('v') != INDEX_VERSION:
+        return None
+    return index
+
+
+def locators(index, category):
+    """Locators of one category as dicts"""
+    for number, kind, ordinal, paragraph, offset, byte in index['issues'].get(category, []):
+        yield {'part': index['parts'][number] if number >= 0 else None, 'kind': kind, 'ordinal': ordinal,
+               'paragraph': paragraph, 'offset': offset, 'byte': byte}
+
+
+def format_locator(locator):
+    """'word/document.xml drawing 3 (paragraph 12, char 40) @ byte 81234'"""
+    if locator['part'] is None:
+        return locator['kind']
+    if locator['ordinal'] is None:
+        return f"{locator['part']} {locator['kind']}"
+    text = f"{locator['part']} {locator['kind']} {locator['ordinal']}"
+    if locator['kind'] == 'paragraph':
+        text += f", char {locator['offset']}"
+    elif locator['paragraph'] is not None:
+        text += f" (paragraph {locator['paragraph']}, char {locator['offset']})"
+    return f"{text} @ byte {locator['byte']}"
+
+
+def locate_document(path):
+    """Check a document with locators; returns (counts, location index)"""
+    with DocxPackage(path) as pkg:
+        outcome = evaluate(pkg, locate=True)
+        return outcome['counts'], build_index(pkg, outcome['found'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List where the accessibility issues of a document are")
+    parser.add_argument('file')
+    parser.add_argument('--category', choices=[c for c, _ in CATEGORIES], action='append')
+    parser.add_argument('--db', default=None,
+                        help="use the location index stored in this results index when the document is unchanged")
+    parser.add_argument('--context', type=int, default=80, help="bytes of XML to show at each location")
+    args = parser.parse_args(argv)
+
+    index = None
+    if args.db:
+        from results_store import ResultsStore, file_digest
+        with ResultsStore(args.db) as store:
+            row = store.latest(args.file)
+            if row and row['digest'] == file_digest(args.file):
+                index = store.locations(args.file)
+    if index is None:
+        index = locate_document(args.file)[1]
+
+    # The stored byte offsets are used as they are: only the parts with issues are read, never parsed
+    with DocxPackage(args.file) as pkg:
+        data = {part: pkg.read(part) for part in index['parts']}
+        for category, label in CATEGORIES:
+            if args.category and category not in args.category:
+                continue
+            for locator in locators(index, category):
+                print(f"{label}: {format_locator(locator)}")
+                if locator['byte'] is not None and args.context:
+                    snippet = data[locator['part']][locator['byte']:locator['byte'] + args.context]
+                    print(f"    {snippet.decode('utf-8', 'replace')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
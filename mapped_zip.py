@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Memory-mapped, read-only zip access for large packages.
+
+The archive is mmapped and its central directory parsed directly. Stored
+entries are handed out as memoryview slices of the mapping, and deflated
+entries are inflated in chunks straight from the mapping. Nothing is
+read with seek + read, and media that a check never looks at is never
+touched. The pages that are touched stay in the page cache, so checking the
+same package again costs no storage reads. `io_counters()` makes that
+visible.
+
+    python mapped_zip.py big_report.docx --repeat 3
+    python mapped_zip.py big_report.docx --repeat 3 --drop-cache    # cold first run
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+
+STORED, DEFLATED = 0, 8
+CHUNK_SIZE = 64 * 1024
+
+END_RECORD = struct.Struct('<4sHHHHLLH')
+ZIP64_LOCATOR = struct.Struct('<4sLQL')
+ZIP64_END_RECORD = struct.Struct('<4sQHHLLQQQQ')
+CENTRAL_HEADER = struct.Struct('<4sHHHHHHLLLHHHHHLL')
+LOCAL_HEADER = struct.Struct('<4sHHHHHLLLHH')
+MAX_COMMENT = 0xFFFF
+
+ZipEntry = namedtuple('ZipEntry', 'name method flags crc compress_size file_size header_offset')
+
+
+def _zip64_extra(extra, entry_fields):
+    """Replace 0xFFFFFFFF sizes/offset with their values from the zip64 extra field"""
+    file_size, compress_size, offset = entry_fields
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack_from('<HH', extra, pos)
+        if tag == 0x0001:
+            values = iter(struct.unpack_from(f'<{length // 8}Q', extra, pos + 4))
+            # Only the fields that overflowed are present, in this order
+            if file_size == 0xFFFFFFFF:
+                file_size = next(values)
+            if compress_size == 0xFFFFFFFF:
+                compress_size = next(values)
+            if offset == 0xFFFFFFFF:
+                offset = next(values)
+            break
+        pos += 4 + length
+    return file_size, compress_size, offset
+
+
+class MappedZip:
+    """Zip archive over an mmap (or any bytes-like object), entries by name"""
+
+    def __init__(self, source):
+        self._file = None
+        self._map = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._view = memoryview(source)
+        else:
+            self._file = open(source, 'rb')
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file: mmap refuses zero lengths
+                self._file.close()
+                raise zipfile.BadZipFile("File is not a zip file")
+            if hasattr(self._map, 'madvise'):
+                # Only the parts we slice should be read; raw() asks for those ahead of use
+                self._map.madvise(mmap.MADV_RANDOM)
+            self._view = memoryview(self._map)
+        self.size = len(self._view)
+        # Compressed bytes sliced out of the mapping, i.e. what a check actually touched
+        self.touched = 0
+        self.entries = {}
+        try:
+            self._read_central_directory()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._view is None:
+            return
+        try:
+            self._view.release()
+            if self._map is not None:
+                self._map.close()
+        except BufferError:
+            # A caller still holds a slice; the mapping goes when that slice does
+            pass
+        self._view = self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _unpack(self, record, offset, what):
+        """record.unpack_from(view, offset), with a record cut short by the end of the file a BadZipFile"""
+        if offset < 0 or offset + record.size > self.size:
+            raise zipfile.BadZipFile(f"Truncated {what}")
+        return record.unpack_from(self._view, offset)
+
+    def _read_central_directory(self):
+        view = self._view
+        tail_start = max(0, self.size - END_RECORD.size - MAX_COMMENT)
+        end = bytes(view[tail_start:]).rfind(b'PK\x05\x06')
+        if end < 0:
+            raise zipfile.BadZipFile("File is not a zip file")
+        end += tail_start
+        (_, _, _, _, count, directory_size,
+         directory_offset, _) = self._unpack(END_RECORD, end, "end of central directory")
+
+        locator = end - ZIP64_LOCATOR.size
+        if locator >= 0 and view[locator:locator + 4] == b'PK\x06\x07':
+            zip64_end = ZIP64_LOCATOR.unpack_from(view, locator)[2]
+            if view[zip64_end:zip64_end + 4] != b'PK\x06\x06':
+                raise zipfile.BadZipFile("Corrupt zip64 end of central directory")
+            fields = self._unpack(ZIP64_END_RECORD, zip64_end, "zip64 end of central directory")
+            count, directory_size, directory_offset = fields[7], fields[8], fields[9]
+
+        pos = directory_offset
+        for _ in range(count):
+            if view[pos:pos + 4] != b'PK\x01\x02':
+                raise zipfile.BadZipFile("Bad magic number for central directory")
+            (_, _, _, flags, method, _, _, crc, compress_size, file_size,
+             name_length, extra_length, comment_length, _, _, _,
+             offset) = self._unpack(CENTRAL_HEADER, pos, "central directory")
+            pos += CENTRAL_HEADER.size
+            if pos + name_length + extra_length + comment_length > self.size:
+                raise zipfile.BadZipFile("Truncated central directory")
+            raw_name = bytes(view[pos:pos + name_length])
+            try:
+                name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+            except UnicodeDecodeError:
+                raise zipfile.BadZipFile(f"Undecodable entry name {raw_name!r}") from None
+            if 0xFFFFFFFF in (file_size, compress_size, offset):
+                extra = bytes(view[pos + name_length:pos + name_length + extra_length])
+                try:
+                    file_size, compress_size, offset = _zip64_extra(extra, (file_size, compress_size, offset))
+                except struct.error:
+                    raise zipfile.BadZipFile(f"Corrupt zip64 extra field for {name}") from None
+            pos += name_length + extra_length + comment_length
+            self.entries[name] = ZipEntry(name, method, flags, crc, compress_size, file_size, offset)
+
+    def namelist(self):
+        return list(self.entries)
+
+    def raw(self, name):
+        """memoryview of an entry's data as stored in the archive (compressed if it is)"""
+        entry = self.entries[name]
+        view = self._view
+        if view[entry.header_offset:entry.header_offset + 4] != b'PK\x03\x04':
+            raise zipfile.BadZipFile(f"Bad magic number for file header of {name}")
+        header = self._unpack(LOCAL_HEADER, entry.header_offset, f"file header of {name}")
+        start = entry.header_offset + LOCAL_HEADER.size + header[9] + header[10]
+        if start + entry.compress_size > self.size:
+            raise zipfile.BadZipFile(f"Truncated data for {name}")
+        self.touched += entry.compress_size
+        if self._map is not None and hasattr(self._map, 'madvise') and entry.compress_size:
+            page_start = start - start % mmap.PAGESIZE
+            self._map.madvise(mmap.MADV_WILLNEED, page_start, start + entry.compress_size - page_start)
+        return view[start:start + entry.compress_size]
+
+    def view(self, name):
+        """Zero-copy memoryview of a stored (uncompressed) entry"""
+        entry = self.entries[name]
+        if entry.method != STORED:
+            raise ValueError(f"{name} is compressed; use stream() or read()")
+        return self.raw(name)
+
+    def stream(self, name, chunk_size=CHUNK_SIZE):
+        """Yield an entry's uncompressed content in chunks, checking size and CRC at the end"""
+        entry = self.entries[name]
+        if entry.flags & 0x1:
+            raise zipfile.BadZipFile(f"{name} is encrypted")
+        if entry.method not in (STORED, DEFLATED):
+            raise zipfile.BadZipFile(f"{name}: unsupported compression method {entry.method}")
+
+        data = self.raw(name)
+        crc = size = 0
+        try:
+            if entry.method == STORED:
+                for start in range(0, len(data), chunk_size):
+                    chunk = data[start:start + chunk_size]
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                    yield chunk
+            else:
+                inflater = zlib.decompressobj(-15)
+                for start in range(0, len(data), chunk_size):
+                    try:
+                        chunk = inflater.decompress(data[start:start + chunk_size])
+                    except zlib.error as e:
+                        raise zipfile.BadZipFile(f"{name}: {e}") from None
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                    if size > entry.file_size:
+                        raise zipfile.BadZipFile(f"{name} inflates past its declared size")
+                    yield chunk
+                chunk = inflater.flush()
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                yield chunk
+        finally:
+            data.release()
+        if size != entry.file_size or crc != entry.crc:
+            raise zipfile.BadZipFile(f"Bad CRC-32 or size for {name}")
+
+    def read(self, name):
+        """Uncompressed content of an entry as bytes"""
+        return b''.join(self.stream(name, chunk_size=max(CHUNK_SIZE, self.entries[name].compress_size)))
+
+
+def io_counters():
+    """Process-wide storage reads and page faults so far.
+
+    read_bytes comes from /proc/self/io where available (bytes that really
+    came from storage, not the page cache), otherwise from block input
+    operations. Major faults are mmap pages that were not in the page cache.
+    """
+    counters = {'read_bytes': None, 'major_faults': None}
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        counters['major_faults'] = usage.ru_majflt
+        counters['read_bytes'] = usage.ru_inblock * 512
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key == 'read_bytes':
+                    counters['read_bytes'] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def counter_delta(before, after):
+    return {key: None if before[key] is None else after[key] - before[key] for key in before}
+
+
+def drop_cache(path):
+    """Ask the kernel to evict a file's clean pages (Linux), so the next run starts cold"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # Dirty pages cannot be dropped; write them back first
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def main(argv=None):
+    from native_checker import DocxPackage, evaluate
+
+    parser = argparse.ArgumentParser(description="Check a package repeatedly and show storage reads")
+    parser.add_argument('file')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--drop-cache', action='store_true',
+                        help="evict the file from the page cache before the first run (Linux)")
+    args = parser.parse_args(argv)
+
+    if args.drop_cache and not drop_cache(args.file):
+        print("Cannot drop the page cache on this platform")
+
+    size = os.path.getsize(args.file)
+    for run in range(1, args.repeat + 1):
+        before = io_counters()
+        start = time.perf_counter()
+        with DocxPackage(args.file) as pkg:
+            evaluate(pkg)
+            touched = pkg.zip.touched if pkg.zip is not None else 0
+        elapsed = time.perf_counter() - start
+        delta = counter_delta(before, io_counters())
+        read = 'n/a' if delta['read_bytes'] is None else f"{delta['read_bytes'] / 1e6:.1f} MB"
+        faults = 'n/a' if delta['major_faults'] is None else delta['major_faults']
+        print(f"run {run}: {elapsed * 1000:.0f} ms, touched {touched / 1e6:.1f} of {size / 1e6:.1f} MB, "
+              f"read from storage {read}, major faults {faults}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,575 @@
+import os
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from mapped_zip import MappedZip
+
+# Native accessibility checker: reads the .docx package directly instead of
+# driving Word, so it runs anywhere Python does (CI, Linux, upload hooks).
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+WP = '{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}'
+ADEC = '{http://schemas.microsoft.com/office/drawing/2017/decorative}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+DC_CREATOR = '{http://purl.org/dc/elements/1.1/}creator'
+CP_LAST_MODIFIED_BY = '{http://schemas.openxmlformats.org/package/2006/metadata/core-properties}lastModifiedBy'
+
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Same categories (and labels) as the Word accessibility pane scraped by
+# WordAccessibilityScraper.get_color_and_contrast_element
+CATEGORIES = [
+    ('contrast', 'Hard-to-read text contrast'),
+    ('heading', 'No headings in document'),
+    ('image', 'Missing alt text'),
+    ('table', 'Missing table header'),
+    ('cell', 'Use of merged or split cells'),
+    ('access', 'Restricted access'),
+]
+LABELS = dict(CATEGORIES)
+
+STORY_TYPES = ('/header', '/footer', '/footnotes', '/endnotes')
+
+# Paragraph containers that hold runs directly (w:del is left out on purpose,
+# deleted text is not part of the document any more)
+RUN_CONTAINERS = (W + 'hyperlink', W + 'ins', W + 'smartTag', W + 'sdt',
+                  W + 'sdtContent', W + 'fldSimple', W + 'customXml')
+
+HIGHLIGHT_COLORS = {
+    'black': '000000', 'blue': '0000FF', 'cyan': '00FFFF', 'green': '00FF00',
+    'magenta': 'FF00FF', 'red': 'FF0000', 'yellow': 'FFFF00', 'white': 'FFFFFF',
+    'darkBlue': '000080', 'darkCyan': '008080', 'darkGreen': '008000',
+    'darkMagenta': '800080', 'darkRed': '800000', 'darkYellow': '808000',
+    'darkGray': '808080', 'lightGray': 'C0C0C0',
+}
+
+
+def rel_part(folder, target):
+    """Part name of a relationship target: absolute from the package root, or relative to the source part's folder"""
+    return target.lstrip('/') if target.startswith('/') else f"{folder}/{target}"
+
+
+class DocxPackage:
+    """Read-only access to the parts of a .docx package, parsed once per part"""
+
+    def __init__(self, source, stories=None):
+        self.source = source
+        # Optional subset of story parts to check (used to split large documents)
+        self.stories = stories
+        self.zip = None
+        self.encrypted = False
+        self._xml = {}
+        self._styles = None
+        self._fonts = None
+        self._numbering = None
+        # time.monotonic() deadline of the evaluate() call in progress, for rules that walk every paragraph
+        self.deadline = None
+
+        if isinstance(source, (bytes, bytearray)):
+            header = bytes(source[:8])
+        else:
+            with open(source, 'rb') as f:
+                header = f.read(8)
+
+        # Encrypted / IRM protected documents are OLE compound files, not zips
+        if header == OLE_MAGIC:
+            self.encrypted = True
+            return
+
+        # mmapped: parts are sliced/inflated from the page cache, media is never touched
+        self.zip = MappedZip(source)
+        self.names = set(self.zip.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+            self.zip = None
+
+    def has_part(self, name):
+        return self.zip is not None and name in self.names
+
+    def read(self, name):
+        """Return the raw bytes of a part"""
+        return self.zip.read(name)
+
+    def xml(self, name):
+        """Return the parsed root of an XML part (or None if it is missing)"""
+        if name not in self._xml:
+            if not self.has_part(name):
+                self._xml[name] = None
+            else:
+                # Inflated chunks go straight to the parser, no full copy of the part
+                parser = ET.XMLParser()
+                for chunk in self.zip.stream(name):
+                    parser.feed(chunk)
+                root = parser.close()
+                _strip_fallbacks(root)
+                self._xml[name] = root
+        return self._xml[name]
+
+    def main_part(self):
+        """Name of the main document part, taken from the package relationships"""
+        rels = self.xml('_rels/.rels')
+        if rels is not None:
+            for rel in rels.iter(PKG_REL):
+                if rel.get('Type', '').endswith('/officeDocument'):
+                    return rel.get('Target').lstrip('/')
+        return 'word/document.xml'
+
+    def story_parts(self):
+        """Main document part followed by headers, footers, footnotes and endnotes"""
+        main = self.main_part()
+        parts = [main]
+        folder, base = main.rsplit('/', 1)
+        rels = self.xml(f"{folder}/_rels/{base}.rels")
+        if rels is not None:
+            for rel in rels.iter(PKG_REL):
+                if rel.get('Type', '').endswith(STORY_TYPES):
+                    name = rel_part(folder, rel.get('Target'))
+                    if self.has_part(name):
+                        parts.append(name)
+        if self.stories is not None:
+            parts = [name for name in parts if name in self.stories]
+        return parts
+
+    def styles(self):
+        if self._styles is None:
+            self._styles = StyleIndex(self.xml('word/styles.xml'))
+        return self._styles
+
+    def fonts(self, cache=None):
+        """Font metrics of the document's fonts (see font_metrics), shared by every check.
+
+        The first call picks the FontCache, the process-wide one by default.
+        """
+        if self._fonts is None:
+            from font_metrics import DocumentFonts, shared_cache
+            self._fonts = DocumentFonts(self, cache or shared_cache())
+        return self._fonts
+
+    def numbering(self):
+        """List levels and paragraph to list maps (see numbering_index), built once and shared by every check"""
+        if self._numbering is None:
+            from numbering_index import NumberingIndex
+            self._numbering = NumberingIndex(self)
+        return self._numbering
+
+
+class StyleIndex:
+    """Style lookups (with basedOn inheritance) needed by the rules"""
+
+    def __init__(self, root):
+        self.styles = {}
+        self.default_paragraph = None
+        self.default_rpr = {}
+        if root is None:
+            return
+
+        defaults = root.find(f"{W}docDefaults/{W}rPrDefault/{W}rPr")
+        if defaults is not None:
+            self.default_rpr = _rpr_props(defaults)
+
+        for style in root.iter(W + 'style'):
+            style_id = style.get(W + 'styleId')
+            name = style.find(W + 'name')
+            based_on = style.find(W + 'basedOn')
+            outline = style.find(f"{W}pPr/{W}outlineLvl")
+            rpr = style.find(W + 'rPr')
+            self.styles[style_id] = {
+                'type': style.get(W + 'type'),
+                'name': (name.get(W + 'val') if name is not None else style_id or '').lower(),
+                'based_on': based_on.get(W + 'val') if based_on is not None else None,
+                'outline': outline.get(W + 'val') if outline is not None else None,
+                'rpr': _rpr_props(rpr) if rpr is not None else {},
+            }
+            if style.get(W + 'type') == 'paragraph' and style.get(W + 'default') in ('1', 'true'):
+                self.default_paragraph = style_id
+
+    def chain(self, style_id):
+        """Yield the style and the styles it is based on, nearest first"""
+        seen = set()
+        while style_id and style_id in self.styles and style_id not in seen:
+            seen.add(style_id)
+            yield self.styles[style_id]
+            style_id = self.styles[style_id]['based_on']
+
+    def is_heading(self, style_id):
+        for style in self.chain(style_id or self.default_paragraph):
+            if style['name'].startswith('heading ') or style['outline'] not in (None, '9'):
+                return True
+        return False
+
+    def run_prop(self, key, run_style, para_style):
+        """Resolve a run property through character style, paragraph style and defaults"""
+        for style_id in (run_style, para_style or self.default_paragraph):
+            for style in self.chain(style_id):
+                if key in style['rpr']:
+                    return style['rpr'][key]
+        return self.default_rpr.get(key)
+
+
+def _strip_fallbacks(root):
+    """Drop mc:Fallback branches so alternate content is only seen once"""
+    for parent in root.iter():
+        for child in list(parent):
+            if child.tag == MC_FALLBACK:
+                parent.remove(child)
+
+
+def _val(elem, tag, attr='val'):
+    found = elem.find(W + tag) if elem is not None else None
+    return found.get(W + attr) if found is not None else None
+
+
+def _rpr_props(rpr):
+    props = {}
+    color = _val(rpr, 'color')
+    if color:
+        props['color'] = color
+    size = _val(rpr, 'sz')
+    if size:
+        props['size'] = int(size)
+    bold = rpr.find(W + 'b')
+    if bold is not None:
+        props['bold'] = bold.get(W + 'val') not in ('0', 'false')
+    fonts = rpr.find(W + 'rFonts')
+    if fonts is not None:
+        # Theme attributes win over explicit names; 'theme:minorHAnsi' is resolved against the theme part
+        theme = fonts.get(W + 'asciiTheme') or fonts.get(W + 'hAnsiTheme')
+        font = f"theme:{theme}" if theme else fonts.get(W + 'ascii') or fonts.get(W + 'hAnsi')
+        if font:
+            props['font'] = font
+    return props
+
+
+def _shading(pr):
+    fill = _val(pr, 'shd', 'fill')
+    if fill and fill.lower() != 'auto':
+        return fill
+    return None
+
+
+def iter_paragraphs(elem, fill=None):
+    """Yield (paragraph, cell background) pairs, including paragraphs in tables and text boxes"""
+    for child in elem:
+        if child.tag == W + 'tc':
+            yield from iter_paragraphs(child, _shading(child.find(W + 'tcPr')) or fill)
+        elif child.tag == W + 'p':
+            yield child, fill
+            yield from iter_paragraphs(child, None)
+        elif child.tag != W + 'del':
+            yield from iter_paragraphs(child, fill)
+
+
+def iter_runs(paragraph):
+    """Yield the runs of a paragraph, looking inside hyperlinks, insertions and content controls"""
+    for child in paragraph:
+        if child.tag == W + 'r':
+            yield child
+        elif child.tag in RUN_CONTAINERS:
+            yield from iter_runs(child)
+
+
+def run_text(run):
+    return ''.join(t.text or '' for t in run.iter(W + 't'))
+
+
+def relative_luminance(hex_color):
+    channels = []
+    for i in (0, 2, 4):
+        c = int(hex_color[i:i + 2], 16) / 255
+        channels.append(c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4)
+    r, g, b = channels
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def contrast_ratio(foreground, background):
+    """WCAG 2 contrast ratio between two RRGGBB colours"""
+    l1 = relative_luminance(foreground)
+    l2 = relative_luminance(background)
+    if l1 < l2:
+        l1, l2 = l2, l1
+    return (l1 + 0.05) / (l2 + 0.05)
+
+
+# Rules. Each takes a DocxPackage and returns the number of issues found.
+# Given a list as found, they also append one (part, kind, element, char
+# offset) per issue; issue_locations turns those into stored locators.
+
+def _found(found, part, kind, element, offset=None):
+    if found is not None:
+        found.append((part, kind, element, offset))
+
+
+# Paragraphs between deadline checks in the rules that walk every paragraph
+DEADLINE_STRIDE = 256
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside a rule when evaluate()'s deadline passes mid-rule"""
+
+
+def _check_deadline(pkg, seen):
+    if pkg.deadline is not None and seen % DEADLINE_STRIDE == 0 and time.monotonic() > pkg.deadline:
+        raise DeadlineExceeded()
+
+
+def check_restricted_access(pkg, found=None):
+    """Encrypted/IRM packages and enforced document protection"""
+    if pkg.encrypted:
+        _found(found, None, 'package', None)
+        return 1
+    settings = pkg.xml('word/settings.xml')
+    if settings is not None:
+        protection = settings.find(W + 'documentProtection')
+        if protection is not None and protection.get(W + 'enforcement') in ('1', 'true', 'on'):
+            _found(found, 'word/settings.xml', 'protection', protection)
+            return 1
+    return 0
+
+
+def check_missing_alt_text(pkg, found=None):
+    """Drawings with neither a description nor a decorative mark"""
+    count = 0
+    for part in pkg.story_parts():
+        for doc_pr in pkg.xml(part).iter(WP + 'docPr'):
+            if (doc_pr.get('descr') or '').strip():
+                continue
+            decorative = next(doc_pr.iter(ADEC + 'decorative'), None)
+            if decorative is not None and decorative.get('val') in ('1', 'true'):
+                continue
+            _found(found, part, 'drawing', doc_pr)
+            count += 1
+    return count
+
+
+def _has_header_row(table):
+    first_row = table.find(W + 'tr')
+    if first_row is not None and first_row.find(f"{W}trPr/{W}tblHeader") is not None:
+        return True
+    look = table.find(f"{W}tblPr/{W}tblLook")
+    if look is not None:
+        if look.get(W + 'firstRow') is not None:
+            return look.get(W + 'firstRow') in ('1', 'true')
+        return bool(int(look.get(W + 'val', '0'), 16) & 0x0020)
+    return False
+
+
+def check_missing_table_header(pkg, found=None):
+    """Tables whose first row is neither a repeating header nor header-formatted"""
+    count = 0
+    for part in pkg.story_parts():
+        for table in pkg.xml(part).iter(W + 'tbl'):
+            if len(table.findall(W + 'tr')) > 1 and not _has_header_row(table):
+                _found(found, part, 'table', table)
+                count += 1
+    return count
+
+
+def _has_merged_cells(table):
+    for row in table.findall(W + 'tr'):
+        cells = row.findall(W + 'tc')
+        for cell in cells:
+            if cell.find(f"{W}tcPr/{W}vMerge") is not None:
+                return True
+            span = _val(cell.find(W + 'tcPr'), 'gridSpan')
+            # A single cell spanning the whole row (a title row) reads fine
+            if span and int(span) > 1 and len(cells) > 1:
+                return True
+    return False
+
+
+def check_merged_cells(pkg, found=None):
+    """Tables with vertically merged cells or partial column spans"""
+    count = 0
+    for part in pkg.story_parts():
+        for table in pkg.xml(part).iter(W + 'tbl'):
+            if _has_merged_cells(table):
+                _found(found, part, 'table', table)
+                count += 1
+    return count
+
+
+def check_no_headings(pkg, found=None):
+    """1 when no paragraph in the main document uses a heading level"""
+    styles = pkg.styles()
+    for seen, (paragraph, _) in enumerate(iter_paragraphs(pkg.xml(pkg.main_part())), 1):
+        _check_deadline(pkg, seen)
+        ppr = paragraph.find(W + 'pPr')
+        outline = _val(ppr, 'outlineLvl')
+        if outline is not None and outline != '9':
+            return 0
+        if styles.is_heading(_val(ppr, 'pStyle')):
+            return 0
+    _found(found, pkg.main_part(), 'document', None)
+    return 1
+
+
+def check_text_contrast(pkg, found=None):
+    """Text runs below the WCAG AA contrast ratio against their background"""
+    styles = pkg.styles()
+    count = 0
+    seen = 0
+    for part in pkg.story_parts():
+        root = pkg.xml(part)
+        page = _val(root, 'background', 'color')
+        page = page if page and page.lower() != 'auto' else 'FFFFFF'
+        for paragraph, cell_fill in iter_paragraphs(root):
+            seen += 1
+            _check_deadline(pkg, seen)
+            ppr = paragraph.find(W + 'pPr')
+            para_style = _val(ppr, 'pStyle')
+            para_fill = _shading(ppr) if ppr is not None else None
+            offset = 0
+            for run in iter_runs(paragraph):
+                text = run_text(run)
+                offset += len(text)
+                if not text.strip():
+                    continue
+                rpr = run.find(W + 'rPr')
+                direct = _rpr_props(rpr) if rpr is not None else {}
+                run_style = _val(rpr, 'rStyle')
+
+                color = direct.get('color') or styles.run_prop('color', run_style, para_style)
+                if not color or color.lower() == 'auto':
+                    continue
+                highlight = HIGHLIGHT_COLORS.get(_val(rpr, 'highlight'))
+                background = ((_shading(rpr) if rpr is not None else None) or highlight
+                              or para_fill or cell_fill or page)
+
+                size = direct.get('size') or styles.run_prop('size', run_style, para_style) or 22
+                bold = direct.get('bold', styles.run_prop('bold', run_style, para_style))
+                large = size >= 36 or (bold and size >= 28)
+                try:
+                    ratio = contrast_ratio(color, background)
+                except ValueError:
+                    continue
+                if ratio < (3.0 if large else 4.5):
+                    _found(found, part, 'paragraph', paragraph, offset - len(text))
+                    count += 1
+    return count
+
+
+# Cheapest first: 'cost' is a rough relative weight used to order rules when
+# a caller only needs the first blocking finding. 'story' rules add up over
+# story parts; 'package' rules look at the document as a whole.
+RULES = [
+    {'category': 'access', 'severity': 'error', 'cost': 1, 'scope': 'package', 'check': check_restricted_access},
+    {'category': 'image', 'severity': 'error', 'cost': 2, 'scope': 'story', 'check': check_missing_alt_text},
+    {'category': 'table', 'severity': 'error', 'cost': 3, 'scope': 'story', 'check': check_missing_table_header},
+    {'category': 'cell', 'severity': 'warning', 'cost': 3, 'scope': 'story', 'check': check_merged_cells},
+    {'category': 'heading', 'severity': 'warning', 'cost': 4, 'scope': 'package', 'check': check_no_headings},
+    {'category': 'contrast', 'severity': 'warning', 'cost': 6, 'scope': 'story', 'check': check_text_contrast},
+]
+
+
+def evaluate(pkg, rules=None, stop_on=None, deadline=None, locate=False):
+    """Run rules cheapest first.
+
+    Stops at the first rule with a finding whose severity is in stop_on, or
+    once time.monotonic() passes deadline. The deadline is checked between
+    rules and, in the rules that walk every paragraph, every DEADLINE_STRIDE
+    paragraphs; parsing a part is never interrupted. A rule cut short by the
+    deadline gets no count. With locate, outcome['found'] holds each rule's
+    raw findings (see _found).
+    """
+    outcome = {'counts': {}, 'blocking': None, 'timed_out': False, 'found': {}}
+    previous, pkg.deadline = pkg.deadline, deadline
+    try:
+        for rule in sorted(rules or RULES, key=lambda r: r['cost']):
+            if deadline is not None and time.monotonic() > deadline:
+                outcome['timed_out'] = True
+                break
+            found = [] if locate else None
+            if pkg.encrypted and rule['category'] != 'access':
+                count = 0
+            else:
+                try:
+                    count = rule['check'](pkg, found)
+                except DeadlineExceeded:
+                    outcome['timed_out'] = True
+                    break
+            outcome['counts'][rule['category']] = count
+            if locate:
+                outcome['found'][rule['category']] = found
+            if count and stop_on and rule['severity'] in stop_on:
+                outcome['blocking'] = rule
+                break
+    finally:
+        pkg.deadline = previous
+    return outcome
+
+
+def format_results(counts):
+    """Build a results dict in the same shape as the Word pane scraper"""
+    results = {'timestamp': datetime.now().isoformat()}
+    for category, label in CATEGORIES:
+        count = counts.get(category)
+        results[category] = f"{label} - {count}" if count is not None else None
+    return results
+
+
+def parse_count(text):
+    """'Missing alt text - 1' -> 1 (None when the category was not found)"""
+    if not text:
+        return None
+    try:
+        return int(text.rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def document_author(pkg):
+    """Author from docProps/core.xml (creator, else last modified by)"""
+    core = pkg.xml('docProps/core.xml')
+    if core is None:
+        return None
+    for tag in (DC_CREATOR, CP_LAST_MODIFIED_BY):
+        found = core.find(tag)
+        if found is not None and (found.text or '').strip():
+            return found.text.strip()
+    return None
+
+
+def run_native_checker(file_path, locate=False):
+    """Check a .docx without Word and return pane-style results.
+
+    With locate, results['locations'] is the issue location index (see
+    issue_locations).
+    """
+    if not os.path.exists(file_path):
+        print(f"File not found: {file_path}")
+        return None
+
+    try:
+        with DocxPackage(file_path) as pkg:
+            outcome = evaluate(pkg, locate=locate)
+            results = format_results(outcome['counts'])
+            results['author'] = document_author(pkg)
+            if locate:
+                from issue_locations import build_index
+                results['locations'] = build_index(pkg, outcome['found'])
+        return results
+    except (zipfile.BadZipFile, ET.ParseError) as e:
+        print(f"Could not read {file_path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    for path in sys.argv[1:]:
+        results = run_native_checker(path)
+        if results:
+            print(os.path.basename(path))
+            for category, _ in CATEGORIES:
+                print(f"  {results[category]}")
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""List structure from numbering.xml, resolved once per document.
+
+Whether a paragraph is a list item, and at which level, takes three lookups:
+
+    w:numPr on the paragraph, or on its style (with basedOn)
+      -> w:num in numbering.xml, with its w:lvlOverride entries
+        -> w:abstractNum levels, or those of the numbering style its
+           w:numStyleLink points to
+
+NumberingIndex does this once per package for every (numId, level) and every
+paragraph style. Each story part is then walked once into a map from
+paragraph to (numId, level), so a rule asks for a paragraph's list in
+constant time and a whole document costs one pass.
+
+Two advisory rules, outside the Word pane categories, use it:
+
+    manual_list     paragraphs that are not list items but start with a typed
+                    bullet or number ("•", "-", "*", "o", "1.", "a)" ...);
+                    screen readers announce them as plain text, not a list.
+                    Unambiguous bullet characters count on their own, dashes,
+                    asterisks and numbers only in two or more consecutive
+                    paragraphs
+    list_structure  list items that skip a level (level 1 straight to level 3,
+                    or a list that starts nested), and items that follow an
+                    item of the same level in another list, which screen
+                    readers announce as a new list
+
+    python numbering_index.py corpus/
+    python numbering_index.py Minster_Resume.docx --show
+"""
+import argparse
+import re
+import sys
+import time
+from collections import namedtuple
+
+from native_checker import PKG_REL, W, _found, _rpr_props, _val, evaluate, iter_paragraphs, iter_runs, rel_part
+
+# Levels Word defines per list
+LEVELS = 9
+
+# Characters only ever typed as bullets; a paragraph starting with one is a fake list item
+BULLETS = set('•●▪■□◦○‣⁃∙◆◇♦❖➢➤►▸✓✔☐')
+# Markers that also start ordinary text; they count in runs of two or more paragraphs
+WEAK_BULLETS = set('-*–—>·')
+# 1.  2)  (a)  b.  iv)
+NUMBER_MARKER = re.compile(r'\(?(\d{1,3}|[A-Za-z]|[ivxlcdmIVXLCDM]{2,6})[.)]\s')
+# A lone i, v, x ... is a letter after "h." and a Roman numeral before "ii."
+ROMAN_LETTERS = set('ivxlcdmIVXLCDM')
+
+# font: the marker's own font (the level's w:rPr rFonts), None when it follows the paragraph
+Level = namedtuple('Level', 'abstract_id format text start font')
+
+
+def _int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _num_pr(ppr):
+    """(numId, ilvl) set by a pPr, either of them None when it is not set"""
+    num_pr = ppr.find(W + 'numPr') if ppr is not None else None
+    if num_pr is None:
+        return None, None
+    return _val(num_pr, 'numId'), _int(_val(num_pr, 'ilvl'))
+
+
+class NumberingIndex:
+    """Every list level of a package and the paragraph to list map of each story part"""
+
+    def __init__(self, pkg):
+        self.pkg = pkg
+        # (numId, ilvl) -> Level
+        self.levels = {}
+        self._styles = {}
+        self._default_style = None
+        self._style_numbering = {}
+        self._parts = {}
+
+        styles = pkg.xml('word/styles.xml')
+        for style in (styles.iter(W + 'style') if styles is not None else ()):
+            based_on = style.find(W + 'basedOn')
+            self._styles[style.get(W + 'styleId')] = (
+                _num_pr(style.find(W + 'pPr')), based_on.get(W + 'val') if based_on is not None else None)
+            if style.get(W + 'type') == 'paragraph' and style.get(W + 'default') in ('1', 'true'):
+                self._default_style = style.get(W + 'styleId')
+
+        root = pkg.xml(self._numbering_part())
+        if root is None:
+            return
+        abstracts = {}
+        for abstract in root.iter(W + 'abstractNum'):
+            levels = {_int(lvl.get(W + 'ilvl'), 0): lvl for lvl in abstract.iter(W + 'lvl')}
+            link = _val(abstract, 'numStyleLink')
+            abstracts[abstract.get(W + 'abstractNumId')] = (levels, link)
+        nums = {}
+        for num in root.iter(W + 'num'):
+            overrides = {}
+            for override in num.iter(W + 'lvlOverride'):
+                overrides[_int(override.get(W + 'ilvl'), 0)] = (
+                    _int(_val(override, 'startOverride')), override.find(W + 'lvl'))
+            nums[num.get(W + 'numId')] = (_val(num, 'abstractNumId'), overrides)
+
+        for num_id, (abstract_id, overrides) in nums.items():
+            abstract_id, levels = self._abstract_levels(abstract_id, abstracts, nums)
+            if levels is None:
+                continue
+            for ilvl in range(LEVELS):
+                start, lvl = overrides.get(ilvl, (None, None))
+                if lvl is None:
+                    lvl = levels.get(ilvl)
+                if lvl is None:
+                    continue
+                if start is None:
+                    start = _int(_val(lvl, 'start'), 1)
+                rpr = lvl.find(W + 'rPr')
+                self.levels[num_id, ilvl] = Level(abstract_id, _val(lvl, 'numFmt') or 'decimal',
+                                                  _val(lvl, 'lvlText') or '', start,
+                                                  _rpr_props(rpr).get('font') if rpr is not None else None)
+
+    def _numbering_part(self):
+        main = self.pkg.main_part()
+        folder, base = main.rsplit('/', 1)
+        rels = self.pkg.xml(f"{folder}/_rels/{base}.rels")
+        for rel in (rels.iter(PKG_REL) if rels is not None else ()):
+            if rel.get('Type', '').endswith('/numbering'):
+                return rel_part(folder, rel.get('Target'))
+        return f"{folder}/numbering.xml"
+
+    def _abstract_levels(self, abstract_id, abstracts, nums):
+        """Levels of an abstractNum, following numStyleLink to the list a numbering style defines"""
+        seen = set()
+        while abstract_id in abstracts and abstract_id not in seen:
+            seen.add(abstract_id)
+            levels, link = abstracts[abstract_id]
+            if not link:
+                return abstract_id, levels
+            num_id, _ = self.style_numbering(link)
+            if num_id not in nums:
+                return abstract_id, levels
+            abstract_id = nums[num_id][0]
+        return abstract_id, None
+
+    def style_numbering(self, style_id):
+        """(numId, ilvl) a paragraph style gives its paragraphs, through basedOn; numId None if none"""
+        if style_id not in self._style_numbering:
+            num_id = ilvl = None
+            seen = set()
+            current = style_id
+            while current in self._styles and current not in seen:
+                seen.add(current)
+                (style_num, style_ilvl), current = self._styles[current]
+                num_id = num_id if num_id is not None else style_num
+                ilvl = ilvl if ilvl is not None else style_ilvl
+            self._style_numbering[style_id] = (num_id, ilvl or 0)
+        return self._style_numbering[style_id]
+
+    def numbering(self, paragraph):
+        """(numId, ilvl) of a paragraph, or None when it is not a list item"""
+        ppr = paragraph.find(W + 'pPr')
+        num_id, ilvl = _num_pr(ppr)
+        if num_id is None or ilvl is None:
+            style_num, style_ilvl = self.style_numbering(_val(ppr, 'pStyle') or self._default_style)
+            num_id = num_id if num_id is not None else style_num
+            ilvl = ilvl if ilvl is not None else style_ilvl
+        # numId 0 switches numbering off; an unknown numId shows no number either
+        if (num_id, ilvl) not in self.levels:
+            return None
+        return num_id, ilvl
+
+    def part(self, part):
+        """PartLists of a story part, built on first use"""
+        if part not in self._parts:
+            self._parts[part] = PartLists(self, self.pkg.xml(part))
+        return self._parts[part]
+
+
+class PartLists:
+    """One pass over a story part: list item of each paragraph, and the paragraph just before each one"""
+
+    def __init__(self, index, root):
+        # paragraph -> (numId, ilvl), list items only
+        self.items = {}
+        # paragraph -> the paragraph directly before it in the same body, cell or text box
+        self.previous = {}
+        if root is None:
+            return
+        levels = index.levels
+        for parent in root.iter():
+            previous = None
+            for child in parent:
+                if child.tag == W + 'p':
+                    if previous is not None:
+                        self.previous[child] = previous
+                    previous = child
+                    if levels:
+                        item = index.numbering(child)
+                        if item is not None:
+                            self.items[child] = item
+                elif child.tag in (W + 'tbl', W + 'sdt', W + 'altChunk'):
+                    previous = None
+
+
+def _leading_text(paragraph, limit=8):
+    """First characters of a paragraph with tabs and w:sym characters, leading white space dropped"""
+    text = ''
+    for run in iter_runs(paragraph):
+        for child in run:
+            if child.tag == W + 't':
+                text += child.text or ''
+            elif child.tag in (W + 'tab', W + 'ptab'):
+                text += '\t'
+            elif child.tag == W + 'sym':
+                try:
+                    text += chr(int(child.get(W + 'char') or '', 16))
+                except ValueError:
+                    pass
+            elif child.tag in (W + 'br', W + 'cr'):
+                text += '\n'
+        text = text.lstrip()
+        if len(text) >= limit:
+            break
+    return text
+
+
+def manual_marker(text):
+    """'bullet' for a typed bullet, 'weak' for a dash-like one, 'number', 'letter', 'roman' or
+    'letter or roman' (a lone i, v, x ...), else None"""
+    if len(text) < 2:
+        return None
+    first, second = text[0], text[1]
+    if first in BULLETS or 0xF000 <= ord(first) <= 0xF0FF:
+        # Private use F0xx: Symbol and Wingdings bullets inserted with w:sym
+        return 'bullet'
+    if first in WEAK_BULLETS and second.isspace() or first == 'o' and second == '\t':
+        return 'weak'
+    match = NUMBER_MARKER.match(text)
+    if match:
+        marker = match.group(1)
+        if marker.isdigit():
+            return 'number'
+        if len(marker) > 1:
+            return 'roman'
+        return 'letter or roman' if marker in ROMAN_LETTERS else 'letter'
+    return None
+
+
+def _same_list(kind, other):
+    """Whether two typed markers can be neighbours in one list"""
+    if kind == other:
+        return True
+    return 'letter or roman' in (kind, other) and {kind, other} <= {'letter', 'roman', 'letter or roman'}
+
+
+def check_manual_lists(pkg, found=None):
+    """Paragraphs made to look like list items with typed bullets or numbers"""
+    index = pkg.numbering()
+    styles = pkg.styles()
+    count = 0
+    for part in pkg.story_parts():
+        lists = index.part(part)
+        # Weak candidates waiting for a neighbour of the same kind: paragraph -> (kind, counted)
+        pending = {}
+        for paragraph, _ in iter_paragraphs(pkg.xml(part)):
+            if paragraph in lists.items:
+                continue
+            kind = manual_marker(_leading_text(paragraph))
+            if kind is None or styles.is_heading(_val(paragraph.find(W + 'pPr'), 'pStyle')):
+                continue
+            if kind == 'bullet':
+                _found(found, part, 'paragraph', paragraph, 0)
+                count += 1
+                continue
+            before = pending.get(lists.previous.get(paragraph))
+            counted = False
+            if before is not None and _same_list(before[0], kind):
+                if not before[1]:
+                    _found(found, part, 'paragraph', lists.previous[paragraph], 0)
+                    count += 1
+                _found(found, part, 'paragraph', paragraph, 0)
+                count += 1
+                counted = True
+            pending[paragraph] = (kind, counted)
+    return count
+
+
+def check_list_structure(pkg, found=None):
+    """List items that skip a level, or start a new list right after an item of the same level"""
+    index = pkg.numbering()
+    count = 0
+    for part in pkg.story_parts():
+        lists = index.part(part)
+        if not lists.items:
+            continue
+        # Level of the last item seen in each list
+        last = {}
+        for paragraph, _ in iter_paragraphs(pkg.xml(part)):
+            item = lists.items.get(paragraph)
+            if item is None:
+                continue
+            num_id, ilvl = item
+            before = lists.items.get(lists.previous.get(paragraph))
+            skipped = ilvl > last.get(num_id, -1) + 1
+            split = before is not None and before[0] != num_id and before[1] == ilvl
+            if skipped or split:
+                _found(found, part, 'paragraph', paragraph, 0)
+                count += 1
+            last[num_id] = ilvl
+    return count
+
+
+# Same shape as native_checker.RULES; run them with evaluate(pkg, rules=LIST_RULES)
+LIST_RULES = [
+    {'category': 'manual_list', 'severity': 'warning', 'cost': 5, 'scope': 'story', 'check': check_manual_lists},
+    {'category': 'list_structure', 'severity': 'warning', 'cost': 4, 'scope': 'story', 'check': check_list_structure},
+]
+
+
+def main(argv=None):
+    from batch_check import find_documents
+    from native_checker import DocxPackage, run_text
+
+    parser = argparse.ArgumentParser(description="Check list structure and typed bullets with the numbering index")
+    parser.add_argument('inputs', nargs='+', help="documents or folders")
+    parser.add_argument('--show', action='store_true', help="show each document's list items and levels")
+    args = parser.parse_args(argv)
+
+    totals = {rule['category']: 0 for rule in LIST_RULES}
+    documents = failed = 0
+    start = time.perf_counter()
+    for path in find_documents(args.inputs):
+        try:
+            with DocxPackage(path) as pkg:
+                if pkg.encrypted:
+                    continue
+                counts = evaluate(pkg, rules=LIST_RULES)['counts']
+                if args.show:
+                    index = pkg.numbering()
+                    print(path)
+                    for part in pkg.story_parts():
+                        items = index.part(part).items
+                        for paragraph, _ in iter_paragraphs(pkg.xml(part)):
+                            if paragraph in items:
+                                num_id, ilvl = items[paragraph]
+                                level = index.levels[num_id, ilvl]
+                                text = ''.join(run_text(run) for run in iter_runs(paragraph))
+                                print(f"    {'  ' * ilvl}list {num_id} level {ilvl} {level.format} "
+                                      f"{level.text!r}: {text[:60]}")
+        except Exception as e:
+            print(f"{path}: {type(e).__name__}: {e}")
+            failed += 1
+            continue
+        documents += 1
+        for category, count in counts.items():
+            totals[category] += count
+        if any(counts.values()):
+            print(f"{path}: " + ', '.join(f"{category} {count}" for category, count in counts.items()))
+    elapsed = time.perf_counter() - start
+
+    print(', '.join(f"{category} {count}" for category, count in totals.items()))
+    print(f"{documents} documents in {elapsed:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
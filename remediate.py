@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""Mechanical accessibility fixes written straight into the package.
+
+- tables without a header row get <w:tblHeader/> on their first row
+- drawings without alt text get a placeholder description; with
+  decorative_duplicates (--decorative-duplicates), images used more than once
+  in the document (logos, dividers) are marked decorative instead. That is a
+  guess, so it is off unless asked for: a repeated chart or photo needs a
+  real description as much as any other
+- with --out, documents that need no fix are copied as they are, so the
+  output folder mirrors the input
+
+Only the story parts that actually change are re-compressed. Every other zip
+entry (media, fonts, styles...) is copied byte for byte, compressed data
+included. Edits are spliced into the original XML bytes at offsets found by
+expat rather than re-serialised, so namespace prefixes, mc:Ignorable and
+formatting survive untouched.
+
+    python remediate.py corpus/ --out fixed/
+    python remediate.py report.docx --in-place
+"""
+import argparse
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from xml.parsers import expat
+from xml.sax.saxutils import quoteattr
+
+from batch_check import find_documents
+from native_checker import PKG_REL, DocxPackage
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+ADEC_NS = 'http://schemas.microsoft.com/office/drawing/2017/decorative'
+
+# A start tag up to its closing '>', stepping over attribute values (which may contain '>')
+START_TAG = re.compile(rb'<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*\s*/?>')
+ATTRIBUTE = re.compile(rb'\s+([^\s=/>]+)\s*=\s*(?:"[^"]*"|\'[^\']*\')')
+
+PLACEHOLDER_ALT_TEXT = "Image description needed (placeholder added automatically)"
+
+DECORATIVE_EXT = (
+    '<a:extLst xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+    '<a:ext uri="{C183D7F6-B498-43B3-948B-1728B52AA6E4}">'
+    '<adec:decorative xmlns:adec="http://schemas.microsoft.com/office/drawing/2017/decorative" val="1"/>'
+    '</a:ext></a:extLst>')
+
+
+class PartScanner:
+    """One expat pass over a story part, noting byte offsets of what may need fixing"""
+
+    def __init__(self, data):
+        self.data = data
+        self.tables = []        # finished tables needing a header
+        self.drawings = []      # finished drawings: {'doc_pr': {...}, 'embeds': [...]}
+        self._stack = []        # open element names
+        self._elements = []     # open element offsets/info, parallel to _stack
+        self._table_stack = []
+        self._drawing = None
+
+        parser = expat.ParserCreate(namespace_separator=' ')
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        self._parser = parser
+        parser.Parse(data, True)
+
+    def _tag_info(self, offset):
+        # expat reports where the tag starts, not where it ends
+        end = START_TAG.match(self.data, offset).end() - 1
+        name = self.data[offset + 1:end].split(None, 1)[0].rstrip(b'/')
+        prefix = name.split(b':', 1)[0] if b':' in name else b''
+        return {'start': offset, 'name': name, 'tag_end': end, 'self_closing': self.data[end - 1:end] == b'/',
+                'prefix': prefix, 'end': None}
+
+    def _start(self, name, attrs):
+        info = self._tag_info(self._parser.CurrentByteIndex)
+        parent = self._stack[-1] if self._stack else None
+        self._stack.append(name)
+        self._elements.append(info)
+        table = self._table_stack[-1] if self._table_stack else None
+
+        if name == f'{W_NS} tbl':
+            self._table_stack.append({'rows': 0, 'first_row': None, 'tr_pr': None, 'tbl_pr_ex': None,
+                                      'header': False, 'look': None})
+        elif table is not None and name == f'{W_NS} tr' and parent == f'{W_NS} tbl':
+            table['rows'] += 1
+            if table['rows'] == 1:
+                table['first_row'] = info
+        elif table is not None and table['rows'] == 1 and parent == f'{W_NS} tr':
+            if name == f'{W_NS} trPr':
+                table['tr_pr'] = info
+            elif name == f'{W_NS} tblPrEx':
+                table['tbl_pr_ex'] = info
+        elif table is not None and table['rows'] == 1 and name == f'{W_NS} tblHeader' \
+                and parent == f'{W_NS} trPr' and len(self._stack) >= 3 and self._stack[-3] == f'{W_NS} tr':
+            table['header'] = True
+        elif table is not None and name == f'{W_NS} tblLook' and len(self._stack) >= 3 \
+                and self._stack[-3] == f'{W_NS} tbl':
+            table['look'] = attrs
+
+        elif name in (f'{WP_NS} inline', f'{WP_NS} anchor'):
+            self._drawing = {'doc_pr': None, 'embeds': []}
+        elif self._drawing is not None and name == f'{WP_NS} docPr':
+            descr = _attribute_span(self.data, info, b'descr')
+            info.update(descr=attrs.get('descr', ''), decorative=False, ext_lst=False, descr_span=descr)
+            self._drawing['doc_pr'] = info
+        elif self._drawing is not None and name == f'{A_NS} extLst' and parent == f'{WP_NS} docPr':
+            self._drawing['doc_pr']['ext_lst'] = True
+        elif self._drawing is not None and name == f'{ADEC_NS} decorative':
+            if attrs.get('val') in ('1', 'true') and self._drawing['doc_pr'] is not None:
+                self._drawing['doc_pr']['decorative'] = True
+        elif self._drawing is not None and name == f'{A_NS} blip' and f'{R_NS} embed' in attrs:
+            self._drawing['embeds'].append(attrs[f'{R_NS} embed'])
+
+    def _end(self, name):
+        self._stack.pop()
+        info = self._elements.pop()
+        if info['self_closing']:
+            info['end'] = info['tag_end'] + 1
+        else:
+            offset = self._parser.CurrentByteIndex
+            info['end_tag'] = offset
+            info['end'] = self.data.index(b'>', offset) + 1
+
+        if name == f'{W_NS} tbl':
+            table = self._table_stack.pop()
+            if table['rows'] > 1 and not table['header'] and not _look_has_header(table['look']):
+                self.tables.append(table)
+        elif name in (f'{WP_NS} inline', f'{WP_NS} anchor') and self._drawing is not None:
+            if self._drawing['doc_pr'] is not None:
+                self.drawings.append(self._drawing)
+            self._drawing = None
+
+
+def _attribute_span(data, info, name):
+    """(start, end) of an attribute in a start tag, leading whitespace included; None if absent"""
+    at = info['start'] + 1 + len(info['name'])
+    while True:
+        attribute = ATTRIBUTE.match(data, at, info['tag_end'])
+        if attribute is None:
+            return None
+        if attribute.group(1) == name:
+            return attribute.span()
+        at = attribute.end()
+
+
+def _look_has_header(look):
+    """Same reading of w:tblLook as native_checker's table header rule"""
+    if not look:
+        return False
+    if f'{W_NS} firstRow' in look:
+        return look[f'{W_NS} firstRow'] in ('1', 'true')
+    return bool(int(look.get(f'{W_NS} val', '0'), 16) & 0x0020)
+
+
+def table_header_edit(table):
+    """(offset, bytes to remove, bytes to insert) that marks the first row as a header"""
+    tr_pr = table['tr_pr']
+    if tr_pr is not None:
+        p = tr_pr['prefix'] + b':' if tr_pr['prefix'] else b''
+        if tr_pr['self_closing']:
+            return tr_pr['tag_end'] - 1, 2, b'><' + p + b'tblHeader/></' + p + b'trPr>'
+        return tr_pr['tag_end'] + 1, 0, b'<' + p + b'tblHeader/>'
+    row = table['first_row']
+    p = row['prefix'] + b':' if row['prefix'] else b''
+    # trPr comes after tblPrEx, before the cells
+    after = table['tbl_pr_ex']['end'] if table['tbl_pr_ex'] else row['tag_end'] + 1
+    return after, 0, b'<' + p + b'trPr><' + p + b'tblHeader/></' + p + b'trPr>'
+
+
+def alt_text_edit(doc_pr, decorative, alt_text):
+    """Edit that adds a decorative mark or a placeholder description to a wp:docPr"""
+    p = doc_pr['prefix'] + b':' if doc_pr['prefix'] else b''
+    if decorative and not doc_pr['ext_lst']:
+        ext = DECORATIVE_EXT.encode()
+        if doc_pr['self_closing']:
+            return doc_pr['tag_end'] - 1, 2, b'>' + ext + b'</' + p + b'docPr>'
+        return doc_pr['end_tag'], 0, ext
+    attribute = b' descr=' + quoteattr(alt_text).encode()
+    if doc_pr['descr_span']:
+        # An existing empty descr="" is replaced rather than duplicated
+        start, end = doc_pr['descr_span']
+        return start, end - start, attribute
+    at = doc_pr['tag_end'] - 1 if doc_pr['self_closing'] else doc_pr['tag_end']
+    return at, 0, attribute
+
+
+def apply_edits(data, edits):
+    """Splice (offset, remove, insert) edits into data, last offset first"""
+    out = bytearray(data)
+    for offset, remove, insert in sorted(edits, key=lambda e: e[0], reverse=True):
+        out[offset:offset + remove] = insert
+    return bytes(out)
+
+
+def part_targets(pkg, part):
+    """rId -> target for a part's relationships"""
+    folder, base = part.rsplit('/', 1)
+    rels = pkg.xml(f"{folder}/_rels/{base}.rels")
+    if rels is None:
+        return {}
+    return {rel.get('Id'): rel.get('Target') for rel in rels.iter(PKG_REL)}
+
+
+def plan_fixes(pkg, alt_text=PLACEHOLDER_ALT_TEXT, decorative_duplicates=False):
+    """Work out the new bytes of every story part that needs fixing.
+
+    Returns ({part name: new bytes}, {'table': n, 'alt_text': n, 'decorative': n}).
+    """
+    scans = {}
+    usage = {}
+    for part in pkg.story_parts():
+        scan = PartScanner(pkg.read(part))
+        scans[part] = scan
+        targets = part_targets(pkg, part)
+        for drawing in scan.drawings:
+            drawing['targets'] = [targets.get(rid, rid) for rid in drawing['embeds']]
+            for target in drawing['targets']:
+                usage[target] = usage.get(target, 0) + 1
+
+    replacements = {}
+    fixed = {'table': 0, 'alt_text': 0, 'decorative': 0}
+    for part, scan in scans.items():
+        edits = [table_header_edit(table) for table in scan.tables]
+        fixed['table'] += len(edits)
+        for drawing in scan.drawings:
+            doc_pr = drawing['doc_pr']
+            if doc_pr['descr'].strip() or doc_pr['decorative']:
+                continue
+            repeated = decorative_duplicates and any(usage[t] > 1 for t in drawing['targets'])
+            decorative = repeated and not doc_pr['ext_lst']
+            edits.append(alt_text_edit(doc_pr, decorative, alt_text))
+            fixed['decorative' if decorative else 'alt_text'] += 1
+        if edits:
+            replacements[part] = apply_edits(scan.data, edits)
+    return replacements, fixed
+
+
+LOCAL_HEADER = struct.Struct('<4sHHHHHLLLHH')
+CENTRAL_HEADER = struct.Struct('<4sBBBBHHHHLLLHHHHHLL')
+END_RECORD = struct.Struct('<4sHHHHLLH')
+ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def _dos_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _encoded_name(info):
+    # Bit 11 means the name is UTF-8, otherwise it is cp437
+    if info.flag_bits & 0x800:
+        return info.filename.encode('utf-8')
+    return info.filename.encode('cp437')
+
+
+def rewrite_package(source, destination, replacements):
+    """Write a copy of the zip at source, with some entries replaced.
+
+    Unchanged entries are copied as raw compressed bytes; only the entries in
+    replacements ({name: bytes}) are deflated again.
+    """
+    with open(source, 'rb') as src, zipfile.ZipFile(source) as zf, open(destination, 'wb') as out:
+        central = []
+        for info in zf.infolist():
+            name = _encoded_name(info)
+            flags = info.flag_bits & ~0x08   # sizes go in the local header, no data descriptor
+            if info.filename in replacements:
+                data = replacements[info.filename]
+                compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                payload = compressor.compress(data) + compressor.flush()
+                crc, size, method = zlib.crc32(data), len(data), zipfile.ZIP_DEFLATED
+                flags &= ~0x06   # compression level bits describe the new stream
+            else:
+                src.seek(info.header_offset)
+                header = LOCAL_HEADER.unpack(src.read(LOCAL_HEADER.size))
+                src.seek(header[9] + header[10], os.SEEK_CUR)
+                payload = src.read(info.compress_size)
+                crc, size, method = info.CRC, info.file_size, info.compress_type
+
+            offset = out.tell()
+            if max(offset, len(payload), size) >= ZIP64_LIMIT:
+                raise ValueError("packages that need zip64 are not supported")
+            dos_time, dos_date = _dos_time(info.date_time)
+            out.write(LOCAL_HEADER.pack(b'PK\x03\x04', info.extract_version, flags, method,
+                                        dos_time, dos_date, crc, len(payload), size, len(name), 0))
+            out.write(name)
+            out.write(payload)
+            central.append(CENTRAL_HEADER.pack(
+                b'PK\x01\x02', info.create_version, info.create_system, info.extract_version,
+                info.reserved, flags, method, dos_time, dos_date, crc, len(payload), size,
+                len(name), len(info.extra), len(info.comment), 0, info.internal_attr,
+                info.external_attr, offset) + name + info.extra + info.comment)
+
+        directory_offset = out.tell()
+        for entry in central:
+            out.write(entry)
+        out.write(END_RECORD.pack(b'PK\x05\x06', 0, 0, len(central), len(central),
+                                  out.tell() - directory_offset, directory_offset, 0))
+
+
+def remediate(path, destination, alt_text=PLACEHOLDER_ALT_TEXT, decorative_duplicates=False):
+    """Fix one document into destination; returns the counts of fixes, None when it is encrypted.
+
+    A document with nothing to fix is copied unchanged, unless destination is the document itself.
+    """
+    with DocxPackage(path) as pkg:
+        if pkg.encrypted:
+            replacements, fixed = {}, None
+        else:
+            replacements, fixed = plan_fixes(pkg, alt_text, decorative_duplicates)
+    if not replacements and os.path.abspath(destination) == os.path.abspath(path):
+        return fixed
+
+    # Write next to the destination first so a failure never leaves half a document
+    folder = os.path.dirname(os.path.abspath(destination))
+    os.makedirs(folder, exist_ok=True)
+    fd, temp = tempfile.mkstemp(suffix='.docx', dir=folder)
+    os.close(fd)
+    try:
+        if replacements:
+            rewrite_package(path, temp, replacements)
+        else:
+            shutil.copy2(path, temp)
+        os.replace(temp, destination)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return fixed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply mechanical accessibility fixes to Word documents")
+    parser.add_argument('inputs', nargs='+', help="documents or folders")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--out', help="write fixed copies here (mirroring the input folders)")
+    target.add_argument('--in-place', action='store_true', help="overwrite the documents")
+    parser.add_argument('--alt-text', default=PLACEHOLDER_ALT_TEXT, help="placeholder description")
+    parser.add_argument('--decorative-duplicates', action='store_true',
+                        help="mark images used more than once in a document decorative instead of giving "
+                             "them placeholder text")
+    args = parser.parse_args(argv)
+
+    totals = {'documents': 0, 'table': 0, 'alt_text': 0, 'decorative': 0}
+    failed = 0
+    size = 0
+    start = time.perf_counter()
+    for item in args.inputs:
+        base = item if os.path.isdir(item) else os.path.dirname(item)
+        for path in find_documents([item]):
+            size += os.path.getsize(path)
+            destination = path if args.in_place else os.path.join(args.out, os.path.relpath(path, base))
+            try:
+                fixed = remediate(path, destination, args.alt_text, args.decorative_duplicates)
+            except (OSError, ValueError, zipfile.BadZipFile, expat.ExpatError) as e:
+                print(f"{path}: {e}")
+                failed += 1
+                continue
+            if fixed is None:
+                print(f"{path}: encrypted, {'left as it is' if args.in_place else 'copied unchanged'}")
+                continue
+            if any(fixed.values()):
+                totals['documents'] += 1
+                for key, count in fixed.items():
+                    totals[key] += count
+                print(f"{path}: {fixed['table']} table headers, {fixed['alt_text']} alt text placeholders, "
+                      f"{fixed['decorative']} marked decorative")
+
+    print(f"Fixed {totals['documents']} documents: {totals['table']} table headers, "
+          f"{totals['alt_text']} alt text placeholders, {totals['decorative']} marked decorative")
+    elapsed = time.perf_counter() - start
+    print(f"Read {size / 1e6:.1f} MB in {elapsed:.2f}s ({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
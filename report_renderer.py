@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""HTML and JSON reports from the results index, written as they are read.
+
+Each document counts once, with its most recent result (the same snapshot as
+aggregate_results). The report is a folder:
+
+    index.html              totals per category, links to the pages below
+    documents-0001.html     every document with its counts, page_size rows a page
+    contrast-0001.html      drill-down per category: documents with that issue,
+    ...                     most issues first, one row per stored location
+    report.json             the same documents with counts and locators
+
+Rows come straight from SQLite cursors and go straight to the files. A page
+is closed and the next one opened every page_size rows, and the JSON array
+is written one document at a time. The most held in memory is one document's
+location index, so a report over millions of findings takes as little memory
+as one over a few.
+
+Rendering into the folder of an earlier report replaces it: pages past the
+new page counts are deleted, other files are left alone.
+
+    python report_renderer.py --db a11y_results.db --out report/
+    python report_renderer.py --db a11y_results.db --out finance/ --under /shared/docs/Finance --page-size 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from html import escape
+from pathlib import Path
+
+from aggregate_results import Snapshot
+from issue_locations import format_locator, loads, locators
+from native_checker import CATEGORIES
+from results_store import DEFAULT_DB, ResultsStore
+
+PAGE_SIZE = 500
+
+STYLE = """
+body { font-family: Segoe UI, Arial, sans-serif; margin: 2em; color: #1a1a1a; }
+table { border-collapse: collapse; }
+th, td { border-bottom: 1px solid #ccc; padding: 0.3em 0.8em; text-align: left; vertical-align: top; }
+td.count { text-align: right; }
+nav a { margin-right: 1em; }
+"""
+
+
+def _head(title):
+    return (f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{escape(title)}</title>\n<style>{STYLE}</style>\n</head>\n<body>\n'
+            f'<h1>{escape(title)}</h1>\n')
+
+
+def _document_link(path):
+    try:
+        href = Path(path).as_uri()
+    except ValueError:
+        return escape(path)
+    return f'<a href="{escape(href)}">{escape(path)}</a>'
+
+
+class PagedWriter:
+    """HTML table split into pages of at most page_size rows, each page written as its rows arrive.
+
+    Rows of one group (a document) only show the group's cells on the first
+    row of each page.
+    """
+
+    def __init__(self, folder, name, title, columns, page_size=PAGE_SIZE):
+        self.folder = folder
+        self.name = name
+        self.title = title
+        self.columns = columns
+        self.page_size = page_size
+        self.pages = 0
+        self.rows = 0
+        self._file = None
+        self._on_page = 0
+        self._group = None
+
+    def page_name(self, number):
+        return f"{self.name}-{number:04d}.html"
+
+    def _nav(self, has_next):
+        links = ['<a href="index.html">Summary</a>']
+        if self.pages > 1:
+            links.append(f'<a href="{self.page_name(self.pages - 1)}">Previous page</a>')
+        if has_next:
+            links.append(f'<a href="{self.page_name(self.pages + 1)}">Next page</a>')
+        return f"<nav>{''.join(links)}</nav>\n"
+
+    def _open(self):
+        self.pages += 1
+        self._file = open(os.path.join(self.folder, self.page_name(self.pages)), 'w', encoding='utf-8')
+        self._file.write(_head(f"{self.title}, page {self.pages}"))
+        self._file.write(self._nav(False))
+        self._file.write("<table>\n<thead><tr>" + ''.join(f"<th>{escape(c)}</th>" for c in self.columns)
+                         + "</tr></thead>\n<tbody>\n")
+        self._on_page = 0
+        self._group = None
+
+    def _close(self, has_next):
+        self._file.write("</tbody>\n</table>\n")
+        self._file.write(self._nav(has_next))
+        self._file.write("</body>\n</html>\n")
+        self._file.close()
+        self._file = None
+
+    def row(self, cells, group=None):
+        """Write one row; cells are HTML or counts, group a tuple of the leading cells shared by a group"""
+        if self._file is None or self._on_page >= self.page_size:
+            if self._file is not None:
+                self._close(True)
+            self._open()
+        if group is not None:
+            cells = list(group if group != self._group else [''] * len(group)) + list(cells)
+            self._group = group
+        # Numbers are right-aligned counts, everything else is HTML
+        self._file.write("<tr>" + ''.join(f'<td class="count">{c}</td>' if isinstance(c, int) else f"<td>{c}</td>"
+                                          for c in cells) + "</tr>\n")
+        self._on_page += 1
+        self.rows += 1
+
+    def close(self):
+        """Finish the last page and delete the pages an earlier, longer report left behind; returns the page count"""
+        if self._file is not None:
+            self._close(False)
+        number = self.pages + 1
+        while os.path.exists(os.path.join(self.folder, self.page_name(number))):
+            os.remove(os.path.join(self.folder, self.page_name(number)))
+            number += 1
+        return self.pages
+
+
+def _columns():
+    return ', '.join(f's."{c}"' for c, _ in CATEGORIES)
+
+
+def write_documents(snapshot, folder, page_size, json_file=None, with_locations=True):
+    """Documents pages, and the report.json documents array when json_file is given; returns the writer"""
+    writer = PagedWriter(folder, 'documents', "Documents", ['Document', 'Checked'] + [c for c, _ in CATEGORIES],
+                         page_size)
+    data = 'l.data' if with_locations and json_file is not None else 'NULL'
+    cursor = snapshot.conn.execute(
+        f"SELECT s.path, s.checked_at, s.backend, s.digest, {_columns()}, {data} FROM {snapshot.table} s "
+        f"LEFT JOIN locations l ON l.result_id = s.id ORDER BY s.path")
+    first = True
+    for path, checked_at, backend, digest, *counts, locations in cursor:
+        counts = [count or 0 for count in counts]
+        writer.row([_document_link(path), escape((checked_at or '')[:19])] + counts)
+        if json_file is None:
+            continue
+        document = {'path': path, 'checked_at': checked_at, 'backend': backend, 'digest': digest,
+                    'counts': dict(zip((c for c, _ in CATEGORIES), counts))}
+        index = loads(locations) if locations else None
+        if index is not None:
+            document['locations'] = {category: list(locators(index, category)) for category in index['issues']}
+        json_file.write(("\n" if first else ",\n") + json.dumps(document, ensure_ascii=False))
+        first = False
+    writer.close()
+    return writer
+
+
+def write_category(snapshot, folder, category, label, page_size, with_locations=True):
+    """Drill-down pages of one category, documents with the most issues first; returns the writer"""
+    writer = PagedWriter(folder, category, label, ['Document', 'Issues', 'Location'], page_size)
+    data = 'l.data' if with_locations else 'NULL'
+    cursor = snapshot.conn.execute(
+        f'SELECT s.path, s."{category}", {data} FROM {snapshot.table} s '
+        f'LEFT JOIN locations l ON l.result_id = s.id WHERE s."{category}" > 0 '
+        f'ORDER BY s."{category}" DESC, s.path')
+    for path, count, locations in cursor:
+        group = (_document_link(path), count)
+        index = loads(locations) if locations else None
+        written = False
+        if index is not None:
+            for locator in locators(index, category):
+                writer.row([escape(format_locator(locator))], group)
+                written = True
+        if not written:
+            writer.row(["(no locations stored)" if with_locations else ''], group)
+    writer.close()
+    return writer
+
+
+def render_report(store, folder, under='', page_size=PAGE_SIZE, with_locations=True, now=None):
+    """Write the report folder; returns {'documents', 'findings', 'pages'}"""
+    now = now or datetime.now()
+    os.makedirs(folder, exist_ok=True)
+    snapshot = Snapshot(store, now.isoformat(), under)
+    totals = snapshot.totals()
+
+    with open(os.path.join(folder, 'report.json'), 'w', encoding='utf-8') as json_file:
+        # The header object without its closing brace; the documents array follows it
+        json_file.write(json.dumps({'generated': now.isoformat(timespec='seconds'), 'documents_total': totals[0],
+                                    'totals': dict(zip((c for c, _ in CATEGORIES), totals[1:]))})[:-1])
+        json_file.write(', "documents": [')
+        documents = write_documents(snapshot, folder, page_size, json_file, with_locations)
+        json_file.write("\n]}\n")
+
+    categories = [(category, label, write_category(snapshot, folder, category, label, page_size, with_locations))
+                  for category, label in CATEGORIES]
+
+    # The summary is written last, when the page counts are known
+    with open(os.path.join(folder, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_head("Accessibility report"))
+        f.write(f"<p>As of {escape(now.isoformat(timespec='seconds'))}"
+                f"{', documents under ' + escape(os.path.abspath(under)) if under else ''}. "
+                f"Each document counts once, with its most recent result.</p>\n")
+        f.write("<table>\n<thead><tr><th>Category</th><th>Documents</th><th>Issues</th><th>Pages</th></tr>"
+                "</thead>\n<tbody>\n")
+        for (category, label, writer), total in zip(categories, totals[1:]):
+            name = f'<a href="{writer.page_name(1)}">{escape(label)}</a>' if writer.pages else escape(label)
+            documents_with = snapshot.conn.execute(
+                f'SELECT COUNT(*) FROM {snapshot.table} WHERE "{category}" > 0').fetchone()[0]
+            f.write(f'<tr><td>{name}</td><td class="count">{documents_with}</td>'
+                    f'<td class="count">{total}</td><td class="count">{writer.pages}</td></tr>\n')
+        f.write("</tbody>\n</table>\n")
+        if documents.pages:
+            f.write(f'<p><a href="{documents.page_name(1)}">All {totals[0]} documents</a> '
+                    f'({documents.pages} pages, <a href="report.json">JSON</a>)</p>\n')
+        f.write("</body>\n</html>\n")
+
+    return {'documents': totals[0], 'findings': sum(totals[1:]),
+            'pages': 1 + documents.pages + sum(writer.pages for _, _, writer in categories)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write HTML and JSON reports from the results index")
+    parser.add_argument('--db', default=DEFAULT_DB, help="results index (SQLite file)")
+    parser.add_argument('--out', default='a11y_report', help="report folder")
+    parser.add_argument('--under', default='', help="only documents under this folder (e.g. a department)")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="rows per HTML page")
+    parser.add_argument('--no-locations', action='store_true',
+                        help="leave stored locations out; drill-down pages list documents and counts only")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with ResultsStore(args.db) as store:
+        stats = render_report(store, args.out, args.under, max(1, args.page_size), not args.no_locations)
+    print(f"Wrote {stats['pages']} pages for {stats['documents']} documents and {stats['findings']} issues "
+          f"to {args.out} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+from native_checker import CATEGORIES, parse_count
+
+# Results index shared by the watcher, batch tools and reports. Every check is
+# appended (so history is kept for trends); the latest row per path is the
+# current result for that document.
+
+# Used when no --db is given: $A11Y_DB, else a11y_results.db in the current folder
+DEFAULT_DB = os.environ.get('A11Y_DB') or 'a11y_results.db'
+
+# Text reports of the Word backends keep the scraper's name; native reports get
+# their own, so a native run never replaces a result recorded from Word
+REPORT_SUFFIX = '_accessibility_results.txt'
+NATIVE_REPORT_SUFFIX = '_native_accessibility_results.txt'
+# Backend line of a report; reports recorded from Word before it existed have none
+WORD_BACKENDS = (None, 'uia', 'com')
+
+COUNT_COLUMNS = [category for category, _ in CATEGORIES]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    folder TEXT,
+    digest TEXT,
+    author TEXT,
+    checked_at TEXT NOT NULL,
+    backend TEXT,
+    elapsed REAL,
+    {', '.join(f'"{c}" INTEGER' for c in COUNT_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS results_path ON results (path, id);
+CREATE INDEX IF NOT EXISTS results_digest ON results (digest);
+-- Covers the "latest result per path as of a date" snapshots used by reports
+CREATE INDEX IF NOT EXISTS results_path_time ON results (path, checked_at);
+-- Location index of a result (see issue_locations), kept out of the results
+-- rows so aggregate scans stay narrow
+CREATE TABLE IF NOT EXISTS locations (
+    result_id INTEGER PRIMARY KEY REFERENCES results (id),
+    data TEXT NOT NULL
+);
+"""
+
+
+def file_digest(file_path):
+    """SHA-1 of the file contents, used to skip re-checks of unchanged documents"""
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ResultsStore:
+    """SQLite-backed index of accessibility results"""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, file_path, results, digest=None, backend='native', elapsed=None):
+        """Append one check of file_path; results is a pane-style results dict"""
+        with self.conn:
+            self._insert(os.path.abspath(file_path), results, digest, backend, elapsed)
+
+    def _insert(self, file_path, results, digest, backend, elapsed):
+        counts = [parse_count(results.get(c)) for c in COUNT_COLUMNS]
+        columns = ', '.join(f'"{c}"' for c in COUNT_COLUMNS)
+        cursor = self.conn.execute(
+            f"INSERT INTO results (path, folder, digest, author, checked_at, backend, elapsed, {columns}) "
+            f"VALUES ({', '.join('?' * (7 + len(counts)))})",
+            [file_path, os.path.dirname(file_path), digest, results.get('author'),
+             results.get('timestamp') or datetime.now().isoformat(), backend, elapsed] + counts)
+        if results.get('locations'):
+            from issue_locations import dumps
+            self.conn.execute("INSERT INTO locations (result_id, data) VALUES (?, ?)",
+                              (cursor.lastrowid, dumps(results['locations'])))
+
+    def insert_once(self, file_path, results, digest, backend='native', elapsed=None):
+        """Insert a result unless this exact content (path + digest) already has one.
+
+        Call inside a write transaction (BEGIN IMMEDIATE) so two nodes finishing
+        the same document cannot both insert. Returns True if a row was added.
+        """
+        file_path = os.path.abspath(file_path)
+        seen = self.conn.execute("SELECT 1 FROM results WHERE path = ? AND digest = ?",
+                                 (file_path, digest)).fetchone()
+        if not seen:
+            self._insert(file_path, results, digest, backend, elapsed)
+        return not seen
+
+    def has_result(self, file_path, digest):
+        return self.conn.execute("SELECT 1 FROM results WHERE path = ? AND digest = ?",
+                                 (os.path.abspath(file_path), digest)).fetchone() is not None
+
+    def latest(self, file_path):
+        """Most recent result row for a path as a dict, or None"""
+        cursor = self.conn.execute(
+            "SELECT * FROM results WHERE path = ? ORDER BY id DESC LIMIT 1",
+            (os.path.abspath(file_path),))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([d[0] for d in cursor.description], row))
+
+    def locations(self, file_path):
+        """Location index stored with the latest result for a path, or None"""
+        row = self.conn.execute(
+            "SELECT l.data FROM (SELECT id FROM results WHERE path = ? ORDER BY id DESC LIMIT 1) latest "
+            "JOIN locations l ON l.result_id = latest.id", (os.path.abspath(file_path),)).fetchone()
+        if row is None:
+            return None
+        from issue_locations import loads
+        return loads(row[0])
+
+    def digests(self, file_path):
+        """Digests of the versions of a path that were checked, most recent first"""
+        rows = self.conn.execute(
+            "SELECT digest FROM results WHERE path = ? AND digest IS NOT NULL "
+            "GROUP BY digest ORDER BY MAX(id) DESC", (os.path.abspath(file_path),))
+        return [row[0] for row in rows]
+
+    def latest_digest(self, file_path):
+        row = self.latest(file_path)
+        return row['digest'] if row else None
+
+
+def save_results_to_file(results, filename, document_name="", backend='native'):
+    """Save results to a text file (same layout as the Word pane scraper, plus the backend)"""
+    try:
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("Word Accessibility Checker Results\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Document: {document_name}\n")
+            f.write(f"Generated: {results['timestamp']}\n")
+            f.write(f"Backend: {backend}\n\n")
+            f.write(f"Contrast errors: {results['contrast']}\n\n")
+            f.write(f"Heading errors: {results['heading']}\n\n")
+            f.write(f"Image errors: {results['image']}\n\n")
+            f.write(f"Table errors: {results['table']}\n\n")
+            f.write(f"Cell errors: {results['cell']}\n\n")
+            f.write(f"Access errors: {results['access']}\n\n")
+        return True
+
+    except Exception as e:
+        print(f"Error saving results: {str(e)}")
+        return False
+
+
+def results_file_for(file_path, backend='native'):
+    """Path of the text report written next to a document by a backend"""
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    suffix = NATIVE_REPORT_SUFFIX if backend not in WORD_BACKENDS else REPORT_SUFFIX
+    return os.path.join(os.path.dirname(file_path), f"{base_name}{suffix}")
+
+
+def load_results_file(filename):
+    """Parse a *_accessibility_results.txt report back into a results dict"""
+    fields = {
+        'Document': 'document', 'Generated': 'timestamp', 'Backend': 'backend',
+        'Contrast errors': 'contrast', 'Heading errors': 'heading', 'Image errors': 'image',
+        'Table errors': 'table', 'Cell errors': 'cell', 'Access errors': 'access',
+    }
+    results = {key: None for key in fields.values()}
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            key, sep, value = line.partition(':')
+            if sep and key in fields:
+                value = value.strip()
+                results[fields[key]] = None if value == 'None' else value
+    return results
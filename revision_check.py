@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Which accessibility issues a revision introduced, and which it resolved.
+
+The revision is found in one of two ways:
+
+- Tracked changes (w:ins, w:del, w:rPrChange, w:pPrChange, inserted or
+  deleted table rows). Issues on inserted or re-formatted content are
+  introduced. Issues on deleted content are resolved once the changes are
+  accepted.
+- A previous version: the IR of an earlier version of the same document (see
+  doc_ir). It is found through the results index history of the path and
+  the IR cache, or given with --against. Only versions whose IR was cached
+  can be found this way: versions seen by `a11y revision` or `a11y ir`, or
+  by `a11y batch` and `a11y watch` run with --ir-cache on the same folder. Paragraph signatures of the two
+  versions are compared: the common head and tail are skipped, and difflib
+  matches what is left. The rules then run over the differing paragraphs
+  only, with their drawings and tables, on both sides. An issue that is on
+  both sides of a changed block (same rule, same colours) is neither new
+  nor resolved. When styles.xml changed, every paragraph counts as changed.
+
+Document-wide rules (no headings, restricted access) are compared as a whole.
+Rule evaluation therefore costs in proportion to the edit. Reading the new
+version is still one pass, and it is skipped when its IR is already cached.
+
+    python revision_check.py report.docx --db a11y_results.db
+    python revision_check.py report_v2.docx --against report_v1.docx
+    python revision_check.py report.docx --tracked
+"""
+import argparse
+import os
+import sys
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from difflib import SequenceMatcher
+
+from doc_ir import (DELETED, FORMATTED, INSERTED, IR_CACHE, MARK_DELETED, MARK_INSERTED, PROPERTIES_CHANGED, IRCache,
+                    contrast_failures, evaluate_ir, ir_no_headings, ir_restricted_access, merged_cell_failures,
+                    missing_alt_failures, table_header_failures)
+from native_checker import LABELS
+
+DOCUMENT_RULES = {'heading': ir_no_headings, 'access': ir_restricted_access}
+
+
+class Paragraphs:
+    """Per-paragraph access to an IR: its runs, drawings and tables, signature and locator"""
+
+    def __init__(self, ir):
+        self.ir = ir
+        self.count = ir.rows('paragraphs')
+        # Runs are recorded paragraph by paragraph; drawings and tables hang off their anchor paragraph
+        self.run_paragraph = ir.column('runs', 'paragraph')
+        self.drawings = {}
+        for i, paragraph in enumerate(ir.column('drawings', 'paragraph')):
+            self.drawings.setdefault(paragraph, []).append(i)
+        self.tables = {}
+        for i, paragraph in enumerate(ir.column('tables', 'paragraph')):
+            self.tables.setdefault(paragraph, []).append(i)
+        self.part = ir.column('paragraphs', 'part')
+        self.part_names = ir.strings_of('parts', 'name')
+
+    def runs(self, paragraph):
+        return range(bisect_left(self.run_paragraph, paragraph), bisect_right(self.run_paragraph, paragraph))
+
+    def locator(self, paragraph):
+        """'word/document.xml paragraph 12' (ordinal within the part, as in issue_locations)"""
+        part = self.part[paragraph]
+        return f"{self.part_names[part]} paragraph {paragraph - bisect_left(self.part, part)}"
+
+    def signatures(self):
+        """One hashable value per paragraph that changes whenever anything a rule reads changes"""
+        ir = self.ir
+        runs = [[] for _ in range(self.count)]
+        for row in zip(self.run_paragraph, ir.column('runs', 'length'), ir.column('runs', 'blank'),
+                       ir.strings_of('runs', 'style'), ir.strings_of('runs', 'color'), ir.column('runs', 'size'),
+                       ir.column('runs', 'bold'), ir.strings_of('runs', 'highlight'),
+                       ir.strings_of('runs', 'shading'), ir.column('runs', 'revision')):
+            runs[row[0]].append(row[1:])
+        drawings = list(zip(ir.strings_of('drawings', 'descr'), ir.column('drawings', 'decorative')))
+        cells = {}
+        for row in zip(ir.column('cells', 'table'), ir.column('cells', 'row'), ir.column('cells', 'cells_in_row'),
+                       ir.column('cells', 'grid_span'), ir.column('cells', 'v_merge')):
+            cells.setdefault(row[0], []).append(row[1:])
+        tables = [(rows, header, look, tuple(cells.get(i, ()))) for i, (rows, header, look) in enumerate(zip(
+            ir.column('tables', 'rows'), ir.column('tables', 'tbl_header'), ir.column('tables', 'look_first_row')))]
+        backgrounds = ir.strings_of('parts', 'background')
+
+        return [hash((self.part_names[part], backgrounds[part], style, outline, fill, cell_fill, text_hash,
+                      tuple(runs[i]), tuple(drawings[d] for d in self.drawings.get(i, ())),
+                      tuple(tables[t] for t in self.tables.get(i, ()))))
+                for i, (part, style, outline, fill, cell_fill, text_hash) in enumerate(zip(
+                    self.part, ir.strings_of('paragraphs', 'style'), ir.column('paragraphs', 'outline'),
+                    ir.strings_of('paragraphs', 'fill'), ir.strings_of('paragraphs', 'cell_fill'),
+                    ir.column('paragraphs', 'text_hash')))]
+
+    def issues(self, paragraphs, runs=None, drawings=None, tables=None):
+        """(category, paragraph, key) for the issues in some paragraphs.
+
+        runs, drawings and tables default to what those paragraphs hold;
+        key identifies an issue across versions (the colours of a contrast
+        failure, say).
+        """
+        ir = self.ir
+        if runs is None:
+            # Tracked deletions are not part of the document, as for the XML rules
+            revision = ir.column('runs', 'revision')
+            runs = [run for paragraph in paragraphs for run in self.runs(paragraph) if revision[run] != DELETED]
+        if drawings is None:
+            drawings = [d for paragraph in paragraphs for d in self.drawings.get(paragraph, ())]
+        if tables is None:
+            tables = [t for paragraph in paragraphs for t in self.tables.get(paragraph, ())]
+        drawing_paragraph, table_paragraph = ir.column('drawings', 'paragraph'), ir.column('tables', 'paragraph')
+        rows = ir.column('tables', 'rows')
+        found = [('contrast', self.run_paragraph[run], colors) for run, colors in contrast_failures(ir, runs)]
+        found += [('image', drawing_paragraph[d], None) for d in missing_alt_failures(ir, drawings)]
+        found += [('table', table_paragraph[t], rows[t]) for t in table_header_failures(ir, tables)]
+        found += [('cell', table_paragraph[t], rows[t]) for t in merged_cell_failures(ir, tables)]
+        return found
+
+
+def changed_blocks(old, new):
+    """(old start, old end, new start, new end) of every stretch of paragraphs that differs"""
+    head = 0
+    while head < min(len(old), len(new)) and old[head] == new[head]:
+        head += 1
+    tail = 0
+    while tail < min(len(old), len(new)) - head and old[-1 - tail] == new[-1 - tail]:
+        tail += 1
+    old_middle, new_middle = old[head:len(old) - tail], new[head:len(new) - tail]
+    if not old_middle or not new_middle:
+        return [(head, len(old) - tail, head, len(new) - tail)] if old_middle or new_middle else []
+    matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    return [(head + i1, head + i2, head + j1, head + j2)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def _unmatched(issues, others):
+    """issues with no counterpart (same category and key) among others"""
+    available = Counter((category, key) for category, _, key in others)
+    left = []
+    for issue in issues:
+        if available[issue[0], issue[2]]:
+            available[issue[0], issue[2]] -= 1
+        else:
+            left.append(issue)
+    return left
+
+
+def _document_changes(old_ir, new_ir):
+    introduced, resolved = [], []
+    for category, rule in DOCUMENT_RULES.items():
+        before = rule(old_ir) if old_ir is not None else 0
+        after = rule(new_ir)
+        if after > before:
+            introduced.append((category, None, None))
+        elif before > after:
+            resolved.append((category, None, None))
+    return introduced, resolved
+
+
+def compare_versions(old_ir, new_ir):
+    """Issues introduced and resolved going from old_ir to new_ir"""
+    old, new = Paragraphs(old_ir), Paragraphs(new_ir)
+    styles_changed = (old_ir.meta.get('styles') != new_ir.meta.get('styles')
+                      or old_ir.meta.get('default_rpr') != new_ir.meta.get('default_rpr'))
+    if styles_changed:
+        blocks = [(0, old.count, 0, new.count)]
+    else:
+        blocks = changed_blocks(old.signatures(), new.signatures())
+
+    introduced, resolved = _document_changes(old_ir, new_ir)
+    for old_start, old_end, new_start, new_end in blocks:
+        before = old.issues(range(old_start, old_end))
+        after = new.issues(range(new_start, new_end))
+        introduced += [(new, *issue) for issue in _unmatched(after, before)]
+        resolved += [(old, *issue) for issue in _unmatched(before, after)]
+    return {'introduced': introduced, 'resolved': resolved, 'styles_changed': styles_changed,
+            'changed': sum(new_end - new_start for _, _, new_start, new_end in blocks),
+            'paragraphs': new.count, 'mode': 'previous version'}
+
+
+def tracked_changes(ir):
+    """Issues introduced and resolved by a document's tracked changes, once accepted"""
+    paragraphs = Paragraphs(ir)
+    run_revision, run_paragraph = ir.column('runs', 'revision'), ir.column('runs', 'paragraph')
+    paragraph_revision = ir.column('paragraphs', 'revision')
+    table_revision = ir.column('tables', 'revision')
+    drawing_revision = ir.column('drawings', 'revision')
+
+    # Content that is new or looks different once the changes are accepted
+    reformatted = {p for p, flags in enumerate(paragraph_revision) if flags & PROPERTIES_CHANGED}
+    new_runs = [i for i, revision in enumerate(run_revision)
+                if revision in (INSERTED, FORMATTED) or (revision != DELETED and run_paragraph[i] in reformatted)]
+    new_tables = [i for i, flags in enumerate(table_revision) if flags & (MARK_INSERTED | PROPERTIES_CHANGED)]
+    new_drawings = [i for i, revision in enumerate(drawing_revision) if revision == INSERTED]
+    introduced = paragraphs.issues((), new_runs, new_drawings, new_tables)
+
+    deleted_runs = [i for i, revision in enumerate(run_revision) if revision == DELETED]
+    deleted_tables = [i for i, flags in enumerate(table_revision) if flags & MARK_DELETED]
+    deleted_drawings = [i for i, revision in enumerate(drawing_revision) if revision == DELETED]
+    resolved = paragraphs.issues((), deleted_runs, deleted_drawings, deleted_tables)
+
+    changed = ({run_paragraph[i] for i in new_runs + deleted_runs} | reformatted
+               | {p for p, flags in enumerate(paragraph_revision) if flags & (MARK_INSERTED | MARK_DELETED)})
+    return {'introduced': [(paragraphs, *issue) for issue in introduced],
+            'resolved': [(paragraphs, *issue) for issue in resolved],
+            'styles_changed': False, 'changed': len(changed), 'paragraphs': paragraphs.count,
+            'mode': 'tracked changes'}
+
+
+def has_tracked_changes(ir):
+    return (any(ir.column('runs', 'revision')) or any(ir.column('paragraphs', 'revision'))
+            or any(ir.column('tables', 'revision')))
+
+
+def _describe(paragraphs, category, paragraph, key):
+    if paragraphs is None or paragraph is None:
+        return LABELS[category]
+    where = paragraphs.locator(paragraph) if paragraph >= 0 else "unanchored"
+    if category == 'contrast':
+        return f"{LABELS[category]}: {where} ({key[0]} on {key[1]})"
+    if category in ('table', 'cell'):
+        return f"{LABELS[category]}: {where} (table of {key} rows)"
+    return f"{LABELS[category]}: {where}"
+
+
+def format_delta(delta):
+    lines = [f"{delta['changed']} of {delta['paragraphs']} paragraphs changed ({delta['mode']})"]
+    if delta['styles_changed']:
+        lines[0] += "; styles changed, so every paragraph was compared"
+    for title in ('introduced', 'resolved'):
+        issues = delta[title]
+        counts = Counter(issue[1] for issue in issues)
+        summary = ', '.join(f"{category} {count}" for category, count in counts.items()) or "none"
+        lines.append(f"{title.capitalize()}: {summary}")
+        for paragraphs, category, paragraph, key in issues:
+            lines.append(f"    {_describe(paragraphs, category, paragraph, key)}")
+    return lines
+
+
+def previous_ir(store, cache, path, digest):
+    """IR of the most recent earlier version of path that is in the IR cache, or None"""
+    for earlier in store.digests(path):
+        if earlier != digest:
+            ir = cache.load(earlier)
+            if ir is not None:
+                return ir
+    return None
+
+
+def main(argv=None):
+    from native_checker import format_results
+    from results_store import DEFAULT_DB, ResultsStore, file_digest
+
+    parser = argparse.ArgumentParser(
+        description="Report the accessibility issues a revision introduced or resolved",
+        epilog="Without --against or --tracked, the previous version is the latest one in the results index "
+               "whose IR is in the cache. `a11y revision` and `a11y ir` cache the IR of what they read; "
+               "`a11y batch` and `a11y watch` only do so with --ir-cache.")
+    parser.add_argument('file')
+    parser.add_argument('--against', default=None, help="compare with this earlier version of the document")
+    parser.add_argument('--tracked', action='store_true', help="look at the document's tracked changes only")
+    parser.add_argument('--db', default=DEFAULT_DB,
+                        help="results index whose history finds the previous version; this version is recorded "
+                             "(default %(default)s; set A11Y_DB to change it)")
+    parser.add_argument('--cache', default=IR_CACHE,
+                        help="IR cache folder (default %(default)s; set A11Y_IR_CACHE to change it)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"File not found: {args.file}")
+        return 2
+    cache = IRCache(args.cache)
+    digest = file_digest(args.file)
+    ir, _ = cache.get(args.file, digest)
+    if ir.meta.get('encrypted'):
+        print(f"{args.file}: encrypted, nothing to compare")
+        return 0
+
+    if args.tracked:
+        delta = tracked_changes(ir)
+    elif args.against:
+        delta = compare_versions(cache.get(args.against)[0], ir)
+    else:
+        with ResultsStore(args.db) as store:
+            old = previous_ir(store, cache, args.file, digest)
+            results = format_results(evaluate_ir(ir))
+            results['author'] = ir.meta.get('author')
+            # So the next revision of this document is compared with this one
+            with store.conn:
+                store.insert_once(args.file, results, digest)
+        if old is not None:
+            delta = compare_versions(old, ir)
+        elif has_tracked_changes(ir):
+            delta = tracked_changes(ir)
+        else:
+            print(f"{args.file}: no earlier version in {os.path.abspath(args.db)} with IR cached in "
+                  f"{os.path.abspath(args.cache)}; recorded this one")
+            return 0
+
+    print(f"{args.file}: " + "\n".join(format_delta(delta)))
+    return 1 if delta['introduced'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,21 @@
 import os
-
-# Ensure python-docx is installed
-try:
-    os.system("pip install python-docx")
-except ImportError:
-    print("Could not install python-docx...")
-
-from docx import Document
 import time
-import win32com.client
+
 # Open a Word document and run the accessibility checker
 def run_accessibility_checker(file_path):
     if not os.path.exists(file_path):
         print(f"File not found: {file_path}")
         return
 
+    # Imported here so selecting another backend never loads pywin32
+    import win32com.client
+
     # pythoncom.CoInitialize()
 
     # Open the Word application
     word = win32com.client.Dispatch("Word.Application")
     word.Visible = True  # Run in the background
+    doc = None
 
     try:
         # Open the document
@@ -90,8 +86,9 @@ def run_accessibility_checker(file_path):
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
-        # Close the document and quit Word
-        doc.Close(SaveChanges=False)
+        # Close the document (if Open got that far) and quit Word
+        if doc is not None:
+            doc.Close(SaveChanges=False)
         word.Quit()
 
 # Example usage
@@ -1,9 +1,5 @@
 import os
 import time
-import win32com.client
-import pywinauto
-from pywinauto import Application
-from pywinauto.findwindows import find_windows
 import re
 from datetime import datetime
 
@@ -15,6 +11,9 @@ class WordAccessibilityScraper:
         
     def connect_to_word(self):
         """Connect to an existing Word application"""
+        from pywinauto import Application
+        from pywinauto.findwindows import find_windows
+
         try:
             # Find Word windows
             word_windows = find_windows(class_name="OpusApp")
@@ -305,12 +304,15 @@ def run_accessibility_checker(file_path):
         print(f"File not found: {file_path}")
         return
     
+    import win32com.client
+
     # Initialize the scraper
     scraper = WordAccessibilityScraper()
     
     # Open the Word application
     word = win32com.client.Dispatch("Word.Application")
     word.Visible = True  # Make Word visible so we can scrape the GUI
+    doc = None
     
     try:
         print(f"Opening document: {os.path.basename(file_path)}")
@@ -379,9 +381,10 @@ def run_accessibility_checker(file_path):
         print(f"❌ An error occurred: {e}")
         
     finally:
-        # Close the document and quit Word
+        # Close the document (if Open got that far) and quit Word
         try:
-            doc.Close(SaveChanges=False)
+            if doc is not None:
+                doc.Close(SaveChanges=False)
             word.Quit()
             print("Word application closed")
         except:
@@ -0,0 +1,42 @@
+import os
+import re
+import time
+import zipfile
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MINSTER = os.path.join(REPO, 'Minster_Resume.docx')
+CONFLICT = os.path.join(REPO, 'ConflictDoc.docx')
+
+
+def paragraph(text, ppr=''):
+    return f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def hang(task):
+    """Supervisor target that never finishes in time"""
+    time.sleep(60)
+
+
+def build_docx(path, body, replace=None, source=MINSTER):
+    """Copy of a sample document with its body replaced; replace maps part name -> bytes"""
+    replace = dict(replace or {})
+    with zipfile.ZipFile(source) as zin:
+        document = zin.read('word/document.xml').decode('utf-8')
+        document = re.sub(r'<w:body>.*<w:sectPr', lambda m: f'<w:body>{body}<w:sectPr', document, flags=re.S)
+        replace.setdefault('word/document.xml', document.encode('utf-8'))
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                zout.writestr(info, replace.pop(info.filename, None) or zin.read(info.filename))
+            for name, data in replace.items():
+                zout.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture
+def make_docx(tmp_path):
+    """make_docx(body, name='doc.docx', replace=None) -> path of a new document in tmp_path"""
+    def make(body, name='doc.docx', replace=None, source=MINSTER):
+        return build_docx(tmp_path / name, body, replace, source)
+    return make
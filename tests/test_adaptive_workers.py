@@ -0,0 +1,61 @@
+import adaptive_workers
+from adaptive_workers import HOLD_AFTER_MEMORY, HOLD_AFTER_PROBE, ConcurrencyController
+
+GB = 1e9
+
+
+def controller(monkeypatch, workers, max_workers, memory_limit=100 * GB):
+    monkeypatch.setattr(adaptive_workers, 'process_rss', lambda pid: GB)
+    return ConcurrencyController(workers, max_workers=max_workers, memory_limit=memory_limit, interval=1.0,
+                                 log=None)
+
+
+def test_memory_overshoot_is_cut_once(monkeypatch):
+    c = controller(monkeypatch, 8, 8, memory_limit=6 * GB)
+    now = c.next_tick()
+    assert c.update(now, 0, 0.0, list(range(8)), 100, 8) == 6
+    assert c.decisions[-1]['reason'] == "workers' RSS over the ceiling"
+    # The supervisor passes only the workers that stay; the two retiring ones are still busy
+    for tick in range(1, HOLD_AFTER_MEMORY + 2):
+        assert c.update(now + tick, 0, 0.0, list(range(6)), 100, 8) is None
+    assert c.workers == 6
+    assert c.peak_rss == 8 * GB
+
+
+def test_between_intervals_nothing_changes(monkeypatch):
+    c = controller(monkeypatch, 8, 8, memory_limit=6 * GB)
+    assert c.update(c.next_tick() - 0.5, 0, 0.0, list(range(8)), 100, 8) is None
+
+
+def test_workers_are_clamped_to_the_tasks_left(monkeypatch):
+    c = controller(monkeypatch, 4, 8)
+    assert c.update(c.next_tick(), 10, 10.0, list(range(4)), 1, 1) == 2
+    assert c.decisions[-1]['reason'] == "fewer tasks left than workers"
+
+
+def test_probe_is_kept_when_throughput_improves(monkeypatch):
+    c = controller(monkeypatch, 2, 4)
+    now = c.next_tick()
+    assert c.update(now, 10, 10.0, [1, 2], 100, 2) == 3
+    # Too few tasks finished since the change to tell
+    assert c.update(now + 1, 12, 12.0, [1, 2, 3], 100, 3) is None
+    assert c.update(now + 2, 40, 40.0, [1, 2, 3], 100, 3) == 4
+    assert [d['to'] for d in c.decisions] == [3, 3, 4]
+    assert c.decisions[1]['reason'].startswith("throughput up")
+
+
+def test_probe_is_reverted_without_a_gain(monkeypatch):
+    c = controller(monkeypatch, 2, 4)
+    now = c.next_tick()
+    assert c.update(now, 10, 10.0, [1, 2], 100, 2) == 3
+    assert c.update(now + 1, 20, 20.0, [1, 2, 3], 100, 3) == 2
+    assert c.decisions[-1]['reason'].endswith("no gain")
+    # The hold runs out on its last interval, which probes again
+    for tick in range(2, HOLD_AFTER_PROBE + 1):
+        assert c.update(now + tick, 10 * tick, 10.0 * tick, [1, 2], 100, 2) is None
+    assert c.update(now + HOLD_AFTER_PROBE + 1, 100, 100.0, [1, 2], 100, 2) == 3
+
+
+def test_no_probe_when_another_worker_would_not_fit(monkeypatch):
+    c = controller(monkeypatch, 2, 4, memory_limit=2.5 * GB)
+    assert c.update(c.next_tick(), 10, 10.0, [1, 2], 100, 2) is None
@@ -0,0 +1,43 @@
+import os
+import shutil
+
+from aggregate_results import Snapshot, import_reports
+from conftest import REPO, paragraph
+from native_checker import format_results
+from results_store import ResultsStore
+
+CORE = (b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        b'<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+        b'xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:creator>Jo Reviewer</dc:creator></cp:coreProperties>')
+
+
+def _record(store, path):
+    store.record(path, format_results({'heading': 1}), backend='native')
+
+
+def test_under_matches_whole_folders_only(tmp_path):
+    root = str(tmp_path)
+    with ResultsStore(os.path.join(root, 'results.db')) as store:
+        for folder in ('Finance', 'Finance2', 'finance', 'FinXnce', os.path.join('Finance', 'Q1')):
+            _record(store, os.path.join(root, folder, 'a.docx'))
+
+        def documents(under):
+            return Snapshot(store, '9999', under).totals()[0]
+
+        assert documents('') == 5
+        assert documents(os.path.join(root, 'Finance')) == 2
+        assert documents(os.path.join(root, 'Finance') + os.sep) == 2
+        # LIKE would treat _ and % as wildcards and ignore case
+        assert documents(os.path.join(root, 'Fin_nce')) == 0
+        assert documents(os.path.join(root, 'Fin%')) == 0
+        assert documents(os.path.join(root, 'Finance', 'Q1', 'a.docx')) == 1
+
+
+def test_imported_reports_get_the_document_author(tmp_path, make_docx):
+    make_docx(paragraph('text'), name='ConflictDoc.docx', replace={'docProps/core.xml': CORE})
+    shutil.copy(os.path.join(REPO, 'ConflictDoc_accessibility_results.txt'), tmp_path)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        assert import_reports(store, str(tmp_path)) == 1
+        row = store.latest(str(tmp_path / 'ConflictDoc.docx'))
+        assert row['author'] == 'Jo Reviewer' and row['contrast'] == 6
+        assert import_reports(store, str(tmp_path)) == 0
@@ -0,0 +1,18 @@
+import pytest
+
+import batch_check
+from conftest import MINSTER
+
+
+def test_locations_need_a_db(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        batch_check.main([MINSTER, '--locations'])
+    assert exit_info.value.code == 2
+    assert '--locations needs --db' in capsys.readouterr().err
+
+
+def test_estimate_reads_only_the_zip_directory():
+    total, stories = batch_check.estimate_cost(MINSTER)
+    assert 'word/document.xml' in stories
+    assert total > sum(stories.values())
+
@@ -0,0 +1,57 @@
+import time
+
+from deadline_supervisor import Quarantine, Supervisor
+
+
+def hang_on_headers(task):
+    if task.get('part', '').startswith('word/header'):
+        time.sleep(60)
+    return task['part']
+
+
+def test_parts_of_one_document_are_quarantined_apart(tmp_path):
+    quarantine = Quarantine(str(tmp_path / 'quarantine.json'), backoff=60)
+    tasks = [{'path': 'big.docx', 'part': part} for part in ('word/document.xml', 'word/header1.xml')]
+    with Supervisor(hang_on_headers, 2, 0.5, quarantine) as supervisor:
+        outcome = {task['part']: status for task, status, _ in supervisor.run(tasks)}
+    assert outcome == {'word/document.xml': 'ok', 'word/header1.xml': 'quarantined'}
+    assert quarantine.retry_at('big.docx', 'word/header1.xml') is not None
+    assert quarantine.retry_at('big.docx', 'word/document.xml') is None
+    assert quarantine.retry_at('big.docx') is None
+
+    # Releasing the document releases its parts, and survives a reload
+    Quarantine(quarantine.filename).release('big.docx')
+    assert Quarantine(quarantine.filename).entries == {}
+
+
+def nap(task):
+    time.sleep(0.5)
+    return task['path']
+
+
+class ShrinkOnce:
+    """Controller that asks for one worker once both are busy, and records the pids it is shown"""
+    workers = 2
+
+    def __init__(self):
+        self.shown = []
+
+    def next_tick(self):
+        return time.monotonic() + 0.05
+
+    def update(self, now, completed, work, pids, queued, busy):
+        self.shown.append((len(pids), busy))
+        return 1 if busy == 2 and len(self.shown) == 2 else None
+
+    def recycle(self, pid):
+        return False
+
+
+def test_controller_is_not_shown_retiring_workers():
+    controller = ShrinkOnce()
+    with Supervisor(nap, controller=controller) as supervisor:
+        assert sorted(value for _, _, value in supervisor.run([{'path': 'a'}, {'path': 'b'}])) == ['a', 'b']
+    # After the cut the retiring worker is still busy with its document, but no longer counted
+    assert controller.shown[:2] == [(2, 0), (2, 2)]
+    assert controller.shown[2:] and all(pids == 1 for pids, _ in controller.shown[2:])
+    assert any(busy == 2 for _, busy in controller.shown[2:])
@@ -0,0 +1,43 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from conftest import MINSTER
+from doc_ir import IR_VERSION, MAGIC, IRCache
+from results_store import file_digest
+
+
+def damaged(data):
+    flipped = bytearray(data)
+    flipped[len(data) // 2] ^= 0xFF
+    old = bytearray(data[:-4])
+    old[len(MAGIC):len(MAGIC) + 2] = struct.pack('<H', IR_VERSION - 1)
+    return {
+        'truncated': data[:len(data) // 2],
+        'corrupt': bytes(flipped),
+        # An older build's file under this version's name, with a valid checksum
+        'old version': bytes(old) + struct.pack('<I', zlib.crc32(old)),
+        'empty': b'',
+    }
+
+
+@pytest.mark.parametrize('kind', ['truncated', 'corrupt', 'old version', 'empty'])
+def test_damaged_cache_files_are_misses(tmp_path, kind):
+    cache = IRCache(str(tmp_path))
+    digest = file_digest(MINSTER)
+    ir, cached = cache.get(MINSTER, digest)
+    assert not cached
+    path = cache.path_for(digest)
+    with open(path, 'rb') as f:
+        good = f.read()
+
+    with open(path, 'wb') as f:
+        f.write(damaged(good)[kind])
+    assert cache.load(digest) is None
+    again, cached = cache.get(MINSTER, digest)
+    assert not cached and again.rows('paragraphs') == ir.rows('paragraphs')
+    # The miss rewrote the file
+    assert cache.load(digest) is not None
+    assert os.path.getsize(path) == len(good)
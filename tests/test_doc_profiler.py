@@ -0,0 +1,63 @@
+import os
+import pstats
+import subprocess
+import sys
+
+from conftest import REPO
+from doc_profiler import ProfileReport, profile_call, sampled
+
+
+def test_sampling_is_stable_across_runs():
+    paths = [f'/shared/docs/{i}.docx' for i in range(1000)]
+    picked = [sampled(path, 0.1) for path in paths]
+    code = ("import sys; from doc_profiler import sampled; "
+            "print(''.join('1' if sampled(f'/shared/docs/{i}.docx', 0.1) else '0' for i in range(1000)))")
+    # A new interpreter has a new hash seed; the sample must not depend on it
+    out = subprocess.run([sys.executable, '-c', code], cwd=REPO, capture_output=True, text=True, check=True,
+                         env=dict(os.environ, PYTHONHASHSEED='random')).stdout.strip()
+    assert out == ''.join('1' if p else '0' for p in picked)
+    assert 50 < sum(picked) < 150
+    assert not any(sampled(path, 0) for path in paths)
+    assert all(sampled(path, 1) for path in paths)
+
+
+def _result(i, profiled=False):
+    result = {'path': f'doc{i}.docx', 'stories': None, 'elapsed': i / 1000}
+    if profiled:
+        result['profile_data'] = {'elapsed': i / 1000, 'peak_memory': (100 - i) * 1000, 'stats': {}}
+    return result
+
+
+def test_report_keeps_only_the_worst():
+    report = ProfileReport(keep=3)
+    for i in range(100):
+        report.add(_result(i, profiled=i % 10 == 0))
+    assert report.tasks == 100 and report.profiled == 10
+    assert abs(report.elapsed - sum(range(100)) / 1000) < 1e-9
+    assert sorted(name for _, _, name, _ in report.durations) == ['doc97.docx', 'doc98.docx', 'doc99.docx']
+    assert sorted(name for _, _, (name, _) in report.slowest) == ['doc70.docx', 'doc80.docx', 'doc90.docx']
+    assert sorted(name for _, _, (name, _) in report.hungriest) == ['doc0.docx', 'doc10.docx', 'doc20.docx']
+
+
+def busy(task):
+    start = sum(i * i for i in range(task['n']))
+    return {'path': task['path'], 'stories': task.get('stories'), 'elapsed': 0.0, 'value': start}
+
+
+def test_render_and_save(tmp_path):
+    report = ProfileReport(keep=2)
+    report.add(profile_call(busy, {'path': 'big.docx', 'n': 200000}))
+    report.add(profile_call(busy, {'path': 'split.docx', 'stories': ['word/header1.xml'], 'n': 1000}))
+    report.add(_result(5))
+    lines = report.render()
+    assert lines[0].startswith("Profiled 2 of 3 tasks")
+    assert any(line.endswith('ms * split.docx [word/header1.xml]') for line in lines)
+    assert any(line.endswith('  doc5.docx') for line in lines)
+    assert lines.index("Slowest profiled tasks:") < lines.index("Most memory-hungry profiled tasks:")
+    hottest = lines[lines.index("Hottest functions in the kept tasks (own time):") + 1:]
+    assert any('test_doc_profiler.py' in line and '(<genexpr>)' in line for line in hottest)
+
+    paths = report.save(str(tmp_path / 'profiles'))
+    assert [os.path.basename(path) for path in paths] == ['01_big.docx.prof', '02_split.docx_word_header1.xml_.prof']
+    stats = pstats.Stats(paths[0])
+    assert any(name == 'busy' for _, _, name in stats.stats)
@@ -0,0 +1,45 @@
+import zipfile
+
+import font_metrics
+from conftest import MINSTER, build_docx
+from font_metrics import FontCache, FontMetrics
+from native_checker import DocxPackage
+
+
+def absolute_targets(path):
+    """Minster_Resume with the main part's relationship targets written from the package root"""
+    with zipfile.ZipFile(MINSTER) as zf:
+        rels = zf.read('word/_rels/document.xml.rels').decode('utf-8')
+    for name in ('theme/theme1.xml', 'fontTable.xml', 'numbering.xml', 'styles.xml'):
+        rels = rels.replace(f'Target="{name}"', f'Target="/word/{name}"')
+    return build_docx(path, '', {'word/_rels/document.xml.rels': rels.encode('utf-8')})
+
+
+def fonts_with(pkg, tmp_path, metrics):
+    fonts = pkg.fonts(FontCache(str(tmp_path / 'cache'), [str(tmp_path)]))
+    fonts._metrics.update({(family, bold): value for family, value in metrics.items() for bold in (False, True)})
+    return fonts
+
+
+def test_absolute_relationship_targets_resolve(tmp_path):
+    with DocxPackage(MINSTER) as pkg:
+        theme = pkg.fonts(FontCache(str(tmp_path / 'cache'), [str(tmp_path)])).theme
+        levels = pkg.numbering().levels
+    assert theme == {'major': 'Calibri', 'minor': 'Calibri Light'} and levels
+    with DocxPackage(absolute_targets(tmp_path / 'absolute.docx')) as pkg:
+        assert pkg.fonts(FontCache(str(tmp_path / 'cache'), [str(tmp_path)])).theme == theme
+        assert pkg.numbering().levels == levels
+
+
+def test_list_markers_missing_from_their_font(tmp_path):
+    ascii_only = FontMetrics('Noto Sans Symbols', 'Regular', 1000, 500, 700, False, [[32, 126]])
+    with_bullets = FontMetrics('Noto Sans Symbols', 'Regular', 1000, 500, 700, False, [[32, 126], [0x25CF, 0x25CF]])
+    with DocxPackage(MINSTER) as pkg:
+        fonts = fonts_with(pkg, tmp_path, {'Noto Sans Symbols': ascii_only})
+        found = []
+        # Four list levels in use set Noto Sans Symbols for their '●'; one follows its paragraph's font
+        assert font_metrics._marker_glyphs(pkg, fonts, found) == 4
+        assert len({element for _, _, element, _ in found}) == 4
+    with DocxPackage(MINSTER) as pkg:
+        fonts = fonts_with(pkg, tmp_path, {'Noto Sans Symbols': with_bullets})
+        assert font_metrics._marker_glyphs(pkg, fonts) == 0
@@ -0,0 +1,82 @@
+import io
+import sys
+import time
+from types import SimpleNamespace
+
+import a11y_gate
+import native_checker
+from a11y_gate import FAIL, OUT_OF_TIME, PASS, UNREADABLE, check_gate
+from conftest import CONFLICT, MINSTER, hang, paragraph
+from deadline_supervisor import Supervisor
+from native_checker import DEADLINE_STRIDE, RULES, DocxPackage, evaluate
+
+
+def test_exit_codes():
+    assert check_gate(MINSTER)[0] == PASS
+    assert check_gate(MINSTER, strict=True)[0] == FAIL
+    assert check_gate(CONFLICT)[0] == FAIL
+    assert check_gate(MINSTER, deadline=time.monotonic() - 1)[0] == OUT_OF_TIME
+
+
+def test_main_exit_codes(tmp_path):
+    assert a11y_gate.main([MINSTER]) == PASS
+    assert a11y_gate.main([MINSTER, CONFLICT]) == FAIL
+    junk = tmp_path / 'junk.docx'
+    junk.write_bytes(b'not a zip at all')
+    assert a11y_gate.main([str(junk)]) == UNREADABLE
+    # A failure outranks an unreadable document
+    assert a11y_gate.main([str(junk), CONFLICT]) == FAIL
+
+
+def test_filter_passes_the_document_through(monkeypatch, capsysbinary):
+    with open(MINSTER, 'rb') as f:
+        data = f.read()
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(data)))
+    assert a11y_gate.main(['--filter']) == PASS
+    assert capsysbinary.readouterr().out == data
+
+
+class Clock:
+    """time.monotonic() stand-in that reads 0 the first `ticks` times, then 10"""
+
+    def __init__(self, ticks):
+        self.ticks = ticks
+        self.readings = 0
+
+    def monotonic(self):
+        self.readings += 1
+        return 0.0 if self.readings <= self.ticks else 10.0
+
+
+def test_deadline_stops_a_rule_midway(make_docx, monkeypatch):
+    path = make_docx(''.join(paragraph(f'line {i}', '<w:pPr><w:pStyle w:val="Normal"/></w:pPr>')
+                             for i in range(DEADLINE_STRIDE * 8)))
+    contrast = [rule for rule in RULES if rule['category'] == 'contrast']
+    with DocxPackage(path) as pkg:
+        # The deadline passes after the check before the rule: the rule stops at its first stride
+        clock = Clock(1)
+        monkeypatch.setattr(native_checker, 'time', SimpleNamespace(monotonic=clock.monotonic))
+        outcome = evaluate(pkg, rules=contrast, deadline=5.0)
+        assert outcome['timed_out'] and outcome['counts'] == {}
+        assert clock.readings == 2
+        assert pkg.deadline is None
+
+        # All rules, cheapest first: the deadline passes once heading (the fifth) has started
+        clock = Clock(5)
+        monkeypatch.setattr(native_checker, 'time', SimpleNamespace(monotonic=clock.monotonic))
+        outcome = evaluate(pkg, deadline=5.0)
+        assert outcome['timed_out']
+        assert sorted(outcome['counts']) == ['access', 'cell', 'image', 'table']
+        assert clock.readings == 6
+
+        # Without a deadline the same rule walks every paragraph
+        assert evaluate(pkg, rules=contrast)['counts'] == {'contrast': 0}
+
+
+def test_hung_check_is_killed_after_the_budget():
+    with Supervisor(hang) as supervisor:
+        start = time.monotonic()
+        code, reason = a11y_gate.supervised_gate(supervisor, {'path': MINSTER, 'deadline': start + 0.2,
+                                                              'strict': False})
+        assert code == OUT_OF_TIME and 'timed out' in reason
+        assert time.monotonic() - start < 0.2 + a11y_gate.GRACE + 2
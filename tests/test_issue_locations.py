@@ -0,0 +1,98 @@
+import batch_check
+import issue_locations
+from conftest import paragraph
+from issue_locations import build_index, dumps, format_locator, loads, locate_document, locators, merge_indexes
+from native_checker import DocxPackage
+from results_store import ResultsStore
+
+
+def drawing(doc_id, name, descr=''):
+    return (f'<w:r><w:drawing><wp:inline><wp:docPr id="{doc_id}" name="{name}" descr="{descr}"/></wp:inline>'
+            f'</w:drawing></w:r>')
+
+
+# A shape whose fallback copy holds a paragraph and a drawing: neither may shift the ordinals after it
+SHAPE = ('<w:p><w:r><mc:AlternateContent><mc:Choice Requires="wps">'
+         '<w:drawing><wp:inline><wp:docPr id="2" name="Shape" descr="a chart"/></wp:inline></w:drawing>'
+         '</mc:Choice><mc:Fallback><w:pict><v:textbox><w:txbxContent>'
+         f'{paragraph("fallback")}<w:p>{drawing(3, "Fallback")}</w:p>'
+         '</w:txbxContent></v:textbox></w:pict></mc:Fallback></mc:AlternateContent></w:r></w:p>')
+
+PALE = '<w:r><w:rPr><w:color w:val="EEEEEE"/></w:rPr><w:t>pale</w:t></w:r>'
+ROW = f'<w:tr><w:tc>{paragraph("cell")}</w:tc></w:tr>'
+
+BODY = ''.join([
+    paragraph('plain'),
+    SHAPE,
+    f'<w:p><w:r><w:t xml:space="preserve">ok </w:t></w:r>{PALE}</w:p>',
+    f'<w:tbl>{ROW}{ROW}</w:tbl>',
+    f'<w:p><w:r><w:t xml:space="preserve">see </w:t></w:r>{drawing(4, "Picture 4")}</w:p>',
+])
+
+
+def test_locators_point_at_the_elements(make_docx):
+    path = make_docx(BODY)
+    counts, index = locate_document(path)
+    assert counts['image'] == 1 and counts['table'] == 1 and counts['contrast'] == 1
+    assert index['parts'] == ['word/document.xml']
+    image, = locators(index, 'image')
+    table, = locators(index, 'table')
+    contrast, = locators(index, 'contrast')
+    # Paragraphs: plain, shape, pale, two cells, picture; the fallback paragraph and drawing are skipped
+    assert (image['ordinal'], image['paragraph'], image['offset']) == (1, 5, 4)
+    assert (table['ordinal'], table['paragraph']) == (0, 3)
+    assert (contrast['ordinal'], contrast['paragraph'], contrast['offset']) == (2, 2, 3)
+
+    with DocxPackage(path) as pkg:
+        data = pkg.read('word/document.xml')
+    assert data[image['byte']:].startswith(b'<wp:docPr id="4" name="Picture 4"')
+    assert data[table['byte']:].startswith(b'<w:tbl>')
+    assert data[contrast['byte']:].startswith(b'<w:p><w:r><w:t xml:space="preserve">ok ')
+    assert format_locator(image) == f"word/document.xml drawing 1 (paragraph 5, char 4) @ byte {image['byte']}"
+
+
+def test_package_findings_have_no_position(make_docx):
+    path = make_docx(paragraph('no headings anywhere'))
+    index = locate_document(path)[1]
+    heading, = locators(index, 'heading')
+    assert heading['part'] == 'word/document.xml' and heading['ordinal'] is None
+    assert format_locator(heading) == 'word/document.xml document'
+    with DocxPackage(path) as pkg:
+        index = build_index(pkg, {'access': [(None, 'package', None, None)]})
+    assert index['parts'] == [] and format_locator(next(locators(index, 'access'))) == 'package'
+
+
+def test_merge_renumbers_parts():
+    header = {'v': 1, 'parts': ['word/header1.xml', 'word/document.xml'],
+              'issues': {'image': [[0, 'drawing', 0, 0, 0, 10], [1, 'drawing', 2, 7, 0, 900]]}}
+    body = {'v': 1, 'parts': ['word/document.xml'],
+            'issues': {'image': [[0, 'drawing', 0, 1, 0, 500]], 'access': [[-1, 'package', None, None, None, None]]}}
+    merged = merge_indexes([body, header])
+    assert merged['parts'] == ['word/document.xml', 'word/header1.xml']
+    assert merged['issues'] == {'image': [[0, 'drawing', 0, 1, 0, 500], [1, 'drawing', 0, 0, 0, 10],
+                                          [0, 'drawing', 2, 7, 0, 900]],
+                                'access': [[-1, 'package', None, None, None, None]]}
+    assert [loc['part'] for loc in locators(merged, 'image')] == [
+        'word/document.xml', 'word/header1.xml', 'word/document.xml']
+
+
+def test_stored_index_round_trip(make_docx, tmp_path, monkeypatch, capsys):
+    path = make_docx(BODY)
+    index = locate_document(path)[1]
+    assert loads(dumps(index)) == index
+    assert loads(dumps(dict(index, v=0))) is None
+
+    db = str(tmp_path / 'results.db')
+    assert batch_check.main([path, '--db', db, '--locations', '--workers', '1']) == 0
+    with ResultsStore(db) as store:
+        assert store.locations(path) == index
+
+    # An unchanged document is never checked again: the stored byte offsets are used as they are
+    def check_again(path):
+        raise AssertionError("checked again")
+    monkeypatch.setattr(issue_locations, 'locate_document', check_again)
+    capsys.readouterr()
+    assert issue_locations.main([path, '--db', db, '--category', 'image', '--context', '40']) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == f"Missing alt text: {format_locator(next(locators(index, 'image')))}"
+    assert out[1].strip().startswith('<wp:docPr id="4" name="Picture 4"')
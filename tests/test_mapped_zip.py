@@ -0,0 +1,49 @@
+import os
+import struct
+import zipfile
+
+import pytest
+
+import a11y_gate
+from conftest import MINSTER
+from mapped_zip import END_RECORD, MappedZip
+from native_checker import run_native_checker
+
+
+def corrupt_packages(tmp_path):
+    with open(MINSTER, 'rb') as f:
+        data = f.read()
+    directory = data.rindex(b'PK\x01\x02')
+    with zipfile.ZipFile(MINSTER) as zf:
+        info = zf.getinfo('word/document.xml')
+    name_length, extra_length = struct.unpack_from('<HH', data, info.header_offset + 26)
+    start = info.header_offset + 30 + name_length + extra_length
+    packages = {
+        # Ends inside the end-of-central-directory record
+        'short_end.docx': data[:-10],
+        # Junk with an end record signature and nothing after it
+        'signature_only.docx': b'junk' * 100 + b'PK\x05\x06',
+        # End record pointing at a central directory header cut short
+        'short_directory.docx': data[:directory + 20] + END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, 1, 1, 46, directory, 0),
+        # Entry data that is not a deflate stream
+        'bad_deflate.docx': data[:start] + b'\xff' * 64 + data[start + 64:],
+    }
+    for name, content in packages.items():
+        (tmp_path / name).write_bytes(content)
+    return [str(tmp_path / name) for name in packages]
+
+
+def test_truncated_directories_are_bad_zip_files(tmp_path):
+    for path in corrupt_packages(tmp_path)[:3]:
+        with pytest.raises(zipfile.BadZipFile):
+            MappedZip(path)
+
+
+def test_corrupt_packages_are_unreadable_not_crashes(tmp_path, capsys):
+    before = len(os.listdir('/proc/self/fd'))
+    for path in corrupt_packages(tmp_path):
+        assert a11y_gate.main([path]) == a11y_gate.UNREADABLE
+        assert run_native_checker(path) is None
+    # The file and mapping of every failed open were closed
+    assert len(os.listdir('/proc/self/fd')) == before
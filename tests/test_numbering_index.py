@@ -0,0 +1,130 @@
+import zipfile
+
+from conftest import MINSTER, paragraph
+from native_checker import DocxPackage
+from numbering_index import check_list_structure, check_manual_lists, manual_marker
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def _lvl(ilvl, fmt, text='%1.'):
+    return (f'<w:lvl w:ilvl="{ilvl}"><w:start w:val="1"/><w:numFmt w:val="{fmt}"/>'
+            f'<w:lvlText w:val="{text}"/></w:lvl>')
+
+
+# 1: bullets and decimals; 2: the same list restarted at 5 with its own first level;
+# 3: the numbering style ListStyle's list; 4: an abstractNum that only links to ListStyle
+NUMBERING = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:numbering xmlns:w="{W_NS}">'
+    f'<w:abstractNum w:abstractNumId="10">{_lvl(0, "bullet", "●")}{_lvl(1, "decimal")}{_lvl(2, "lowerLetter")}'
+    f'</w:abstractNum>'
+    f'<w:abstractNum w:abstractNumId="11"><w:numStyleLink w:val="ListStyle"/></w:abstractNum>'
+    f'<w:abstractNum w:abstractNumId="12"><w:styleLink w:val="ListStyle"/>{_lvl(0, "lowerRoman")}</w:abstractNum>'
+    f'<w:num w:numId="1"><w:abstractNumId w:val="10"/></w:num>'
+    f'<w:num w:numId="2"><w:abstractNumId w:val="10"/>'
+    f'<w:lvlOverride w:ilvl="0"><w:startOverride w:val="5"/></w:lvlOverride>'
+    f'<w:lvlOverride w:ilvl="1">{_lvl(1, "upperLetter")}</w:lvlOverride></w:num>'
+    f'<w:num w:numId="3"><w:abstractNumId w:val="12"/></w:num>'
+    f'<w:num w:numId="4"><w:abstractNumId w:val="11"/></w:num>'
+    f'</w:numbering>').encode('utf-8')
+
+STYLES = (
+    '<w:style w:type="paragraph" w:styleId="ListPara"><w:name w:val="List Para"/>'
+    '<w:pPr><w:numPr><w:ilvl w:val="1"/><w:numId w:val="1"/></w:numPr></w:pPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="ListChild"><w:name w:val="List Child"/>'
+    '<w:basedOn w:val="ListPara"/></w:style>'
+    '<w:style w:type="numbering" w:styleId="ListStyle"><w:name w:val="List Style"/>'
+    '<w:pPr><w:numPr><w:numId w:val="3"/></w:numPr></w:pPr></w:style>')
+
+
+def item(text, num_id, ilvl=0):
+    return paragraph(text, f'<w:pPr><w:numPr><w:ilvl w:val="{ilvl}"/><w:numId w:val="{num_id}"/></w:numPr></w:pPr>')
+
+
+def styled(text, style, ppr=''):
+    return paragraph(text, f'<w:pPr><w:pStyle w:val="{style}"/>{ppr}</w:pPr>')
+
+
+def make_lists(make_docx, body):
+    with zipfile.ZipFile(MINSTER) as zf:
+        styles = zf.read('word/styles.xml').decode('utf-8').replace('</w:styles>', STYLES + '</w:styles>')
+    return make_docx(body, replace={'word/numbering.xml': NUMBERING, 'word/styles.xml': styles.encode('utf-8')})
+
+
+def test_levels_resolve_through_overrides_and_style_links(make_docx):
+    with DocxPackage(make_lists(make_docx, '')) as pkg:
+        levels = pkg.numbering().levels
+    assert levels['1', 0].format == 'bullet' and levels['1', 0].start == 1
+    # lvlOverride: a new start for level 0, a whole new level 1, level 2 from the abstractNum
+    assert levels['2', 0].format == 'bullet' and levels['2', 0].start == 5
+    assert levels['2', 1].format == 'upperLetter'
+    assert levels['2', 2].format == 'lowerLetter'
+    # numStyleLink -> ListStyle -> numId 3 -> abstractNum 12
+    assert levels['4', 0].abstract_id == '12' and levels['4', 0].format == 'lowerRoman'
+    assert ('4', 1) not in levels
+
+
+def test_paragraph_numbering_comes_from_its_style(make_docx):
+    body = ''.join([
+        styled('style', 'ListPara'),
+        styled('basedOn', 'ListChild'),
+        styled('own level', 'ListChild', '<w:numPr><w:ilvl w:val="2"/></w:numPr>'),
+        styled('switched off', 'ListPara', '<w:numPr><w:numId w:val="0"/></w:numPr>'),
+        item('unknown list', 9),
+        paragraph('plain'),
+    ])
+    with DocxPackage(make_lists(make_docx, body)) as pkg:
+        index = pkg.numbering()
+        lists = index.part(pkg.main_part())
+        paragraphs = list(pkg.xml(pkg.main_part()).iter(f'{{{W_NS}}}p'))
+        assert [index.numbering(p) for p in paragraphs] == [('1', 1), ('1', 1), ('1', 2), None, None, None]
+        assert len(lists.items) == 3
+        assert lists.previous[paragraphs[1]] is paragraphs[0]
+
+
+def test_markers():
+    assert manual_marker('• one') == 'bullet'
+    assert manual_marker('- one') == 'weak'
+    assert manual_marker('12. one') == 'number'
+    assert manual_marker('(b) one') == 'letter'
+    assert manual_marker('iv) one') == 'roman'
+    assert manual_marker('i. one') == 'letter or roman'
+    assert manual_marker('Dear Sir') is None
+
+
+def test_typed_bullets_and_numbers(make_docx):
+    body = ''.join([
+        paragraph('• counts on its own'),
+        paragraph('plain'),
+        paragraph('- a dash alone is text'),
+        paragraph('plain'),
+        paragraph('- two dashes'), paragraph('- in a row'),
+        paragraph('1. a number'), paragraph('a. then a letter'),
+        paragraph('plain'),
+        paragraph('i. first'), paragraph('ii. second'), paragraph('iii. third'),
+        paragraph('plain'),
+        paragraph('h. eighth'), paragraph('i. ninth'),
+        item('a real list item', 1), paragraph('- after it'),
+    ])
+    with DocxPackage(make_lists(make_docx, body)) as pkg:
+        found = []
+        assert check_manual_lists(pkg, found) == 1 + 2 + 3 + 2
+        texts = [''.join(element.itertext()) for _, _, element, _ in found]
+    assert texts == ['• counts on its own', '- two dashes', '- in a row', 'i. first', 'ii. second', 'iii. third',
+                     'h. eighth', 'i. ninth']
+
+
+def test_skipped_levels_and_split_lists(make_docx):
+    body = ''.join([
+        item('top', 1, 0), item('child', 1, 1), item('grandchild', 1, 2),
+        item('back to top', 1, 0), item('skips a level', 1, 2),
+        paragraph('plain'),
+        item('starts nested', 2, 1),
+        paragraph('plain'),
+        item('one list', 3, 0), item('another list, same level', 4, 0),
+    ])
+    with DocxPackage(make_lists(make_docx, body)) as pkg:
+        found = []
+        assert check_list_structure(pkg, found) == 3
+        texts = [''.join(element.itertext()) for _, _, element, _ in found]
+    assert texts == ['skips a level', 'starts nested', 'another list, same level']
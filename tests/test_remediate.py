@@ -0,0 +1,65 @@
+import filecmp
+import re
+import zipfile
+
+import remediate
+from conftest import CONFLICT, MINSTER, build_docx
+from native_checker import DocxPackage, evaluate
+
+
+def conflict_without_alt_text(path):
+    """ConflictDoc with its described picture stripped of alt text and given a name containing '>'"""
+    with zipfile.ZipFile(CONFLICT) as zf:
+        document = zf.read('word/document.xml').decode('utf-8')
+    old = 'name="Picture 1" descr="Group of people having fun at music concert"/>'
+    assert old in document
+    document = document.replace(old, 'name="Picture 1 &gt; crowd" title="a > b"/>')
+    return build_docx(path, '', {'word/document.xml': document.encode('utf-8')}, CONFLICT)
+
+
+def counts(path):
+    with DocxPackage(path) as pkg:
+        return evaluate(pkg)['counts']
+
+
+def test_round_trip_fixes_tables_and_alt_text(tmp_path):
+    source = conflict_without_alt_text(tmp_path / 'in.docx')
+    before = counts(source)
+    assert before['image'] == 2 and before['table'] == 1
+
+    fixed = remediate.remediate(source, str(tmp_path / 'out.docx'))
+    assert fixed == {'table': 1, 'alt_text': 2, 'decorative': 0}
+    after = counts(str(tmp_path / 'out.docx'))
+    assert after['image'] == 0 and after['table'] == 0
+    assert {k: v for k, v in after.items() if k not in ('image', 'table')} == \
+        {k: v for k, v in before.items() if k not in ('image', 'table')}
+
+    with zipfile.ZipFile(tmp_path / 'out.docx') as zf:
+        assert zf.testzip() is None
+        document = zf.read('word/document.xml')
+    # The '>' inside an attribute value does not end the tag early
+    assert b'title="a > b" descr="Image description needed' in document
+
+
+def test_out_mirrors_documents_without_fixes(tmp_path):
+    folder = tmp_path / 'in' / 'sub'
+    folder.mkdir(parents=True)
+    clean = folder / 'clean.docx'
+    clean.write_bytes(open(MINSTER, 'rb').read())
+    conflict_without_alt_text(folder / 'broken.docx')
+
+    assert remediate.main([str(tmp_path / 'in'), '--out', str(tmp_path / 'out')]) == 0
+    assert filecmp.cmp(clean, tmp_path / 'out' / 'sub' / 'clean.docx', shallow=False)
+    assert (tmp_path / 'out' / 'sub' / 'broken.docx').exists()
+
+
+def test_repeated_images_keep_needing_alt_text_by_default(make_docx):
+    with zipfile.ZipFile(CONFLICT) as zf:
+        document = zf.read('word/document.xml').decode('utf-8')
+    drawing = next(d for d in re.findall(r'<w:drawing>.*?</w:drawing>', document, re.S) if 'Picture 1' in d)
+    drawing = re.sub(r' descr="[^"]*"', '', drawing)
+    path = make_docx(f'<w:p><w:r>{drawing}</w:r></w:p>' * 2, source=CONFLICT)
+    with DocxPackage(path) as pkg:
+        assert remediate.plan_fixes(pkg)[1] == {'table': 0, 'alt_text': 2, 'decorative': 0}
+        assert remediate.plan_fixes(pkg, decorative_duplicates=True)[1] == {'table': 0, 'alt_text': 0,
+                                                                             'decorative': 2}
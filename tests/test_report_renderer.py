@@ -0,0 +1,41 @@
+import json
+import os
+
+import report_renderer
+from native_checker import format_results
+from report_renderer import render_report
+from results_store import ResultsStore
+
+
+def _record(store, path):
+    store.record(path, format_results({'heading': 1}), backend='native')
+
+
+def test_under_excludes_sibling_folders_with_the_same_prefix(tmp_path):
+    out = str(tmp_path / 'report')
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        for folder in ('r', 'rr'):
+            _record(store, str(tmp_path / folder / 'a.docx'))
+        assert render_report(store, out, under=str(tmp_path / 'r'))['documents'] == 1
+        # The command line passes --under straight through to the same snapshot
+        assert report_renderer.main(['--db', str(tmp_path / 'results.db'), '--out', out,
+                                     '--under', str(tmp_path / 'r')]) == 0
+    with open(os.path.join(out, 'report.json'), encoding='utf-8') as f:
+        assert [d['path'] for d in json.load(f)['documents']] == [str(tmp_path / 'r' / 'a.docx')]
+
+
+def test_rendering_again_removes_pages_of_the_longer_report(tmp_path):
+    out = str(tmp_path / 'report')
+    notes = os.path.join(out, 'notes.html')
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        for i in range(3):
+            _record(store, str(tmp_path / 'docs' / f'{i}.docx'))
+        assert render_report(store, out, page_size=1)['pages'] == 1 + 3 + 3
+        assert os.path.exists(os.path.join(out, 'heading-0003.html'))
+        with open(notes, 'w') as f:
+            f.write('kept')
+        render_report(store, out, page_size=2)
+        assert sorted(os.listdir(out)) == ['documents-0001.html', 'documents-0002.html', 'heading-0001.html',
+                                           'heading-0002.html', 'index.html', 'notes.html', 'report.json']
+        render_report(store, out, under=str(tmp_path / 'elsewhere'))
+        assert sorted(os.listdir(out)) == ['index.html', 'notes.html', 'report.json']
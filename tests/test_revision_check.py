@@ -0,0 +1,65 @@
+import shutil
+
+import batch_check
+import revision_check
+from conftest import MINSTER, build_docx, paragraph
+from doc_ir import extract
+from native_checker import DocxPackage
+from revision_check import Paragraphs, changed_blocks, compare_versions, format_delta, tracked_changes
+
+
+def pale(text, color='EEEEEE', tag='t'):
+    return f'<w:r><w:rPr><w:color w:val="{color}"/></w:rPr><w:{tag} xml:space="preserve">{text}</w:{tag}></w:r>'
+
+
+def ir_of(make_docx, body, name='doc.docx'):
+    with DocxPackage(make_docx(body, name=name)) as pkg:
+        return extract(pkg)
+
+
+def test_tracked_insertions_introduce_and_deletions_resolve(make_docx):
+    body = ''.join([
+        paragraph('unchanged'),
+        f'<w:p><w:ins w:id="1" w:author="Editor">{pale("added", "EEEEEE")}</w:ins></w:p>',
+        f'<w:p><w:r><w:t xml:space="preserve">kept </w:t></w:r>'
+        f'<w:del w:id="2" w:author="Editor">{pale("removed", "DDDDDD", "delText")}</w:del></w:p>',
+    ])
+    delta = tracked_changes(ir_of(make_docx, body))
+    assert [issue[1:] for issue in delta['introduced']] == [('contrast', 1, ('EEEEEE', 'FFFFFF'))]
+    assert [issue[1:] for issue in delta['resolved']] == [('contrast', 2, ('DDDDDD', 'FFFFFF'))]
+    assert delta['changed'] == 2 and delta['paragraphs'] == 3
+
+
+def test_one_changed_paragraph_is_one_block(make_docx):
+    texts = [f'paragraph {i}' for i in range(20)]
+    old = ir_of(make_docx, ''.join(paragraph(text) for text in texts), 'old.docx')
+    new_body = ''.join(paragraph(text) if i != 7 else f'<w:p>{pale(text)}</w:p>' for i, text in enumerate(texts))
+    new = ir_of(make_docx, new_body, 'new.docx')
+
+    assert changed_blocks(Paragraphs(old).signatures(), Paragraphs(new).signatures()) == [(7, 8, 7, 8)]
+    delta = compare_versions(old, new)
+    assert [issue[1:] for issue in delta['introduced']] == [('contrast', 7, ('EEEEEE', 'FFFFFF'))]
+    assert delta['resolved'] == [] and delta['changed'] == 1 and not delta['styles_changed']
+    assert format_delta(delta)[0] == "1 of 20 paragraphs changed (previous version)"
+    assert compare_versions(new, old)['resolved'] and not compare_versions(new, old)['introduced']
+
+
+def test_changed_blocks_of_insertions_and_deletions():
+    assert changed_blocks([1, 2, 3], [1, 2, 3]) == []
+    assert changed_blocks([1, 2, 3], [1, 9, 2, 3]) == [(1, 1, 1, 2)]
+    assert changed_blocks([1, 2, 3], [1, 3]) == [(1, 2, 1, 1)]
+    assert changed_blocks([1, 2, 3, 4, 5], [1, 8, 3, 9, 5]) == [(1, 2, 1, 2), (3, 4, 3, 4)]
+
+
+def test_ir_cache_lets_revision_find_the_batch_version(tmp_path, capsys):
+    document = str(tmp_path / 'resume.docx')
+    shutil.copy(MINSTER, document)
+    db, cache = str(tmp_path / 'results.db'), str(tmp_path / 'ir')
+    assert batch_check.main([document, '--db', db, '--ir-cache', cache, '--workers', '1']) == 0
+
+    build_docx(document, paragraph('Objective') + paragraph('Seeking a role', '<w:pPr><w:shd w:fill="FFFF00"/></w:pPr>'))
+    capsys.readouterr()
+    revision_check.main([document, '--db', db, '--cache', cache])
+    out = capsys.readouterr().out
+    assert 'no earlier version' not in out
+    assert 'paragraphs changed' in out
@@ -0,0 +1,34 @@
+import os
+
+from conftest import REPO
+from uia_fixtures import ReplayBackend, benchmark_scraper, load_tree, record_tree
+
+FIXTURE = os.path.join(REPO, 'fixtures', 'synthetic_word_pane.json')
+
+
+def test_scraper_reads_the_counts_from_the_fixture():
+    results = benchmark_scraper(load_tree(FIXTURE), repeat=1)['results']
+    assert results['contrast'].endswith('- 6')
+    assert results['image'].endswith('- 1') and results['table'].endswith('- 1')
+
+
+def test_parent_links():
+    root = ReplayBackend(load_tree(FIXTURE)).root()
+    deepest = root.descendants()[-1]
+    chain = []
+    node = deepest
+    while node is not None:
+        chain.append(node.window_text())
+        node = node.parent()
+    assert chain[-2:] == ['ConflictDoc.docx - Word', 'Desktop 1']
+    # Going up and back down finds the same element
+    parent = deepest.parent()
+    assert deepest.window_text() in [child.window_text() for child in parent.children()]
+    assert root.parent().children()[0].window_text() == 'ConflictDoc.docx - Word'
+
+
+def test_recording_keeps_the_root_parent():
+    tree = load_tree(FIXTURE)
+    recorded = record_tree(ReplayBackend(tree).root())
+    assert recorded == tree
+    assert ReplayBackend(recorded).root().parent().window_text() == 'Desktop 1'
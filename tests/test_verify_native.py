@@ -0,0 +1,38 @@
+import os
+import shutil
+
+from conftest import CONFLICT, MINSTER, REPO
+from native_checker import run_native_checker
+from results_store import load_results_file, results_file_for, save_results_to_file
+from verify_native import find_recorded
+
+
+def test_native_reports_do_not_replace_or_pose_as_word_results(tmp_path):
+    shutil.copy(MINSTER, tmp_path)
+    shutil.copy(os.path.join(REPO, 'Minster_Resume_accessibility_results.txt'), tmp_path)
+    document = str(tmp_path / 'Minster_Resume.docx')
+    recorded = tmp_path / 'Minster_Resume_accessibility_results.txt'
+    before = recorded.read_bytes()
+
+    results = run_native_checker(document)
+    report = results_file_for(document)
+    save_results_to_file(results, report, 'Minster_Resume.docx')
+    assert report.endswith('_native_accessibility_results.txt')
+    assert recorded.read_bytes() == before
+    assert load_results_file(report)['backend'] == 'native'
+
+    # Only the Word recording is replayed
+    assert [os.path.basename(r) for r, _, _ in find_recorded([str(tmp_path)])] == [recorded.name]
+
+
+def test_native_report_under_the_word_name_is_skipped(tmp_path):
+    shutil.copy(CONFLICT, tmp_path)
+    document = str(tmp_path / 'ConflictDoc.docx')
+    # An older native run that wrote the Word report name
+    save_results_to_file(run_native_checker(document), results_file_for(document, 'uia'), 'ConflictDoc.docx')
+    assert list(find_recorded([str(tmp_path)])) == []
+
+    shutil.copy(os.path.join(REPO, 'ConflictDoc_accessibility_results.txt'), tmp_path)
+    (_, recorded, path), = find_recorded([str(tmp_path)])
+    assert recorded['backend'] is None and recorded['contrast'].endswith('- 6')
+    assert path == document
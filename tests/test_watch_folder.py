@@ -0,0 +1,59 @@
+import os
+import shutil
+import time
+
+from conftest import MINSTER, hang
+from deadline_supervisor import Quarantine, Supervisor
+from results_store import ResultsStore
+from watch_folder import FolderChecker
+
+
+def test_reports_are_opt_in(tmp_path):
+    document = shutil.copy(MINSTER, tmp_path)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        checker = FolderChecker(store)
+        try:
+            checker.check(document, measure=False)
+        finally:
+            checker.close()
+        assert store.latest(document)['heading'] == 1
+    assert sorted(os.listdir(tmp_path)) == ['Minster_Resume.docx', 'results.db']
+
+
+def test_failing_document_does_not_stop_the_watcher(tmp_path):
+    document = str(tmp_path / 'report.docx')
+    # Half written: the zip directory is not there yet
+    with open(MINSTER, 'rb') as f:
+        data = f.read()
+    with open(document, 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        checker = FolderChecker(store, debounce=0)
+        try:
+            checker.check(document, measure=False)
+            # Retried after the next debounce, not dropped
+            assert document in checker.pending
+            with open(document, 'wb') as f:
+                f.write(data)
+            checker.process_due()
+            assert store.latest(document) is not None
+            assert not checker.pending and not checker.attempts
+        finally:
+            checker.close()
+
+
+def test_hung_check_is_killed_and_quarantined(tmp_path):
+    document = shutil.copy(MINSTER, tmp_path)
+    quarantine = Quarantine(str(tmp_path / 'quarantine.json'))
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        checker = FolderChecker(store, debounce=0, supervisor=Supervisor(hang, 1, 0.5, quarantine))
+        try:
+            start = time.monotonic()
+            checker.check(document, measure=False)
+            assert time.monotonic() - start < 5
+        finally:
+            checker.close()
+        assert store.latest(document) is None
+    assert not checker.pending
+    assert quarantine.retry_at(document) is not None
@@ -0,0 +1,52 @@
+import shutil
+import time
+
+import work_queue
+from conftest import MINSTER
+from work_queue import LeaseKeeper, WorkQueue
+
+
+def copies(tmp_path, count):
+    folder = tmp_path / 'docs'
+    folder.mkdir()
+    for i in range(count):
+        shutil.copy(MINSTER, folder / f'resume{i:02d}.docx')
+    return str(folder)
+
+
+def test_processes_claim_each_document_once(tmp_path):
+    db = str(tmp_path / 'queue.db')
+    folder = copies(tmp_path, 12)
+    assert work_queue.main(['enqueue', folder, '--db', db]) == 0
+    assert work_queue.main(['work', '--db', db, '--processes', '3', '--batch', '2']) == 0
+
+    queue = WorkQueue(db)
+    try:
+        rows = queue.conn.execute("SELECT state, attempts, node FROM queue").fetchall()
+        assert len(rows) == 12
+        # A document leased by two processes would show a second attempt
+        assert {(state, attempts) for state, attempts, _ in rows} == {('done', 1)}
+        assert queue.conn.execute("SELECT COUNT(*), COUNT(DISTINCT path) FROM results").fetchone() == (12, 12)
+        states, nodes = queue.status()
+        assert len(nodes) == 3
+        assert sum(documents for _, documents, *_ in nodes) == 12
+    finally:
+        queue.close()
+
+
+def test_leases_are_renewed_while_working_and_released_on_stop(tmp_path):
+    db = str(tmp_path / 'queue.db')
+    queue = WorkQueue(db, lease_seconds=0.3)
+    try:
+        queue.enqueue([MINSTER])
+        assert queue.claim('slow') == [MINSTER]
+        keeper = LeaseKeeper(db, 'slow', 0.3)
+        keeper.start()
+        time.sleep(0.7)
+        assert queue.claim('other') == []
+        keeper.stop()
+        assert queue.release('slow') == 1
+        assert queue.conn.execute("SELECT state, attempts FROM queue").fetchone() == ('pending', 0)
+        assert queue.claim('other') == [MINSTER]
+    finally:
+        queue.close()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Record/replay fixtures for the Word UIA scraper.
+
+`record` (Windows, needs pywinauto and an open Word window with the
+accessibility pane showing) serialises the Word window's UIA tree to JSON,
+with the window's own parent (the desktop) under 'parent'. `bench` replays a
+recorded tree through a fake pywinauto-like backend with a configurable
+per-call latency, so WordAccessibilityScraper's search strategy can be
+measured on any machine.
+
+fixtures/synthetic_word_pane.json is hand-built, not recorded: it has the
+shape of Word 365's window and pane and the counts of
+ConflictDoc_accessibility_results.txt. It exercises the scraper's search,
+but only a tree recorded from Word can catch changes in Word's real UIA
+structure.
+
+    python uia_fixtures.py record fixtures/my_pane.json
+    python uia_fixtures.py bench fixtures/synthetic_word_pane.json --latency 0.002
+"""
+import argparse
+import contextlib
+import io
+import json
+import re
+import sys
+import time
+from collections import Counter
+
+
+def _record_node(wrapper):
+    info = wrapper.element_info
+    return {
+        'title': wrapper.window_text(),
+        'control_type': info.control_type,
+        'class_name': info.class_name,
+        'visible': bool(wrapper.is_visible()),
+        'children': [],
+    }
+
+
+def record_tree(wrapper, max_depth=None, depth=0):
+    """Capture a pywinauto wrapper and its descendants as nested dicts.
+
+    Parents inside the tree are implied by the nesting; the root also records
+    its own parent (without children) so replayed code can walk above it.
+    """
+    node = _record_node(wrapper)
+    if depth == 0:
+        parent = wrapper.parent()
+        if parent is not None:
+            node['parent'] = _record_node(parent)
+    if max_depth is None or depth < max_depth:
+        for child in wrapper.children():
+            try:
+                node['children'].append(record_tree(child, max_depth, depth + 1))
+            except Exception as e:
+                # Elements can disappear while the pane is being walked
+                print(f"Skipped element: {e}")
+    return node
+
+
+def save_tree(tree, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(tree, f, indent=1)
+
+
+def load_tree(filename):
+    with open(filename, encoding='utf-8') as f:
+        tree = json.load(f)
+    # Fixtures may wrap the tree with a note about where it came from
+    return tree.get('tree', tree)
+
+
+def record_word_window(filename, max_depth=None):
+    """Connect to Word the same way the scraper does and record its window"""
+    from scrape_data_3 import WordAccessibilityScraper
+
+    scraper = WordAccessibilityScraper()
+    if not scraper.connect_to_word():
+        return False
+    save_tree(record_tree(scraper.word_window.wrapper_object(), max_depth), filename)
+    print(f"Recorded UIA tree to {filename}")
+    return True
+
+
+class ElementNotFoundError(Exception):
+    """Raised like pywinauto's ElementNotFoundError when a spec matches nothing"""
+
+
+class ReplayBackend:
+    """Shared state for a replayed tree: simulated per-call latency and call counts"""
+
+    def __init__(self, tree, latency=0.0):
+        self.tree = tree
+        self.latency = latency
+        self.calls = Counter()
+        # id(node) -> parent node; the recorded parent of the root sits above it with the root as its child
+        self.parents = {}
+        if tree.get('parent'):
+            self.parents[id(tree)] = dict(tree['parent'], children=[tree])
+        for node in [tree] + list(_walk(tree)):
+            for child in node['children']:
+                self.parents[id(child)] = node
+
+    def call(self, kind):
+        self.calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def root(self):
+        return FakeWrapper(self, self.tree)
+
+
+class FakeElementInfo:
+    def __init__(self, backend, node):
+        self._backend = backend
+        self._node = node
+
+    @property
+    def name(self):
+        self._backend.call('name')
+        return self._node['title']
+
+    @property
+    def control_type(self):
+        self._backend.call('control_type')
+        return self._node['control_type']
+
+    @property
+    def class_name(self):
+        self._backend.call('class_name')
+        return self._node.get('class_name', '')
+
+    def __repr__(self):
+        return f"<FakeElementInfo - '{self._node['title']}', {self._node['control_type']}>"
+
+
+def _matches(backend, node, criteria):
+    """pywinauto-style criteria; each property read counts as a UIA call"""
+    if 'title' in criteria:
+        backend.call('name')
+        if node['title'] != criteria['title']:
+            return False
+    if 'title_re' in criteria:
+        backend.call('name')
+        if not re.match(criteria['title_re'], node['title']):
+            return False
+    if 'control_type' in criteria:
+        backend.call('control_type')
+        if node['control_type'] != criteria['control_type']:
+            return False
+    if 'class_name' in criteria:
+        backend.call('class_name')
+        if node.get('class_name') != criteria['class_name']:
+            return False
+    if criteria.get('visible_only'):
+        backend.call('visible')
+        if not node['visible']:
+            return False
+    return True
+
+
+def _walk(node):
+    for child in node['children']:
+        yield child
+        yield from _walk(child)
+
+
+class FakeWrapper:
+    """Stands in for a pywinauto UIAWrapper over a recorded node"""
+
+    def __init__(self, backend, node):
+        self._backend = backend
+        self._node = node
+
+    @property
+    def element_info(self):
+        return FakeElementInfo(self._backend, self._node)
+
+    def window_text(self):
+        self._backend.call('name')
+        return self._node['title']
+
+    def is_visible(self):
+        self._backend.call('visible')
+        return self._node['visible']
+
+    def exists(self, timeout=None):
+        return True
+
+    def wrapper_object(self):
+        return self
+
+    def children(self, **criteria):
+        self._backend.call('children')
+        return [FakeWrapper(self._backend, child) for child in self._node['children']
+                if _matches(self._backend, child, criteria)]
+
+    def descendants(self, **criteria):
+        self._backend.call('descendants')
+        return [FakeWrapper(self._backend, node) for node in _walk(self._node)
+                if _matches(self._backend, node, criteria)]
+
+    def child_window(self, **criteria):
+        return FakeWindowSpecification(self, criteria)
+
+    def parent(self):
+        """Parent wrapper, None above the recorded root's parent (like pywinauto's desktop)"""
+        self._backend.call('parent')
+        node = self._backend.parents.get(id(self._node))
+        return FakeWrapper(self._backend, node) if node is not None else None
+
+    def __repr__(self):
+        return f"<FakeWrapper - '{self._node['title']}', {self._node['control_type']}>"
+
+
+class FakeWindowSpecification:
+    """Lazy search like pywinauto's WindowSpecification: resolved on every use"""
+
+    def __init__(self, parent, criteria):
+        self._parent = parent
+        self._criteria = criteria
+
+    def _find(self):
+        parent = self._parent.wrapper_object()
+        criteria = dict(self._criteria)
+        found_index = criteria.pop('found_index', None)
+        criteria.pop('depth', None)
+        matches = parent.descendants(**criteria)
+        if found_index is None and len(matches) == 1:
+            return matches[0]
+        if found_index is not None and found_index < len(matches):
+            return matches[found_index]
+        if not matches:
+            raise ElementNotFoundError(self._criteria)
+        raise ElementNotFoundError(f"{len(matches)} elements match {self._criteria}")
+
+    def exists(self, timeout=None):
+        try:
+            self._find()
+            return True
+        except ElementNotFoundError:
+            return False
+
+    def wrapper_object(self):
+        return self._find()
+
+    def child_window(self, **criteria):
+        return FakeWindowSpecification(self, criteria)
+
+    def __getattr__(self, name):
+        # Anything else (window_text, children, is_visible, element_info...) goes to the found element
+        return getattr(self._find(), name)
+
+
+def benchmark_scraper(tree, latency=0.0, repeat=3):
+    """Run the scraper's pane search and result extraction against a replayed tree"""
+    from scrape_data_3 import WordAccessibilityScraper
+
+    timings = []
+    for _ in range(repeat):
+        backend = ReplayBackend(tree, latency)
+        scraper = WordAccessibilityScraper()
+        scraper.word_window = backend.root()
+        start = time.perf_counter()
+        # The scraper is chatty; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            found = scraper.find_accessibility_pane()
+            results = scraper.get_color_and_contrast_element() if found else None
+        timings.append(time.perf_counter() - start)
+    return {'seconds': min(timings), 'calls': backend.calls, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay Word UIA trees")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record = sub.add_parser('record', help="record the open Word window (Windows only)")
+    record.add_argument('output', help="JSON file to write")
+    record.add_argument('--max-depth', type=int, default=None)
+
+    bench = sub.add_parser('bench', help="benchmark the scraper against a recorded tree")
+    bench.add_argument('fixture', help="recorded JSON tree")
+    bench.add_argument('--latency', type=float, default=0.0, help="seconds per simulated UIA call")
+    bench.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        return 0 if record_word_window(args.output, args.max_depth) else 1
+
+    outcome = benchmark_scraper(load_tree(args.fixture), args.latency, args.repeat)
+    print(f"Scrape took {outcome['seconds'] * 1000:.1f} ms "
+          f"({sum(outcome['calls'].values())} simulated UIA calls, {args.latency * 1000:g} ms each)")
+    for kind, count in outcome['calls'].most_common():
+        print(f"  {kind}: {count}")
+    if outcome['results']:
+        for key, value in outcome['results'].items():
+            print(f"  {key}: {value}")
+    else:
+        print("  scraper found no results in this tree")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
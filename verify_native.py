@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Differential check of the native engine against recorded Word results.
+
+Finds every *_accessibility_results.txt written by the Word pane scraper
+(scrape_data_3.py), runs the native checker on the document it describes,
+and reports per-category disagreements ranked by how often they happen.
+Needs no Word, so it can run in CI after every engine change.
+
+    python verify_native.py corpus/ --max-disagreements 0
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+from native_checker import CATEGORIES, LABELS, parse_count, run_native_checker
+from results_store import NATIVE_REPORT_SUFFIX, REPORT_SUFFIX, WORD_BACKENDS, load_results_file
+
+
+def find_recorded(folders):
+    """Yield (report path, recorded results, document path) for every recorded Word result.
+
+    Reports the native engine wrote (their own name, or a Backend line that is
+    not a Word backend) are skipped: comparing them would compare the engine
+    with itself.
+    """
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            for name in sorted(files):
+                if not name.endswith(REPORT_SUFFIX) or name.endswith(NATIVE_REPORT_SUFFIX):
+                    continue
+                report = os.path.join(root, name)
+                recorded = load_results_file(report)
+                if recorded['backend'] not in WORD_BACKENDS:
+                    continue
+                document = recorded['document'] or name[:-len(REPORT_SUFFIX)] + '.docx'
+                yield report, recorded, os.path.join(root, document)
+
+
+def compare(folders):
+    """Compare every recorded result with the native engine.
+
+    Returns (per-category stats, disagreements, documents that could not be compared).
+    """
+    stats = {category: {'compared': 0, 'agree': 0, 'over': 0, 'under': 0, 'abs_diff': 0}
+             for category, _ in CATEGORIES}
+    disagreements = []
+    skipped = []
+
+    for report, recorded, document in find_recorded(folders):
+        if not os.path.exists(document):
+            skipped.append((report, "document not found"))
+            continue
+        native = run_native_checker(document)
+        if native is None:
+            skipped.append((report, "native checker could not read the document"))
+            continue
+
+        for category, _ in CATEGORIES:
+            word_count = parse_count(recorded[category])
+            if word_count is None:
+                # The scraper did not find this category in the pane
+                continue
+            native_count = parse_count(native[category])
+            entry = stats[category]
+            entry['compared'] += 1
+            if native_count == word_count:
+                entry['agree'] += 1
+                continue
+            entry['over' if native_count > word_count else 'under'] += 1
+            entry['abs_diff'] += abs(native_count - word_count)
+            disagreements.append((category, document, word_count, native_count))
+
+    return stats, disagreements, skipped
+
+
+def render_report(stats, disagreements, skipped, examples=5):
+    lines = ["Native engine vs. Word accessibility checker", "=" * 50, ""]
+    ranked = sorted(stats.items(), key=lambda item: -(item[1]['over'] + item[1]['under']))
+
+    lines.append(f"{'category':<32}{'compared':>10}{'agree':>8}{'over':>8}{'under':>8}{'abs diff':>10}")
+    for category, entry in ranked:
+        lines.append(f"{LABELS[category]:<32}{entry['compared']:>10}{entry['agree']:>8}"
+                     f"{entry['over']:>8}{entry['under']:>8}{entry['abs_diff']:>10}")
+
+    by_category = defaultdict(list)
+    for category, document, word_count, native_count in disagreements:
+        by_category[category].append((document, word_count, native_count))
+    for category, entry in ranked:
+        if not by_category[category]:
+            continue
+        lines += ["", f"{LABELS[category]} ({len(by_category[category])} documents disagree)"]
+        # Biggest differences first
+        worst = sorted(by_category[category], key=lambda d: -abs(d[2] - d[1]))
+        for document, word_count, native_count in worst[:examples]:
+            lines.append(f"  {document}: Word {word_count}, native {native_count}")
+
+    if skipped:
+        lines += ["", f"Skipped {len(skipped)} recorded results:"]
+        lines += [f"  {report}: {reason}" for report, reason in skipped]
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the native engine with recorded Word results")
+    parser.add_argument('folders', nargs='*', default=['.'], help="folders with recorded results")
+    parser.add_argument('--examples', type=int, default=5, help="documents to list per category")
+    parser.add_argument('--max-disagreements', type=int, default=None,
+                        help="exit 1 when there are more disagreements than this")
+    args = parser.parse_args(argv)
+
+    stats, disagreements, skipped = compare(args.folders)
+    print('\n'.join(render_report(stats, disagreements, skipped, args.examples)))
+
+    if args.max_disagreements is not None and len(disagreements) > args.max_disagreements:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Watch a folder and re-check Word documents as soon as they are saved.
+
+Uses inotify on Linux and falls back to polling elsewhere (or with --poll,
+which is also what network shares need since remote writes raise no inotify
+events). Rapid successive saves are debounced, Word lock files (~$*.docx)
+are ignored, and unchanged documents (same content digest) are not re-checked.
+Checks run in a supervised worker process (see deadline_supervisor): a
+document that hangs or crashes the checker is killed after --deadline
+seconds and quarantined, and the watcher carries on.
+
+    python watch_folder.py /shared/docs --db /shared/docs/a11y_results.db
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from a11y_gate import is_checkable
+from batch_check import run_task
+from deadline_supervisor import QUARANTINE_FILE, Quarantine, Supervisor
+from native_checker import CATEGORIES, format_results
+from results_store import DEFAULT_DB, ResultsStore, file_digest, results_file_for, save_results_to_file
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Unreadable documents are retried this many times before they are skipped
+MAX_ATTEMPTS = 5
+# Seconds a check may take before its worker is killed, as for `a11y check`
+DEADLINE = 60.0
+
+
+def scan_documents(folder):
+    """Map every checkable document under folder to its (mtime, size)"""
+    found = {}
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if is_checkable(path):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (st.st_mtime, st.st_size)
+    return found
+
+
+class PollingWatcher:
+    """Portable watcher that compares directory snapshots"""
+
+    def __init__(self, folder, interval=1.0):
+        self.folder = folder
+        self.interval = interval
+        self.snapshot = scan_documents(folder)
+
+    def changes(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = scan_documents(self.folder)
+        changed = {path for path, stat in current.items() if self.snapshot.get(path) != stat}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watcher (recursive), called through libc with ctypes"""
+
+    def __init__(self, folder):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folder = folder
+        self.dirs = {}
+        for root, dirs, files in os.walk(folder):
+            self.add_watch(root)
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.dirs[wd] = path
+
+    def changes(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: treat everything as possibly changed
+                changed.update(scan_documents(self.folder))
+                continue
+            path = os.path.join(self.dirs.get(wd, self.folder), os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_watch(path)
+                    changed.update(scan_documents(path))
+            elif is_checkable(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(folder, poll=False, interval=1.0):
+    if not poll and sys.platform.startswith('linux') and ctypes.util.find_library('c'):
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            print(f"inotify not available ({e}), polling instead")
+    return PollingWatcher(folder, interval)
+
+
+class LatencyStats:
+    """Save-to-result latency (file mtime to result stored)"""
+
+    def __init__(self):
+        self.samples = []
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return "no documents checked"
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"{len(ordered)} checks, save-to-result latency "
+                f"median {ordered[len(ordered) // 2]:.2f}s, p95 {p95:.2f}s, max {ordered[-1]:.2f}s")
+
+
+class FolderChecker:
+    """Debounces change events and re-checks documents through the native engine in a supervised worker"""
+
+    def __init__(self, store, debounce=1.0, write_reports=False, locate=False, supervisor=None, ir_cache=None):
+        self.store = store
+        self.ir_cache = ir_cache
+        self.supervisor = supervisor if supervisor is not None else Supervisor(run_task, 1, DEADLINE)
+        self.debounce = debounce
+        self.write_reports = write_reports
+        self.locate = locate
+        self.pending = {}
+        self.attempts = {}
+        self.stats = LatencyStats()
+
+    def close(self):
+        self.supervisor.close()
+
+    def touch(self, paths):
+        now = time.monotonic()
+        for path in paths:
+            self.pending[path] = now
+
+    def process_due(self):
+        """Check every pending document that has been quiet for the debounce period"""
+        now = time.monotonic()
+        for path, last_event in list(self.pending.items()):
+            if now - last_event < self.debounce:
+                continue
+            del self.pending[path]
+            self.check(path)
+
+    def next_timeout(self, idle=5.0):
+        if not self.pending:
+            return idle
+        oldest = min(self.pending.values())
+        return max(0.05, self.debounce - (time.monotonic() - oldest))
+
+    def check(self, path, measure=True):
+        try:
+            saved_at = os.stat(path).st_mtime
+            digest = file_digest(path)
+        except OSError:
+            # Deleted or renamed away before we got to it
+            return
+        if digest == self.store.latest_digest(path):
+            return
+
+        start = time.perf_counter()
+        task = {'path': path, 'stories': None, 'package': True, 'locate': self.locate, 'ir_cache': self.ir_cache}
+        for _, status, value in self.supervisor.run([task]):
+            pass
+        if status == 'quarantined':
+            # Hung or crashed the worker: the quarantine decides when it is tried again
+            print(f"{path}: {value}")
+            self.attempts.pop(path, None)
+            return
+        error = value if status == 'error' else value['error']
+        if error:
+            # Most likely still being written; look again after another debounce
+            print(f"Could not check {path}: {error}")
+            self.attempts[path] = self.attempts.get(path, 0) + 1
+            if self.attempts[path] < MAX_ATTEMPTS:
+                self.pending[path] = time.monotonic()
+            else:
+                print(f"Giving up on {path} after {MAX_ATTEMPTS} attempts")
+                del self.attempts[path]
+            return
+        self.attempts.pop(path, None)
+        elapsed = time.perf_counter() - start
+        results = format_results(value['counts'])
+        results['author'] = value['author']
+        results['locations'] = value['locations']
+
+        self.store.record(path, results, digest=digest, elapsed=elapsed)
+        if self.write_reports:
+            save_results_to_file(results, results_file_for(path), os.path.basename(path))
+
+        issues = ', '.join(results[c] for c, _ in CATEGORIES if not results[c].endswith(' - 0'))
+        message = f"{os.path.basename(path)}: {issues or 'no issues'} (checked in {elapsed * 1000:.0f} ms"
+        if measure:
+            latency = time.time() - saved_at
+            self.stats.add(latency)
+            message += f", {latency:.2f}s after save"
+        print(message + ")")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-check Word documents as they are saved")
+    parser.add_argument('folder', help="folder to watch (recursively)")
+    parser.add_argument('--db', default=DEFAULT_DB, help="results index (SQLite file)")
+    parser.add_argument('--debounce', type=float, default=1.0,
+                        help="seconds a document must be quiet before it is checked")
+    parser.add_argument('--poll', action='store_true', help="poll instead of using inotify")
+    parser.add_argument('--interval', type=float, default=1.0, help="polling interval in seconds")
+    parser.add_argument('--reports', action='store_true',
+                        help="also write *_native_accessibility_results.txt next to each document")
+    parser.add_argument('--no-initial-scan', action='store_true',
+                        help="do not check documents that changed while the watcher was down")
+    parser.add_argument('--locations', action='store_true',
+                        help="store where each issue is, for review tools (a11y locate)")
+    parser.add_argument('--ir-cache', default=None, metavar='FOLDER',
+                        help="also cache each saved version's IR here, so `a11y revision` can compare the next "
+                             "save with it")
+    parser.add_argument('--deadline', type=float, default=DEADLINE,
+                        help="seconds a check may take before its worker is killed and the document quarantined")
+    parser.add_argument('--quarantine', default=QUARANTINE_FILE, help="quarantine file")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        print(f"Folder not found: {args.folder}")
+        return 1
+
+    store = ResultsStore(args.db)
+    supervisor = Supervisor(run_task, 1, args.deadline, Quarantine(args.quarantine))
+    checker = FolderChecker(store, args.debounce, args.reports, args.locations, supervisor, args.ir_cache)
+    watcher = make_watcher(args.folder, args.poll, args.interval)
+    print(f"Watching {args.folder} with {type(watcher).__name__}")
+
+    if not args.no_initial_scan:
+        # The digest check skips anything already indexed
+        for path in scan_documents(args.folder):
+            checker.check(path, measure=False)
+
+    try:
+        while True:
+            checker.touch(watcher.changes(checker.next_timeout()))
+            checker.process_due()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        checker.close()
+        store.close()
+        print(checker.stats.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Share a batch between several machines through one SQLite file.
+
+No extra service: the queue lives next to the results in the results index,
+on a shared filesystem. Workers lease documents for a limited time and renew
+their leases while they work, so a long document is not handed to a second
+node. A lease left behind by a crashed worker expires and the document goes
+back to the queue; a worker that stops early gives its leases back. Results
+are written once per document content (path + digest), so a document
+finished twice after a lease expiry is still recorded only once. Each
+document is checked in a supervised worker process; one that hangs or
+crashes it is killed after --deadline seconds and marked failed.
+
+    python work_queue.py enqueue /shared/docs --db /shared/a11y_results.db
+    python work_queue.py work --db /shared/a11y_results.db            # on every host
+    python work_queue.py work --db /shared/a11y_results.db --processes 4
+    python work_queue.py status --db /shared/a11y_results.db
+"""
+import argparse
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from multiprocessing import Process
+
+from batch_check import estimate_cost, find_documents, run_task
+from deadline_supervisor import Quarantine, Supervisor
+from native_checker import format_results
+from results_store import DEFAULT_DB, ResultsStore, file_digest
+
+# Seconds a document may take before its worker is killed and it fails
+DEADLINE = 120.0
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    path TEXT PRIMARY KEY,
+    cost REAL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    node TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS queue_state ON queue (state, cost);
+CREATE TABLE IF NOT EXISTS nodes (
+    node TEXT PRIMARY KEY,
+    started_at REAL,
+    last_seen REAL,
+    documents INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class WorkQueue:
+    """Lease-based document queue stored in the results index"""
+
+    def __init__(self, db_path=DEFAULT_DB, lease_seconds=300, max_attempts=3):
+        self.store = ResultsStore(db_path)
+        self.conn = self.store.conn
+        self.conn.executescript(QUEUE_SCHEMA)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def close(self):
+        self.store.close()
+
+    def enqueue(self, paths):
+        """Queue documents (re-queues finished ones); cost is the batch runner's estimate"""
+        rows = [(os.path.abspath(path), estimate_cost(path)[0]) for path in paths]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO queue (path, cost) VALUES (?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET cost = excluded.cost, state = 'pending', "
+                "node = NULL, lease_expires = NULL, attempts = 0, error = NULL",
+                rows)
+        return len(rows)
+
+    def claim(self, node, count=1):
+        """Lease up to count documents, most expensive first; expired leases are taken over"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Leases that ran out too often mark the document as failed
+            self.conn.execute(
+                "UPDATE queue SET state = 'failed', error = 'lease expired ' || attempts || ' times' "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts))
+            paths = [row[0] for row in self.conn.execute(
+                "SELECT path FROM queue WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY cost DESC LIMIT ?", (now, count))]
+            self.conn.executemany(
+                "UPDATE queue SET state = 'leased', node = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE path = ?", [(node, now + self.lease_seconds, path) for path in paths])
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return paths
+
+    def renew(self, node):
+        """Extend every lease the node still holds; returns how many"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE queue SET lease_expires = ? WHERE node = ? AND state = 'leased'",
+                (time.time() + self.lease_seconds, node)).rowcount
+
+    def release(self, node):
+        """Put the documents the node still holds back in the queue, without counting the attempt"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE queue SET state = 'pending', node = NULL, lease_expires = NULL, attempts = attempts - 1 "
+                "WHERE node = ? AND state = 'leased'", (node,)).rowcount
+
+    def complete(self, node, outcomes):
+        """Record a batch of checked documents in one write transaction.
+
+        outcomes are (path, results or None, digest, elapsed, error). Results are
+        inserted once per path + digest; documents whose lease was taken over by
+        another node are left to that node.
+        """
+        now = time.time()
+        checked = skipped = 0
+        busy = 0.0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for path, results, digest, elapsed, error in outcomes:
+                busy += elapsed
+                if results is not None:
+                    if self.store.insert_once(path, results, digest, elapsed=elapsed):
+                        checked += 1
+                    else:
+                        skipped += 1
+                elif not error:
+                    skipped += 1
+                self.conn.execute(
+                    "UPDATE queue SET state = ?, error = ?, lease_expires = NULL WHERE path = ? AND node = ?",
+                    ('failed' if error else 'done', error, path, node))
+            self.conn.execute(
+                "INSERT INTO nodes (node, started_at, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT (node) DO NOTHING", (node, now, now))
+            self.conn.execute(
+                "UPDATE nodes SET last_seen = ?, documents = documents + ?, skipped = skipped + ?, "
+                "busy_seconds = busy_seconds + ? WHERE node = ?", (now, checked, skipped, busy, node))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def remaining(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def status(self):
+        states = dict(self.conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state"))
+        nodes = self.conn.execute(
+            "SELECT node, documents, skipped, busy_seconds, started_at, last_seen FROM nodes "
+            "ORDER BY documents DESC").fetchall()
+        return states, nodes
+
+
+class LeaseKeeper(threading.Thread):
+    """Renews a node's leases every third of the lease time, on its own connection"""
+
+    def __init__(self, db_path, node, lease_seconds):
+        super().__init__(name=f"lease-keeper {node}", daemon=True)
+        self.db_path = db_path
+        self.node = node
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        queue = WorkQueue(self.db_path, self.lease_seconds)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                try:
+                    queue.renew(self.node)
+                except sqlite3.OperationalError as e:
+                    # Busy or unreachable index: the next beat tries again, well before expiry
+                    print(f"Lease renewal for {self.node} failed: {e}", file=sys.stderr)
+        finally:
+            queue.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def process(queue, supervisor, paths, locate=False):
+    """Check a batch of leased documents in the supervisor's worker; returns outcomes for WorkQueue.complete"""
+    outcomes = []
+    tasks = []
+    for path in paths:
+        try:
+            digest = file_digest(path)
+        except OSError as e:
+            outcomes.append((path, None, None, 0.0, str(e)))
+            continue
+        if queue.store.has_result(path, digest):
+            # Already recorded (e.g. by a node whose lease expired while it worked)
+            outcomes.append((path, None, digest, 0.0, None))
+            continue
+        tasks.append({'path': path, 'stories': None, 'package': True, 'locate': locate, 'digest': digest})
+
+    for task, status, value in supervisor.run(tasks):
+        if status == 'quarantined':
+            # Hung or crashed its worker: marked failed, so no other node hangs on it too
+            outcomes.append((task['path'], None, task['digest'], supervisor.deadline, value))
+        elif status == 'error':
+            outcomes.append((task['path'], None, task['digest'], 0.0, value))
+        elif value['error']:
+            outcomes.append((task['path'], None, task['digest'], value['elapsed'], value['error']))
+        else:
+            results = format_results(value['counts'])
+            results['author'] = value['author']
+            results['locations'] = value['locations']
+            outcomes.append((task['path'], results, task['digest'], value['elapsed'], None))
+    return outcomes
+
+
+def work(db_path, node=None, lease_seconds=300, batch=8, idle_exit=True, poll=2.0, locate=False,
+         deadline=DEADLINE):
+    """Worker loop for one node: claim a batch, check it, record it, until the queue is drained.
+
+    Documents are checked in a supervised worker process: one that takes
+    longer than deadline seconds is killed and fails in the queue, so a
+    hung check cannot hold its lease (which is renewed while it runs) forever.
+    """
+    node = node or f"{socket.gethostname()}:{os.getpid()}"
+    queue = WorkQueue(db_path, lease_seconds)
+    queue.complete(node, [])
+    # The queue's failed state is the quarantine shared by every node; this one only spans the run
+    supervisor = Supervisor(run_task, 1, deadline, Quarantine(None))
+    keeper = LeaseKeeper(db_path, node, lease_seconds)
+    keeper.start()
+    try:
+        while True:
+            paths = queue.claim(node, batch)
+            if not paths:
+                # Other nodes may still hold leases that could expire
+                if idle_exit and queue.remaining() == 0:
+                    break
+                time.sleep(poll)
+                continue
+            # One write transaction per batch: commits (fsyncs) dominate small checks
+            queue.complete(node, process(queue, supervisor, paths, locate))
+    finally:
+        supervisor.close()
+        keeper.stop()
+        # Interrupted mid-batch: the unchecked documents go straight back, not after the lease runs out
+        queue.release(node)
+        queue.close()
+
+
+def format_status(states, nodes):
+    lines = ["Queue: " + ", ".join(f"{state} {count}" for state, count in sorted(states.items())), ""]
+    lines.append(f"{'node':<32}{'checked':>9}{'skipped':>9}{'docs/s':>9}{'busy':>7}{'last seen':>11}")
+    now = time.time()
+    for node, documents, skipped, busy, started, last_seen in nodes:
+        wall = max(last_seen - started, 1e-9)
+        lines.append(f"{node:<32}{documents:>9}{skipped:>9}{documents / wall:>9.1f}"
+                     f"{busy / wall:>7.0%}{now - last_seen:>10.0f}s")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distribute a batch over several hosts")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = sub.add_parser('enqueue', help="add documents or folders to the queue")
+    enqueue.add_argument('inputs', nargs='+')
+
+    worker = sub.add_parser('work', help="process the queue until it is empty")
+    worker.add_argument('--node', default=None, help="node name (default host:pid)")
+    worker.add_argument('--processes', type=int, default=1,
+                        help="worker processes on this host, each acting as its own node")
+    worker.add_argument('--lease', type=float, default=300,
+                        help="seconds before the lease of a worker that stopped renewing it expires")
+    worker.add_argument('--batch', type=int, default=8,
+                        help="documents leased (and committed) together")
+    worker.add_argument('--stay', action='store_true', help="keep polling after the queue is drained")
+    worker.add_argument('--locations', action='store_true', help="store where each issue is with the results")
+    worker.add_argument('--deadline', type=float, default=DEADLINE,
+                        help="seconds a document may take before its worker is killed and it is marked failed")
+
+    sub.add_parser('status', help="queue state and per-node throughput")
+    for sub_parser in (enqueue, worker, sub.choices['status']):
+        sub_parser.add_argument('--db', default=DEFAULT_DB, help="shared results index (SQLite file)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'enqueue':
+        queue = WorkQueue(args.db)
+        print(f"Queued {queue.enqueue(find_documents(args.inputs))} documents")
+        queue.close()
+    elif args.command == 'work':
+        if args.processes == 1:
+            work(args.db, args.node, args.lease, args.batch, not args.stay, locate=args.locations,
+                 deadline=args.deadline)
+        else:
+            workers = [Process(target=work, args=(args.db, f"{args.node}-{i}" if args.node else None,
+                                                  args.lease, args.batch, not args.stay),
+                               kwargs={'locate': args.locations, 'deadline': args.deadline})
+                       for i in range(args.processes)]
+            for p in workers:
+                p.start()
+            for p in workers:
+                p.join()
+    else:
+        queue = WorkQueue(args.db)
+        print('\n'.join(format_status(*queue.status())))
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())